@@ -1,9 +1,10 @@
 # app.py
 import streamlit as st
 import pandas as pd
-import requests
 from talib import abstract
 
+from predictor.client import get_json, series_frame
+
 st.title("Candlestick Predictor (Regular + After Hours)")
 
 API_KEY = st.secrets.get("ALPHA_VANTAGE_API_KEY", "demo")  # Use secrets.toml for real key
@@ -25,7 +26,7 @@ if mode == "Live Prediction" and st.button("Predict"):
         # Add extended_hours parameter to include pre-market and after-hours data
         extended_param = "&extended_hours=true" if include_extended else ""
         url = f"https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol={ticker}&interval={interval}&outputsize=compact&apikey={API_KEY}{extended_param}"
-        resp = requests.get(url).json()
+        resp = get_json(url)
         
         if "Error Message" in resp:
             st.error(f"API Error: {resp['Error Message']}. Get free key at alphavantage.co")
@@ -33,13 +34,7 @@ if mode == "Live Prediction" and st.button("Predict"):
             st.error("Invalid ticker or no data. Try AAPL.")
         else:
             ts_key = f"Time Series ({interval})"
-            ts = resp[ts_key]
-            data = [{"timestamp": k, "open": v["1. open"], "high": v["2. high"], "low": v["3. low"], "close": v["4. close"], "volume": v["5. volume"]} for k, v in ts.items()]
-            df = pd.DataFrame(data)
-            df["timestamp"] = pd.to_datetime(df["timestamp"])
-            df.set_index("timestamp", inplace=True)
-            df = df.astype(float)
-            df.sort_index(inplace=True)
+            df = series_frame(resp[ts_key])
             
             for p in ['CDLDOJI', 'CDLHAMMER', 'CDLENGULFING', 'CDLMORNINGSTAR', 'CDLEVENINGSTAR',
                       'CDL3WHITESOLDIERS', 'CDL3BLACKCROWS', 'CDLHARAMI', 'CDLPIERCING', 'CDLDARKCLOUDCOVER']:
@@ -143,7 +138,7 @@ elif mode == "Backtest" and st.button("Run Backtest"):
         # Use full outputsize for backtesting
         extended_param = "&extended_hours=true" if include_extended else ""
         url = f"https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol={ticker}&interval={interval}&outputsize=full&apikey={API_KEY}{extended_param}"
-        resp = requests.get(url).json()
+        resp = get_json(url)
         
         if "Error Message" in resp:
             st.error(f"API Error: {resp['Error Message']}. Get free key at alphavantage.co")
@@ -151,13 +146,7 @@ elif mode == "Backtest" and st.button("Run Backtest"):
             st.error("Invalid ticker or no data. Try AAPL.")
         else:
             ts_key = f"Time Series ({interval})"
-            ts = resp[ts_key]
-            data = [{"timestamp": k, "open": v["1. open"], "high": v["2. high"], "low": v["3. low"], "close": v["4. close"], "volume": v["5. volume"]} for k, v in ts.items()]
-            df = pd.DataFrame(data)
-            df["timestamp"] = pd.to_datetime(df["timestamp"])
-            df.set_index("timestamp", inplace=True)
-            df = df.astype(float)
-            df.sort_index(inplace=True)
+            df = series_frame(resp[ts_key])
             
             # Calculate patterns for all candles
             for p in ['CDLDOJI', 'CDLHAMMER', 'CDLENGULFING', 'CDLMORNINGSTAR', 'CDLEVENINGSTAR',
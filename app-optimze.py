@@ -1,11 +1,12 @@
 # app.py
 import streamlit as st
 import pandas as pd
-import requests
 from talib import abstract
 from itertools import product
 import numpy as np
 
+from predictor.client import get_json, series_frame
+
 st.title("Candlestick Predictor + MACD (Live & Backtest)")
 
 API_KEY = st.secrets.get("ALPHA_VANTAGE_API_KEY", "demo")
@@ -168,23 +169,14 @@ if mode == "Live Prediction" and st.button("Predict"):
     with st.spinner("Fetching data..."):
         ext = "&extended_hours=true" if include_extended else ""
         url = f"https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol={ticker}&interval={interval}&outputsize=compact&apikey={API_KEY}{ext}"
-        data = requests.get(url).json()
+        data = get_json(url)
 
         if "Error Message" in data:
             st.error(data["Error Message"])
         elif f"Time Series ({interval})" not in data:
             st.error("No data – check ticker/API key")
         else:
-            df = pd.DataFrame([
-                {"timestamp": t,
-                 "open": float(v["1. open"]), "high": float(v["2. high"]),
-                 "low": float(v["3. low"]), "close": float(v["4. close"]),
-                 "volume": float(v["5. volume"])}
-                for t, v in data[f"Time Series ({interval})"].items()
-            ])
-            df["timestamp"] = pd.to_datetime(df["timestamp"])
-            df.set_index("timestamp", inplace=True)
-            df.sort_index(inplace=True)
+            df = series_frame(data[f"Time Series ({interval})"])
 
             # Indicators
             for p in ['CDLDOJI','CDLHAMMER','CDLENGULFING','CDLMORNINGSTAR','CDLEVENINGSTAR',
@@ -226,19 +218,12 @@ elif mode == "Backtest" and st.button("Run Backtest"):
     with st.spinner("Running full backtest..."):
         ext = "&extended_hours=true" if include_extended else ""
         url = f"https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol={ticker}&interval={interval}&outputsize=full&apikey={API_KEY}{ext}"
-        data = requests.get(url).json()
+        data = get_json(url)
 
         if "Error Message" in data or f"Time Series ({interval})" not in data:
             st.error("No data")
         else:
-            df = pd.DataFrame([
-                {"timestamp": t, "open": float(v["1. open"]), "high": float(v["2. high"]),
-                 "low": float(v["3. low"]), "close": float(v["4. close"]), "volume": float(v["5. volume"])}
-                for t, v in data[f"Time Series ({interval})"].items()
-            ])
-            df["timestamp"] = pd.to_datetime(df["timestamp"])
-            df.set_index("timestamp", inplace=True)
-            df.sort_index(inplace=True)
+            df = series_frame(data[f"Time Series ({interval})"])
 
             for p in ['CDLDOJI','CDLHAMMER','CDLENGULFING','CDLMORNINGSTAR','CDLEVENINGSTAR',
                       'CDL3WHITESOLDIERS','CDL3BLACKCROWS','CDLHARAMI','CDLPIERCING','CDLDARKCLOUDCOVER']:
@@ -293,20 +278,13 @@ elif mode == "Optimize Indicators" and st.button("Find Optimal Combination"):
     with st.spinner("Running Box-Behnken optimization (27 experiments)..."):
         ext = "&extended_hours=true" if include_extended else ""
         url = f"https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol={ticker}&interval={interval}&outputsize=full&apikey={API_KEY}{ext}"
-        data = requests.get(url).json()
+        data = get_json(url)
 
         if "Error Message" in data or f"Time Series ({interval})" not in data:
             st.error("No data")
         else:
             # Prepare data
-            df = pd.DataFrame([
-                {"timestamp": t, "open": float(v["1. open"]), "high": float(v["2. high"]),
-                 "low": float(v["3. low"]), "close": float(v["4. close"]), "volume": float(v["5. volume"])}
-                for t, v in data[f"Time Series ({interval})"].items()
-            ])
-            df["timestamp"] = pd.to_datetime(df["timestamp"])
-            df.set_index("timestamp", inplace=True)
-            df.sort_index(inplace=True)
+            df = series_frame(data[f"Time Series ({interval})"])
 
             # Calculate ALL indicators (always needed)
             for p in ['CDLDOJI','CDLHAMMER','CDLENGULFING','CDLMORNINGSTAR','CDLEVENINGSTAR',
@@ -1,12 +1,33 @@
 # app.py
 import streamlit as st
 import pandas as pd
-import requests
-from talib import abstract
-import asyncio
-from telegram import Bot
 import hashlib
 import os
+import sys
+import time
+import uuid
+
+from predictor.alerts import AlertDaemon, get_sender
+from predictor.backtest import run_backtest
+from predictor.barstore import BarStore
+from predictor.cache import BarCache
+from predictor.data import AlphaVantageError
+from predictor.data import fetch_data as load_bars
+from predictor.framecache import FrameCache
+from predictor.incremental import get_state
+from predictor.metrics import (AUTO_REFRESH_SESSIONS, FRAME_CACHE_BYTES, FRAME_CACHE_EVICTIONS, FRAME_CACHE_HITS,
+                               FRAME_CACHE_MISSES, SCORES, SIGNAL_DIRECTIONS, start_server)
+from predictor.optimizer import run_optimization
+from predictor.poller import get_poller, pollers
+from predictor.scanner import parse_watchlist, scan
+from predictor.scheduler import get_scheduler
+from predictor.scoring import calculate_score, signal_direction
+from predictor.sweep import DEFAULTS as SWEEP_DEFAULTS
+from predictor.sweep import random_search, successive_halving
+from predictor.timeframes import CONFLUENCE_TIMEFRAMES, base_interval, confluence, resample_bars
+from predictor.timing import Timings, stage
+from predictor.walkforward import walk_forward
+from predictor.workers import process_pool
 
 # Helper function to get secrets from either st.secrets or environment variables
 def get_secret(key, default=""):
@@ -15,6 +36,19 @@ def get_secret(key, default=""):
     except:
         return os.environ.get(key, default)
 
+# Prometheus metrics on $PREDICTOR_METRICS_PORT (text format at /metrics), one server per process
+@st.cache_resource
+def metrics_server():
+    if not os.environ.get("PREDICTOR_METRICS_PORT"):
+        return None
+    try:
+        return start_server()
+    except OSError as e:
+        print(f"metrics server not started: {e}", file=sys.stderr)
+        return None
+
+metrics_server()
+
 # Initialize session state for authentication
 if 'authenticated' not in st.session_state:
     st.session_state.authenticated = False
@@ -116,291 +150,118 @@ with st.sidebar:
         sensitivity = st.slider("Signal Threshold", 0, 10, 4)
 
 # Tabs
-tab1, tab2, tab3, tab4 = st.tabs(["Live Signal", "Backtest", "Optimize", "Messages"])
+tab1, tab2, tab3, tab4, tab5 = st.tabs(["Live Signal", "Backtest", "Optimize", "Messages", "Scanner"])
+
+# Shared data fetch function (served from the on-disk bar cache, topped up with new bars).
+# Every fetched bar is also kept in the local history, which outgrows a single full API response.
+# Built once for all reruns and sessions, so the pollers and the tabs share them
+@st.cache_resource
+def bar_files():
+    return BarCache(), BarStore()
+
+bar_cache, bar_store = bar_files()
+
+with st.sidebar:
+    with st.expander("History"):
+        history_source = st.radio("Backtest & Optimize Data", ["Latest from API", "Local Bar Store"],
+                                  help="The local bar store keeps every bar fetched so far, so it can reach further back than one API call")
+        history_start = history_end = None
+        if history_source == "Local Bar Store":
+            extent = bar_store.extent(ticker, interval, include_extended)
+            if extent is None:
+                st.caption("No bars stored for this ticker and interval yet.")
+            else:
+                first, last, count = extent
+                st.caption(f"{count:,} bars stored, {first:%Y-%m-%d} to {last:%Y-%m-%d}")
+                dates = st.date_input("Date Range", (first.date(), last.date()), min_value=first.date(), max_value=last.date())
+                if len(dates) == 2:
+                    history_start = pd.Timestamp(dates[0])
+                    history_end = pd.Timestamp(dates[1]) + pd.Timedelta(days=1) - pd.Timedelta(1)
+        history_key = (ticker, interval, include_extended, True if history_source == "Latest from API" else "store")
+    with st.expander("Diagnostics"):
+        record_timings = st.checkbox("Stage Timings", True,
+                                     help="Time the fetch, indicator, scoring and backtest stages of Live and Backtest runs (Debug Info); also logged as JSON to $PREDICTOR_TIMING_LOG")
+        profile_runs = st.checkbox("Profile Runs (cProfile)", False,
+                                   help="Profile each Live and Backtest run with cProfile; slows the run down")
+
+# Fetched frames and indicator columns kept in memory across reruns and sessions
+@st.cache_resource
+def frame_cache():
+    cache = FrameCache()
+    FRAME_CACHE_HITS.set_function(lambda: cache.stats['hits'])
+    FRAME_CACHE_MISSES.set_function(lambda: cache.stats['misses'])
+    FRAME_CACHE_EVICTIONS.set_function(lambda: cache.stats['evictions'])
+    FRAME_CACHE_BYTES.set_function(lambda: cache.bytes)
+    return cache
+
+# Sessions with Live auto-refresh on: session ID -> time it stops counting unless refreshed again
+@st.cache_resource
+def auto_refresh_sessions():
+    sessions = {}
+    AUTO_REFRESH_SESSIONS.set_function(lambda: sum(until > time.monotonic() for until in list(sessions.values())))
+    return sessions
+
+# Running alert daemons by chat ID, shared across sessions
+@st.cache_resource
+def alert_daemons():
+    return {}
 
-# Shared data fetch function
 def fetch_data(ticker, interval, extended, full=False):
-    size = "full" if full else "compact"
-    
-    # Determine which API function to use based on interval
-    if interval == "1day":
-        # Use TIME_SERIES_DAILY for daily data
-        url = f"https://www.alphavantage.co/query?function=TIME_SERIES_DAILY&symbol={ticker}&outputsize={size}&apikey={API_KEY}"
-        ts_key = "Time Series (Daily)"
-    elif interval == "1week":
-        # Use TIME_SERIES_WEEKLY for weekly data
-        url = f"https://www.alphavantage.co/query?function=TIME_SERIES_WEEKLY&symbol={ticker}&apikey={API_KEY}"
-        ts_key = "Weekly Time Series"
-    else:
-        # Use TIME_SERIES_INTRADAY for minute-level data
-        extended_param = "&extended_hours=true" if extended else ""
-        url = f"https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol={ticker}&interval={interval}&outputsize={size}&apikey={API_KEY}{extended_param}&adjusted=false"
-        ts_key = f"Time Series ({interval})"
-    
-    resp = requests.get(url).json()
-    
-    # Check for rate limit or errors
-    if "Note" in resp:
-        st.warning(f"⚠️ API Note: {resp['Note']}")
-        return None
-    if "Error Message" in resp:
-        st.error(f"API Error: {resp['Error Message']}")
-        return None
-    if "Information" in resp:
-        st.error(f"API Info: {resp['Information']}")
+    try:
+        return frame_cache().frame((ticker, interval, extended, full),
+                                   lambda: load_bars(ticker, interval, extended, full, api_key=API_KEY, cache=bar_cache, store=bar_store))
+    except AlphaVantageError as e:
+        # Check for rate limit (still throttled after the scheduler's retries) or errors
+        if e.kind == "Note":
+            st.warning(f"⚠️ API Note: {e}")
+        elif e.kind == "Error Message":
+            st.error(f"API Error: {e}")
+        elif e.kind == "Information":
+            st.error(f"API Info: {e}")
+        else:
+            st.error(str(e))
         return None
-        
-    if ts_key not in resp:
-        st.error("No data. Check ticker.")
+    except ValueError as e:  # a ticker the caches can't store
+        st.error(str(e))
         return None
-    df = pd.DataFrame.from_dict(resp[ts_key], orient="index")
-    df = df.astype(float)
-    df.index = pd.to_datetime(df.index)
-    # Localize to US/Eastern timezone (Alpha Vantage uses ET)
-    if df.index.tzinfo is None:
-        df.index = df.index.tz_localize('US/Eastern')
-    df.sort_index(inplace=True)
-    df.columns = ["open", "high", "low", "close", "volume"]
-    return df
 
-# Calculate all advanced indicators
-def calculate_indicators(df, use_momentum, use_trend, use_macd, use_obv, use_stoch_rsi, use_fibonacci, use_msb, use_supply_demand):
-    # MACD
-    if use_macd:
-        df['MACD'], df['MACD_signal'], df['MACD_hist'] = abstract.MACD(df, fastperiod=12, slowperiod=26, signalperiod=9)
-    
-    # RSI and Volume
-    if use_momentum:
-        df['RSI'] = abstract.RSI(df, timeperiod=14)
-        df['volume_sma'] = df['volume'].rolling(window=20).mean()
-        df['volume_ratio'] = df['volume'] / df['volume_sma']
-    
-    # Trend (SMA)
-    if use_trend:
-        df['SMA_20'] = df['close'].rolling(window=20).mean()
-        df['SMA_50'] = df['close'].rolling(window=50).mean()
-        df['SMA_200'] = df['close'].rolling(window=200).mean()
-    
-    # On-Balance Volume
-    if use_obv:
-        df['OBV'] = (df['volume'] * ((df['close'] > df['close'].shift(1)).astype(int) - (df['close'] < df['close'].shift(1)).astype(int))).cumsum()
-        df['OBV_SMA'] = df['OBV'].rolling(window=20).mean()
-    
-    # Stochastic RSI
-    if use_stoch_rsi:
-        rsi = abstract.RSI(df, timeperiod=14)
-        stoch_rsi = (rsi - rsi.rolling(14).min()) / (rsi.rolling(14).max() - rsi.rolling(14).min()) * 100
-        df['STOCH_RSI'] = stoch_rsi
-    
-    # Fibonacci Retracement Levels
-    if use_fibonacci:
-        lookback = min(50, len(df))
-        recent = df.iloc[-lookback:]
-        high = recent['high'].max()
-        low = recent['low'].min()
-        diff = high - low
-        df['FIB_236'] = high - 0.236 * diff
-        df['FIB_382'] = high - 0.382 * diff
-        df['FIB_500'] = high - 0.500 * diff
-        df['FIB_618'] = high - 0.618 * diff
-    
-    # Market Structure Break
-    if use_msb:
-        df['swing_high'] = df['high'].rolling(window=5, center=True).max()
-        df['swing_low'] = df['low'].rolling(window=5, center=True).min()
-        df['is_swing_high'] = df['high'] == df['swing_high']
-        df['is_swing_low'] = df['low'] == df['swing_low']
-    
-    # Supply and Demand Zones
-    if use_supply_demand:
-        df['supply_zone'] = df['high'].rolling(window=20).quantile(0.95)
-        df['demand_zone'] = df['low'].rolling(window=20).quantile(0.05)
-    
-    return df
+# Timer for one Live or Backtest run; the stages inside come from the predictor modules
+def timed_run(run):
+    return Timings(run, enabled=record_timings, profile=profile_runs,
+                   user=st.session_state.username, ticker=ticker, interval=interval)
 
-# Advanced scoring function
-def calculate_score(current, df, use_momentum, use_trend, use_macd, use_obv, use_stoch_rsi, use_fibonacci, use_msb, use_supply_demand, sensitivity):
-    score = 0
-    signals = []
-    
-    # 1. Candlestick patterns
-    if current['CDLENGULFING'] == 100: score += 3; signals.append("Bullish Engulfing")
-    if current['CDLENGULFING'] == -100: score -= 3; signals.append("Bearish Engulfing")
-    if current['CDLMORNINGSTAR'] == 100: score += 4; signals.append("Morning Star")
-    if current['CDLEVENINGSTAR'] == -100: score -= 4; signals.append("Evening Star")
-    if current['CDLHAMMER'] == 100: score += 2; signals.append("Hammer")
-    if current['CDLDOJI'] == 100: score += 1; signals.append("Doji")
-    if current['CDL3WHITESOLDIERS'] == 100: score += 3; signals.append("Three White Soldiers")
-    if current['CDL3BLACKCROWS'] == -100: score -= 3; signals.append("Three Black Crows")
-    if current['CDLHARAMI'] == 100: score += 2; signals.append("Bullish Harami")
-    if current['CDLPIERCING'] == 100: score += 2; signals.append("Piercing Pattern")
-    if current['CDLDARKCLOUDCOVER'] == -100: score -= 2; signals.append("Dark Cloud Cover")
-    
-    # 2. MACD Signals (Strongest momentum filter)
-    if use_macd and 'MACD' in current:
-        try:
-            if not pd.isna(current['MACD']):
-                macd = float(current['MACD'])
-                signal = float(current['MACD_signal'])
-                hist = float(current['MACD_hist'])
-                prev_hist = float(df['MACD_hist'].iloc[-2]) if len(df) > 1 and not pd.isna(df['MACD_hist'].iloc[-2]) else 0.0
-                
-                # Bullish MACD
-                if macd > signal and hist > 0:
-                    score += 4
-                    signals.append("MACD Bullish")
-                if macd > signal and hist > prev_hist and hist > 0:
-                    score += 5
-                    signals.append("MACD Momentum Surge")
-                if macd > 0 and macd > signal:
-                    score += 6
-                    signals.append("MACD Above Zero (Strong Bull)")
-                
-                # Bearish MACD
-                if macd < signal and hist < 0:
-                    score -= 4
-                    signals.append("MACD Bearish")
-                if hist < prev_hist and hist < 0:
-                    score -= 5
-                    signals.append("MACD Momentum Fade")
-                if macd < 0 and macd < signal:
-                    score -= 6
-                    signals.append("MACD Below Zero (Strong Bear)")
-        except (ValueError, TypeError, KeyError):
-            pass
-    
-    # 3. RSI Divergence + Volume Spike
-    if use_momentum and 'RSI' in current and not pd.isna(current['RSI']):
-        rsi_val = float(current['RSI'])
-        recent = df.iloc[-10:] if len(df) >= 10 else df
-        
-        # RSI Divergence
-        if len(recent) >= 3:
-            if recent['close'].is_monotonic_decreasing and recent['RSI'].is_monotonic_increasing and rsi_val < 45:
-                score += 7
-                signals.append("Bullish RSI Divergence")
-            if recent['close'].is_monotonic_increasing and recent['RSI'].is_monotonic_decreasing and rsi_val > 55:
-                score -= 7
-                signals.append("Bearish RSI Divergence")
-        
-        # Standard RSI levels
-        if rsi_val < 30:
-            score += 2
-            signals.append("RSI Oversold")
-        elif rsi_val > 70:
-            score -= 2
-            signals.append("RSI Overbought")
-        
-        # Volume confirmation
-        if 'volume_ratio' in current and float(current['volume_ratio']) > 2.0:
-            score += 3 if score > 0 else -3
-            signals.append("Volume Explosion")
-        elif 'volume_ratio' in current and float(current['volume_ratio']) > 1.5:
-            if score > 0:
-                score += 1
-                signals.append("High Volume (Bullish)")
-            elif score < 0:
-                score -= 1
-                signals.append("High Volume (Bearish)")
-    
-    # 4. Trend Filter – Kill counter-trend noise (Golden Cross)
-    if use_trend and 'SMA_20' in current and 'SMA_50' in current:
-        if not pd.isna(current['SMA_20']) and not pd.isna(current['SMA_50']):
-            # Price position relative to SMAs
-            if float(current['close']) > float(current['SMA_20']) and float(current['close']) > float(current['SMA_50']):
-                score += 2
-                signals.append("Uptrend (Above SMAs)")
-            elif float(current['close']) < float(current['SMA_20']) and float(current['close']) < float(current['SMA_50']):
-                score -= 2
-                signals.append("Downtrend (Below SMAs)")
-            
-            # Golden/Death Cross
-            if float(current['SMA_20']) > float(current['SMA_50']):
-                prev_20 = float(df['SMA_20'].iloc[-2]) if len(df) > 1 else float(current['SMA_20'])
-                prev_50 = float(df['SMA_50'].iloc[-2]) if len(df) > 1 else float(current['SMA_50'])
-                if prev_20 <= prev_50:  # Just crossed
-                    score += 5
-                    signals.append("Golden Cross (Fresh)")
-                else:
-                    score += 1
-                    signals.append("Golden Cross")
-            elif float(current['SMA_20']) < float(current['SMA_50']):
-                prev_20 = float(df['SMA_20'].iloc[-2]) if len(df) > 1 else float(current['SMA_20'])
-                prev_50 = float(df['SMA_50'].iloc[-2]) if len(df) > 1 else float(current['SMA_50'])
-                if prev_20 >= prev_50:  # Just crossed
-                    score -= 5
-                    signals.append("Death Cross (Fresh)")
-                else:
-                    score -= 1
-                    signals.append("Death Cross")
-            
-            # Strong trend filter using SMA_200
-            if 'SMA_200' in current and not pd.isna(current['SMA_200']):
-                if float(current['close']) > float(current['SMA_200']):
-                    score = max(score, 0)  # Only bullish signals
-                else:
-                    score = min(score, 0)  # Only bearish signals
-    
-    # 5. On-Balance Volume
-    if use_obv and 'OBV' in current and 'OBV_SMA' in current:
-        if not pd.isna(current['OBV']) and not pd.isna(current['OBV_SMA']):
-            if float(current['OBV']) > float(current['OBV_SMA']):
-                score += 2
-                signals.append("OBV Bullish (Accumulation)")
-            else:
-                score -= 2
-                signals.append("OBV Bearish (Distribution)")
-    
-    # 6. Stochastic RSI
-    if use_stoch_rsi and 'STOCH_RSI' in current and not pd.isna(current['STOCH_RSI']):
-        if float(current['STOCH_RSI']) < 20:
-            score += 3
-            signals.append("Stoch RSI Oversold")
-        elif float(current['STOCH_RSI']) > 80:
-            score -= 3
-            signals.append("Stoch RSI Overbought")
-    
-    # 7. Fibonacci Retracements
-    if use_fibonacci and 'FIB_618' in current:
-        price = float(current['close'])
-        if not pd.isna(current['FIB_618']):
-            # Price at key Fibonacci levels
-            if abs(price - float(current['FIB_618'])) / price < 0.005:  # Within 0.5%
-                score += 4
-                signals.append("At Fib 61.8% (Golden Ratio)")
-            elif abs(price - float(current['FIB_500'])) / price < 0.005:
-                score += 2
-                signals.append("At Fib 50%")
-            elif abs(price - float(current['FIB_382'])) / price < 0.005:
-                score += 2
-                signals.append("At Fib 38.2%")
-    
-    # 8. Market Structure Break
-    if use_msb and 'is_swing_high' in current and 'is_swing_low' in current:
-        recent_highs = df[df['is_swing_high'] == True].tail(2)
-        recent_lows = df[df['is_swing_low'] == True].tail(2)
-        
-        # Break of structure (BOS)
-        if len(recent_highs) >= 2 and float(current['close']) > float(recent_highs.iloc[-1]['high']):
-            score += 5
-            signals.append("Market Structure Break (Bullish)")
-        if len(recent_lows) >= 2 and float(current['close']) < float(recent_lows.iloc[-1]['low']):
-            score -= 5
-            signals.append("Market Structure Break (Bearish)")
-    
-    # 9. Supply and Demand Zones
-    if use_supply_demand and 'supply_zone' in current and 'demand_zone' in current:
-        if not pd.isna(current['supply_zone']) and not pd.isna(current['demand_zone']):
-            # Price at supply zone (resistance)
-            if float(current['close']) >= float(current['supply_zone']):
-                score -= 3
-                signals.append("At Supply Zone (Resistance)")
-            # Price at demand zone (support)
-            elif float(current['close']) <= float(current['demand_zone']):
-                score += 3
-                signals.append("At Demand Zone (Support)")
-    
-    return score, signals
+def show_timings(timings, where):
+    if timings is None or not timings.enabled:
+        st.caption("Stage timings are off (sidebar → Diagnostics).")
+        return
+    rows = timings.rows()
+    total_ms = timings.total * 1000
+    st.dataframe(pd.DataFrame({
+        'Stage': ["\u2003" * depth + path.rsplit("/", 1)[-1] for path, depth, _, _ in rows],
+        'ms': [ms for _, _, ms, _ in rows],
+        'Calls': [calls for _, _, _, calls in rows],
+        'Share': [ms / total_ms if total_ms else 0.0 for _, _, ms, _ in rows],
+    }).style.format({'ms': '{:.1f}', 'Share': '{:.0%}'}), use_container_width=True, hide_index=True)
+    st.caption(f"Total {total_ms:.1f} ms. Indented stages are part of the one above; cached stages don't show up.")
+    if timings.profile_error:
+        st.warning(f"Profiler unavailable: {timings.profile_error}")
+    profile = timings.profile_text()
+    if profile:
+        st.code(profile)
+        st.download_button("Download Profile (.prof)", timings.profile_bytes(), file_name=f"{timings.run}.prof",
+                           key=f"profile_{where}_{timings.run}")
+
+# History for the Backtest and Optimize tabs: the latest full API series, or a date range of the bar store
+def load_history(ticker, interval, extended):
+    if history_source == "Latest from API":
+        return fetch_data(ticker, interval, extended, full=True)
+    # Read straight from the memory-mapped files, only the bars in the range are touched
+    df = bar_store.frame(ticker, interval, extended, history_start, history_end)
+    if len(df) == 0:
+        st.error(f"❌ No stored bars for {ticker} {interval} in that range. Fetch it once with 'Latest from API' "
+                 "or import the bar cache with `python -m predictor store import`.")
+        return None
+    return df
 
 with tab1:
     st.header("Live Signal")
@@ -425,245 +286,258 @@ with tab1:
     with col_btn1:
         manual_refresh = st.button("🔄 Get Live Prediction", key="live", use_container_width=True, type="primary")
     with col_btn2:
-        auto_refresh = st.checkbox("Auto-Refresh", value=False, help="Automatically refresh data every 30 seconds (for 1min/5min intervals)")
+        auto_refresh = st.checkbox("Auto-Refresh", value=False, help="Fetch each new candle in the background as it closes and update this page")
     with col_refresh:
         if auto_refresh:
-            refresh_interval = st.selectbox("Refresh Rate", [30, 60, 120], format_func=lambda x: f"{x}s", index=0)
+            refresh_interval = st.selectbox("Refresh Rate", [10, 30, 60], format_func=lambda x: f"{x}s", index=0,
+                                            help="How often this page picks up the background poller's latest result")
         else:
             refresh_interval = None
     
-    # Auto-refresh logic
-    if auto_refresh and refresh_interval:
-        import time
-        time.sleep(refresh_interval)
-        st.rerun()
+    live_flags = (use_momentum, use_trend, use_macd, use_obv, use_stoch_rsi, use_fibonacci, use_msb, use_supply_demand)
     
-    if manual_refresh or auto_refresh:
-        with st.spinner("Fetching real-time data..."):
-            df = fetch_data(ticker, interval, include_extended)
-            if df is None: st.stop()
-            
-            # Calculate all candlestick patterns
-            for p in ['CDLDOJI', 'CDLHAMMER', 'CDLENGULFING', 'CDLMORNINGSTAR', 'CDLEVENINGSTAR',
-                      'CDL3WHITESOLDIERS', 'CDL3BLACKCROWS', 'CDLHARAMI', 'CDLPIERCING', 'CDLDARKCLOUDCOVER']:
-                df[p] = getattr(abstract, p)(df)
-            
-            # Calculate all indicators
-            df = calculate_indicators(df, use_momentum, use_trend, use_macd, use_obv, use_stoch_rsi, use_fibonacci, use_msb, use_supply_demand)
-            
-            latest = df.iloc[-1]
-            latest_time = df.index[-1]
-            current_time = pd.Timestamp.now(tz='US/Eastern')
-            
-            # Calculate data freshness (both are now timezone-aware)
-            time_diff = current_time - latest_time
-            minutes_old = int(time_diff.total_seconds() / 60)
+    def live_score(df):
+        # Only the Live tab's scores (and the alert daemon's) are counted in the score metrics
+        score, signals = calculate_score(df, *live_flags)
+        SCORES.observe(score)
+        SIGNAL_DIRECTIONS.inc(direction=signal_direction(score, sensitivity))
+        return score, signals
+    
+    def show_live_signal(df, fetched_at, scored, timings):
+        latest = df.iloc[-1]
+        latest_time = df.index[-1]
+        current_time = pd.Timestamp.now(tz='US/Eastern')
+        
+        # Calculate data freshness (both are now timezone-aware)
+        time_diff = current_time - latest_time
+        minutes_old = int(time_diff.total_seconds() / 60)
+        
+        # Determine market status
+        current_hour = current_time.hour
+        current_minute = current_time.minute
+        current_weekday = current_time.weekday()
+        latest_hour = latest_time.hour
+        
+        is_weekend = current_weekday >= 5
+        # Market is open 9:30 AM - 4:00 PM ET (9.5 to 16.0 in decimal hours)
+        current_time_decimal = current_hour + (current_minute / 60.0)
+        is_market_open = (9.5 <= current_time_decimal < 16.0) and not is_weekend
+        is_after_hours = latest_hour < 9 or latest_hour >= 16
+        market_session = "After Hours" if is_after_hours else "Regular Hours"
+        
+        # Data freshness indicator - only meaningful during market hours
+        interval_minutes = {"1min": 1, "5min": 5, "15min": 15, "30min": 30, "60min": 60, "1day": 1440, "1week": 10080}
+        expected_delay = interval_minutes.get(interval, 15)
+        # Calculate freshness based on market hours (for daily/weekly, more lenient)
+        is_fresh = minutes_old <= (expected_delay + 5)
+        
+        # Create sub-tabs for Live Signal and Debug Info
+        signal_tab, debug_tab = st.tabs(["📊 Prediction", "🔍 Debug Info"])
+        
+        with signal_tab:
+            # Market status banner - ONLY show freshness during actual market hours
+            # Priority: Weekend > Closed hours > Market open with freshness check
+            if is_weekend:
+                st.info(f"📅 **WEEKEND** - Market Closed | Showing Last Trading Session: {latest_time.strftime('%a %m/%d %I:%M %p')}")
+            elif not is_market_open:
+                if current_hour < 9 or (current_hour == 9 and current_minute < 30):
+                    st.info(f"🌅 **PRE-MARKET** - Opens at 9:30 AM ET | Last Close: {latest_time.strftime('%a %m/%d %I:%M %p')}")
+                else:
+                    st.info(f"🌆 **AFTER-HOURS** - Closed at 4:00 PM ET | Last Session: {latest_time.strftime('%a %m/%d %I:%M %p')}")
+            else:
+                # Market IS OPEN (Mon-Fri 9:30 AM - 4:00 PM ET) - show actual data freshness
+                if is_fresh:
+                    st.success(f"🟢 **LIVE DATA** - Market Open | Updated {minutes_old} min ago | {latest_time.strftime('%I:%M %p')}")
+                else:
+                    st.warning(f"⚠️ **DELAYED DATA** - Data is {minutes_old} min old (Expected: ≤{expected_delay + 5} min) | {latest_time.strftime('%I:%M %p')}")
             
-            # Determine market status
-            current_hour = current_time.hour
-            current_minute = current_time.minute
-            current_weekday = current_time.weekday()
-            latest_hour = latest_time.hour
+            score, signals = scored
+            score = float(score)  # Ensure score is numeric
             
-            is_weekend = current_weekday >= 5
-            # Market is open 9:30 AM - 4:00 PM ET (9.5 to 16.0 in decimal hours)
-            current_time_decimal = current_hour + (current_minute / 60.0)
-            is_market_open = (9.5 <= current_time_decimal < 16.0) and not is_weekend
-            is_after_hours = latest_hour < 9 or latest_hour >= 16
-            market_session = "After Hours" if is_after_hours else "Regular Hours"
+            direction = "BULLISH" if score > sensitivity else "BEARISH" if score < -sensitivity else "NEUTRAL"
+            color = "green" if direction=="BULLISH" else "red" if direction=="BEARISH" else "gray"
             
-            # Data freshness indicator - only meaningful during market hours
-            interval_minutes = {"1min": 1, "5min": 5, "15min": 15, "30min": 30, "60min": 60, "1day": 1440, "1week": 10080}
-            expected_delay = interval_minutes.get(interval, 15)
-            # Calculate freshness based on market hours (for daily/weekly, more lenient)
-            is_fresh = minutes_old <= (expected_delay + 5)
+            # After-hours volatility warning
+            volatility_note = ""
+            if is_after_hours:
+                volatility_note = " ⚠️ *Note: After-hours trading typically has lower volume and higher volatility*"
             
-            # Create sub-tabs for Live Signal and Debug Info
-            signal_tab, debug_tab = st.tabs(["📊 Prediction", "🔍 Debug Info"])
+            st.markdown(f"### Next {interval} ({market_session}) → **:{color}[{direction}]**{volatility_note}")
+            st.write("**Patterns:**", ", ".join(signals) or "None")
+            st.write(f"**Signal Strength:** {score}")
             
-            with signal_tab:
-                # Market status banner - ONLY show freshness during actual market hours
-                # Priority: Weekend > Closed hours > Market open with freshness check
-                if is_weekend:
-                    st.info(f"📅 **WEEKEND** - Market Closed | Showing Last Trading Session: {latest_time.strftime('%a %m/%d %I:%M %p')}")
-                elif not is_market_open:
-                    if current_hour < 9 or (current_hour == 9 and current_minute < 30):
-                        st.info(f"🌅 **PRE-MARKET** - Opens at 9:30 AM ET | Last Close: {latest_time.strftime('%a %m/%d %I:%M %p')}")
-                    else:
-                        st.info(f"🌆 **AFTER-HOURS** - Closed at 4:00 PM ET | Last Session: {latest_time.strftime('%a %m/%d %I:%M %p')}")
+            # Timestamp info
+            st.caption(f"📡 Data fetched from Alpha Vantage at: {fetched_at.strftime('%I:%M:%S %p %Z')}")
+            st.caption(f"📊 Latest candle timestamp: {latest_time.strftime('%a %m/%d %I:%M %p %Z')}")
+        
+        with debug_tab:
+            st.write("**Stage Timings (this refresh):**")
+            show_timings(timings, "live")
+            if st.session_state.get('backtest_timings') is not None:
+                st.write("**Stage Timings (last backtest):**")
+                show_timings(st.session_state.backtest_timings, "live")
+            st.write("**API & Data Info:**")
+            st.write(f"🔌 API Endpoint: TIME_SERIES_INTRADAY (adjusted=false, real-time)")
+            cache = frame_cache()
+            st.write(f"🗄️ Frame Cache{' (compact)' if cache.compact else ''}: {cache.bytes / 1e6:.1f} MB in {len(cache.entries)} entries | "
+                     f"hits {cache.stats['hits']}, misses {cache.stats['misses']}, evictions {cache.stats['evictions']}")
+            sched = get_scheduler().metrics()
+            queued = ", ".join(f"{lane} {n}" for lane, n in sched['queue_depth'].items())
+            st.write(f"📬 API Scheduler: queued {queued} | wait avg {sched['wait_ms_avg']:.0f} ms, "
+                     f"p95 {sched['wait_ms_p95']:.0f} ms | calls {sched['calls']}, throttled {sched['throttled']}, "
+                     f"retries {sched['retries']}, coalesced {sched['coalesced']}")
+            running = pollers()
+            st.write(f"🔁 Background Pollers: {len(running)} running | "
+                     f"polls {sum(p.stats['polls'] for p in running)}, errors {sum(p.stats['errors'] for p in running)}")
+            st.write(f"⏱️ Fetch Time: {fetched_at.strftime('%Y-%m-%d %I:%M:%S %p %Z')}")
+            st.write(f"📊 Total Candles Retrieved: {len(df)}")
+            st.write(f"📅 Data Range: {df.index[0].strftime('%m/%d %I:%M %p')} to {df.index[-1].strftime('%m/%d %I:%M %p')}")
+            st.write(f"⏲️ Latest Candle: {latest_time.strftime('%Y-%m-%d %H:%M')} ({market_session})")
+            st.write(f"⌚ Data Age: {minutes_old} minutes (Expected: ≤{expected_delay + 5} min during market hours)")
+            st.write(f"🏦 Market Status: {'OPEN' if is_market_open else 'CLOSED'} | Weekend: {is_weekend}")
+            st.write(f"🔍 Debug - current_time_decimal: {current_time_decimal:.2f}, is_market_open: {is_market_open}, is_fresh: {is_fresh}")
+            st.write(f"🔍 Debug - Current: {current_time.strftime('%a %H:%M')} | Weekday: {current_weekday} (5+ = weekend)")
+            st.write("")
+            st.write("**Latest OHLC:**")
+            st.write(f"Open: {float(latest['open']):.2f}, High: {float(latest['high']):.2f}, Low: {float(latest['low']):.2f}, Close: {float(latest['close']):.2f}")
+            st.write(f"Pattern Values - CDLENGULFING: {latest['CDLENGULFING']}, CDLMORNINGSTAR: {latest['CDLMORNINGSTAR']}, CDLEVENINGSTAR: {latest['CDLEVENINGSTAR']}")
+            st.write(f"CDLHAMMER: {latest['CDLHAMMER']}, CDLDOJI: {latest['CDLDOJI']}, CDL3WHITESOLDIERS: {latest['CDL3WHITESOLDIERS']}, CDL3BLACKCROWS: {latest['CDL3BLACKCROWS']}")
+            st.write(f"CDLHARAMI: {latest['CDLHARAMI']}, CDLPIERCING: {latest['CDLPIERCING']}, CDLDARKCLOUDCOVER: {latest['CDLDARKCLOUDCOVER']}")
+            if use_macd and 'MACD' in latest:
+                try:
+                    st.write(f"MACD: {float(latest['MACD']):.4f}, Signal: {float(latest['MACD_signal']):.4f}, Hist: {float(latest['MACD_hist']):.4f}" if not pd.isna(latest['MACD']) else "MACD: N/A")
+                except (ValueError, TypeError):
+                    st.write("MACD: N/A")
+            if use_momentum:
+                try:
+                    st.write(f"RSI: {float(latest['RSI']):.2f}" if not pd.isna(latest['RSI']) else "RSI: N/A")
+                    st.write(f"Volume Ratio: {float(latest['volume_ratio']):.2f}" if not pd.isna(latest['volume_ratio']) else "Volume Ratio: N/A")
+                except (ValueError, TypeError):
+                    st.write("RSI/Volume: N/A")
+            if use_trend:
+                try:
+                    st.write(f"SMA_20: {float(latest['SMA_20']):.2f}, SMA_50: {float(latest['SMA_50']):.2f}" if not pd.isna(latest['SMA_20']) else "SMAs: N/A")
+                except (ValueError, TypeError):
+                    st.write("SMAs: N/A")
+            if use_obv and 'OBV' in latest:
+                try:
+                    st.write(f"OBV: {float(latest['OBV']):.0f}" if not pd.isna(latest['OBV']) else "OBV: N/A")
+                except (ValueError, TypeError):
+                    st.write("OBV: N/A")
+            if use_stoch_rsi and 'STOCH_RSI' in latest:
+                try:
+                    st.write(f"Stochastic RSI: {float(latest['STOCH_RSI']):.2f}" if not pd.isna(latest['STOCH_RSI']) else "Stoch RSI: N/A")
+                except (ValueError, TypeError):
+                    st.write("Stoch RSI: N/A")
+            if use_fibonacci and 'FIB_618' in latest:
+                try:
+                    st.write(f"Fib Levels - 61.8%: {float(latest['FIB_618']):.2f}, 50%: {float(latest['FIB_500']):.2f}, 38.2%: {float(latest['FIB_382']):.2f}" if not pd.isna(latest['FIB_618']) else "Fib: N/A")
+                except (ValueError, TypeError):
+                    st.write("Fib: N/A")
+
+    if auto_refresh:
+        # One background poller per series fetches each new candle for every viewer;
+        # this fragment only reads its latest result, so rendering never waits on the API
+        poller = get_poller(ticker, interval, include_extended,
+                            lambda: load_bars(ticker, interval, include_extended, api_key=API_KEY, cache=bar_cache,
+                                      max_age=0, store=bar_store))
+        
+        session_id = st.session_state.setdefault('session_id', uuid.uuid4().hex)
+        
+        @st.fragment(run_every=refresh_interval)
+        def live_updates():
+            # Counted as long as the fragment keeps rerunning
+            sessions = auto_refresh_sessions()
+            now = time.monotonic()
+            for expired in [sid for sid, until in list(sessions.items()) if until < now]:
+                sessions.pop(expired, None)
+            sessions[session_id] = now + 3 * refresh_interval
+            snapshot = poller.subscribe(live_flags)
+            if snapshot is None:
+                if poller.error:
+                    st.error(f"API Error: {poller.error}")
                 else:
-                    # Market IS OPEN (Mon-Fri 9:30 AM - 4:00 PM ET) - show actual data freshness
-                    if is_fresh:
-                        st.success(f"🟢 **LIVE DATA** - Market Open | Updated {minutes_old} min ago | {latest_time.strftime('%I:%M %p')}")
-                    else:
-                        st.warning(f"⚠️ **DELAYED DATA** - Data is {minutes_old} min old (Expected: ≤{expected_delay + 5} min) | {latest_time.strftime('%I:%M %p')}")
-                
-                score, signals = calculate_score(latest, df, use_momentum, use_trend, use_macd, use_obv, use_stoch_rsi, use_fibonacci, use_msb, use_supply_demand, sensitivity)
-                score = float(score)  # Ensure score is numeric
-                
-                direction = "BULLISH" if score > sensitivity else "BEARISH" if score < -sensitivity else "NEUTRAL"
-                color = "green" if direction=="BULLISH" else "red" if direction=="BEARISH" else "gray"
-                
-                # After-hours volatility warning
-                volatility_note = ""
-                if is_after_hours:
-                    volatility_note = " ⚠️ *Note: After-hours trading typically has lower volume and higher volatility*"
-                
-                st.markdown(f"### Next {interval} ({market_session}) → **:{color}[{direction}]**{volatility_note}")
-                st.write("**Patterns:**", ", ".join(signals) or "None")
-                st.write(f"**Signal Strength:** {score}")
+                    st.info("⏳ Waiting for the first poll...")
+                return
+            if snapshot['error']:
+                st.warning(f"⚠️ Last poll failed, showing the previous data: {snapshot['error']}")
+            # The poller fetched and computed the indicators in the background, only scoring happens here
+            df = snapshot['frame']
+            with timed_run("live") as timings:
+                with stage("score"):
+                    scored = live_score(df)
+            show_live_signal(df, snapshot['fetched_at'], scored, timings)
+            st.caption(f"🔁 Next poll at candle close: {snapshot['next_poll'].strftime('%I:%M:%S %p %Z')}")
+        
+        live_updates()
+    elif manual_refresh:
+        with st.spinner("Fetching real-time data..."):
+            with timed_run("live") as timings:
+                with stage("fetch"):
+                    df = fetch_data(ticker, interval, include_extended)
+                if df is None: st.stop()
                 
-                # Timestamp info
-                st.caption(f"📡 Data fetched from Alpha Vantage at: {current_time.strftime('%I:%M:%S %p %Z')}")
-                st.caption(f"📊 Latest candle timestamp: {latest_time.strftime('%a %m/%d %I:%M %p %Z')}")
-            
-            with debug_tab:
-                st.write("**API & Data Info:**")
-                st.write(f"🔌 API Endpoint: TIME_SERIES_INTRADAY (adjusted=false, real-time)")
-                st.write(f"⏱️ Fetch Time: {current_time.strftime('%Y-%m-%d %I:%M:%S %p %Z')}")
-                st.write(f"📊 Total Candles Retrieved: {len(df)}")
-                st.write(f"📅 Data Range: {df.index[0].strftime('%m/%d %I:%M %p')} to {df.index[-1].strftime('%m/%d %I:%M %p')}")
-                st.write(f"⏲️ Latest Candle: {latest_time.strftime('%Y-%m-%d %H:%M')} ({market_session})")
-                st.write(f"⌚ Data Age: {minutes_old} minutes (Expected: ≤{expected_delay + 5} min during market hours)")
-                st.write(f"🏦 Market Status: {'OPEN' if is_market_open else 'CLOSED'} | Weekend: {is_weekend}")
-                st.write(f"🔍 Debug - current_time_decimal: {current_time_decimal:.2f}, is_market_open: {is_market_open}, is_fresh: {is_fresh}")
-                st.write(f"🔍 Debug - Current: {current_time.strftime('%a %H:%M')} | Weekday: {current_weekday} (5+ = weekend)")
-                st.write("")
-                st.write("**Latest OHLC:**")
-                st.write(f"Open: {float(latest['open']):.2f}, High: {float(latest['high']):.2f}, Low: {float(latest['low']):.2f}, Close: {float(latest['close']):.2f}")
-                st.write(f"Pattern Values - CDLENGULFING: {latest['CDLENGULFING']}, CDLMORNINGSTAR: {latest['CDLMORNINGSTAR']}, CDLEVENINGSTAR: {latest['CDLEVENINGSTAR']}")
-                st.write(f"CDLHAMMER: {latest['CDLHAMMER']}, CDLDOJI: {latest['CDLDOJI']}, CDL3WHITESOLDIERS: {latest['CDL3WHITESOLDIERS']}, CDL3BLACKCROWS: {latest['CDL3BLACKCROWS']}")
-                st.write(f"CDLHARAMI: {latest['CDLHARAMI']}, CDLPIERCING: {latest['CDLPIERCING']}, CDLDARKCLOUDCOVER: {latest['CDLDARKCLOUDCOVER']}")
-                if use_macd and 'MACD' in latest:
-                    try:
-                        st.write(f"MACD: {float(latest['MACD']):.4f}, Signal: {float(latest['MACD_signal']):.4f}, Hist: {float(latest['MACD_hist']):.4f}" if not pd.isna(latest['MACD']) else "MACD: N/A")
-                    except (ValueError, TypeError):
-                        st.write("MACD: N/A")
-                if use_momentum:
-                    try:
-                        st.write(f"RSI: {float(latest['RSI']):.2f}" if not pd.isna(latest['RSI']) else "RSI: N/A")
-                        st.write(f"Volume Ratio: {float(latest['volume_ratio']):.2f}" if not pd.isna(latest['volume_ratio']) else "Volume Ratio: N/A")
-                    except (ValueError, TypeError):
-                        st.write("RSI/Volume: N/A")
-                if use_trend:
-                    try:
-                        st.write(f"SMA_20: {float(latest['SMA_20']):.2f}, SMA_50: {float(latest['SMA_50']):.2f}" if not pd.isna(latest['SMA_20']) else "SMAs: N/A")
-                    except (ValueError, TypeError):
-                        st.write("SMAs: N/A")
-                if use_obv and 'OBV' in latest:
-                    try:
-                        st.write(f"OBV: {float(latest['OBV']):.0f}" if not pd.isna(latest['OBV']) else "OBV: N/A")
-                    except (ValueError, TypeError):
-                        st.write("OBV: N/A")
-                if use_stoch_rsi and 'STOCH_RSI' in latest:
-                    try:
-                        st.write(f"Stochastic RSI: {float(latest['STOCH_RSI']):.2f}" if not pd.isna(latest['STOCH_RSI']) else "Stoch RSI: N/A")
-                    except (ValueError, TypeError):
-                        st.write("Stoch RSI: N/A")
-                if use_fibonacci and 'FIB_618' in latest:
-                    try:
-                        st.write(f"Fib Levels - 61.8%: {float(latest['FIB_618']):.2f}, 50%: {float(latest['FIB_500']):.2f}, 38.2%: {float(latest['FIB_382']):.2f}" if not pd.isna(latest['FIB_618']) else "Fib: N/A")
-                    except (ValueError, TypeError):
-                        st.write("Fib: N/A")
+                # Patterns and indicators are kept as running state per ticker/interval,
+                # so a refresh only computes the bars that are new since the last one
+                with stage("indicators"):
+                    df = get_state(ticker, interval, include_extended, live_flags).sync(df)
+                with stage("score"):
+                    scored = live_score(df)
+            show_live_signal(df, pd.Timestamp.now(tz='US/Eastern'), scored, timings)
+    
+    # Confluence: the finest timeframe is fetched once and the coarser bars are aggregated from it
+    st.markdown("---")
+    st.subheader("Multi-Timeframe Confluence")
+    st.write("Score the latest candle on several timeframes at once from a single fetch of the finest one. "
+             "The signal only counts when no timeframe points the other way.")
+    timeframes = st.multiselect("Timeframes", ["1min", "5min", "15min", "30min", "60min", "1day", "1week"],
+                                default=CONFLUENCE_TIMEFRAMES, key="mtf_timeframes")
+    if st.button("🧭 Check Confluence", key="confluence", disabled=not timeframes):
+        base = base_interval(timeframes)
+        with st.spinner(f"Fetching {base} bars..."):
+            with timed_run("confluence") as timings:
+                with stage("fetch"):
+                    bars = fetch_data(ticker, base, include_extended, full=True)
+                if bars is None: st.stop()
+                with stage("resample"):
+                    frames = resample_bars(bars, base, timeframes)
+                rows, summary = confluence(frames, live_flags, sensitivity)
+        
+        color = "green" if summary['direction'] == "BULLISH" else "red" if summary['direction'] == "BEARISH" else "gray"
+        st.markdown(f"### Confluence → **:{color}[{summary['direction']}]**")
+        st.write(f"**Combined Score:** {summary['score']:+.1f} | **Agreeing Timeframes:** {summary['agree']}/{summary['timeframes']} | "
+                 f"1 API call ({base}) instead of {len(timeframes)}")
+        st.dataframe(pd.DataFrame(rows), use_container_width=True, hide_index=True)
+        short = [row['Timeframe'] for row in rows if row['Bars'] < 200]
+        if short:
+            st.caption(f"⚠️ {', '.join(short)}: under 200 bars in one {base} history, so indicators with longer "
+                       "windows (SMA 200, SMA 50, ...) don't score there.")
+        with st.expander("⏱️ Stage Timings"):
+            show_timings(timings, "confluence")
 
 with tab2:
     st.header("Backtest")
     if st.button("Run Backtest", key="back"):
         with st.spinner("Running backtest..."):
-            df = fetch_data(ticker, interval, include_extended, full=True)
-            if df is None: st.stop()
-            
-            # Calculate patterns for all candles
-            for p in ['CDLDOJI', 'CDLHAMMER', 'CDLENGULFING', 'CDLMORNINGSTAR', 'CDLEVENINGSTAR',
-                      'CDL3WHITESOLDIERS', 'CDL3BLACKCROWS', 'CDLHARAMI', 'CDLPIERCING', 'CDLDARKCLOUDCOVER']:
-                df[p] = getattr(abstract, p)(df)
-            
-            # Add momentum indicators for backtest
-            if use_momentum:
-                df['RSI'] = abstract.RSI(df, timeperiod=14)
-                df['volume_sma'] = df['volume'].rolling(window=20).mean()
-                df['volume_ratio'] = df['volume'] / df['volume_sma']
-            
-            # Add trend indicators for backtest
-            if use_trend:
-                df['SMA_20'] = df['close'].rolling(window=20).mean()
-                df['SMA_50'] = df['close'].rolling(window=50).mean()
-            
-            # Backtest logic: For each candle, predict next candle direction
-            correct_predictions = 0
-            total_predictions = 0
-            bullish_correct = 0
-            bullish_total = 0
-            bearish_correct = 0
-            bearish_total = 0
-            
-            # Start from index 50 to have enough data for indicators
-            start_idx = 50 if use_trend else 20 if use_momentum else 0
-            
-            for i in range(start_idx, len(df) - 1):
-                current = df.iloc[i]
-                next_candle = df.iloc[i + 1]
-                
-                # Calculate score for current candle
-                score = 0
-                
-                # Candlestick patterns
-                if current['CDLENGULFING'] == 100: score += 3
-                if current['CDLENGULFING'] == -100: score -= 3
-                if current['CDLMORNINGSTAR'] == 100: score += 4
-                if current['CDLEVENINGSTAR'] == -100: score -= 4
-                if current['CDLHAMMER'] == 100: score += 2
-                if current['CDLDOJI'] == 100: score += 1
-                if current['CDL3WHITESOLDIERS'] == 100: score += 3
-                if current['CDL3BLACKCROWS'] == -100: score -= 3
-                if current['CDLHARAMI'] == 100: score += 2
-                if current['CDLPIERCING'] == 100: score += 2
-                if current['CDLDARKCLOUDCOVER'] == -100: score -= 2
-                
-                # Add RSI momentum
-                if use_momentum and not pd.isna(current['RSI']):
-                    if current['RSI'] < 30: score += 2
-                    elif current['RSI'] > 70: score -= 2
-                    
-                    if not pd.isna(current['volume_ratio']) and current['volume_ratio'] > 1.5:
-                        if score > 0: score += 1
-                        elif score < 0: score -= 1
-                
-                # Add trend analysis
-                if use_trend and not pd.isna(current['SMA_20']) and not pd.isna(current['SMA_50']):
-                    if current['close'] > current['SMA_20'] and current['close'] > current['SMA_50']:
-                        score += 2
-                    elif current['close'] < current['SMA_20'] and current['close'] < current['SMA_50']:
-                        score -= 2
-                    
-                    if current['SMA_20'] > current['SMA_50']:
-                        score += 1
-                    elif current['SMA_20'] < current['SMA_50']:
-                        score -= 1
-                
-                # Determine prediction with user's threshold
-                prediction = "BULLISH" if score > sensitivity else "BEARISH" if score < -sensitivity else "NEUTRAL"
-                
-                # Skip neutral predictions in accuracy calculation
-                if prediction == "NEUTRAL":
-                    continue
+            with timed_run("backtest") as timings:
+                with stage("fetch"):
+                    df = load_history(ticker, interval, include_extended)
+                if df is None: st.stop()
                 
-                # Actual direction of next candle
-                actual_direction = "BULLISH" if next_candle['close'] > current['close'] else "BEARISH"
+                # Patterns for all candles plus the sidebar's indicators (cached per indicator group)
+                with stage("indicators"):
+                    df = frame_cache().indicators(df, history_key, live_flags, patterns=True)
                 
-                total_predictions += 1
-                if prediction == actual_direction:
-                    correct_predictions += 1
-                
-                # Track bullish/bearish accuracy separately
-                if prediction == "BULLISH":
-                    bullish_total += 1
-                    if actual_direction == "BULLISH":
-                        bullish_correct += 1
-                elif prediction == "BEARISH":
-                    bearish_total += 1
-                    if actual_direction == "BEARISH":
-                        bearish_correct += 1
+                # Backtest logic: score every candle with the live signal's rules and compare with the next candle's direction
+                with stage("backtest"):
+                    results = run_backtest(df, live_flags, sensitivity)
+            st.session_state.backtest_timings = timings
+            correct_predictions = results['correct']
+            total_predictions = results['total']
+            bullish_correct = results['bullish_correct']
+            bullish_total = results['bullish_total']
+            bearish_correct = results['bearish_correct']
+            bearish_total = results['bearish_total']
             
             # Display results
             accuracy = (correct_predictions / total_predictions * 100) if total_predictions > 0 else 0
@@ -687,6 +561,58 @@ with tab2:
             
             st.markdown(f"**Performance Rating:** {performance}")
             st.info("Note: Random guessing would yield ~50% accuracy. Values above 55% suggest the indicator has predictive value.")
+            with st.expander("⏱️ Stage Timings"):
+                show_timings(timings, "backtest")
+    
+    # Walk-forward: the optimizer picks on one window and is scored on the next, unseen one
+    st.markdown("---")
+    st.subheader("Walk-Forward Validation")
+    st.write("Re-run the optimizer on each training window and score its best configuration on the window that follows, so accuracy is measured on bars it was not picked on.")
+    col1, col2 = st.columns(2)
+    with col1:
+        train_bars = st.number_input("Training Window (bars)", min_value=50, value=500, step=50, key="wf_train")
+    with col2:
+        test_bars = st.number_input("Test Window (bars)", min_value=10, value=100, step=10, key="wf_test")
+    
+    if st.button("Run Walk-Forward", key="walk"):
+        with st.spinner("Running walk-forward folds..."):
+            df = load_history(ticker, interval, include_extended)
+            if df is None: st.stop()
+            
+            df = frame_cache().indicators(df, history_key, (True,) * 8, patterns=True)
+            
+            progress_bar = st.progress(0)
+            status_text = st.empty()
+            
+            def show_folds(done, total):
+                status_text.text(f"Finished {done}/{total} folds...")
+                progress_bar.progress(done / total)
+            
+            # Folds are independent, spread them over the worker processes when there is more than one core
+            executor = process_pool() if (os.cpu_count() or 1) > 1 else None
+            folds, summary = walk_forward(df, sensitivity, int(train_bars), int(test_bars),
+                                          executor=executor, progress=show_folds)
+            
+            progress_bar.empty()
+            status_text.empty()
+            
+            if not folds:
+                st.warning(f"Not enough history for one fold: need {int(train_bars + test_bars)} bars after the 200-bar warm-up, got {max(len(df) - 201, 0)}.")
+                st.stop()
+            
+            st.markdown("### Walk-Forward Results")
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Folds", summary['folds'])
+            col2.metric("In-Sample", f"{summary['train_accuracy']:.1f}%")
+            col3.metric("Out-of-Sample", f"{summary['test_accuracy']:.1f}%",
+                        delta=f"{summary['test_accuracy'] - summary['train_accuracy']:.1f}%")
+            col4.metric("Test Signals", summary['test_signals'])
+            
+            st.dataframe(pd.DataFrame(folds).style.format({
+                'Train_Acc': '{:.2f}%', 'Test_Acc': '{:.2f}%',
+                'Test_Bullish_Acc': '{:.2f}%', 'Test_Bearish_Acc': '{:.2f}%'
+            }), use_container_width=True)
+            st.info("The out-of-sample number is the honest one: the full-history optimizer picks and scores its configuration on the same bars.")
 
 with tab3:
     st.header("Optimize Indicators")
@@ -695,175 +621,26 @@ with tab3:
     
     if st.button("Find Optimal Configuration", key="optimize"):
         with st.spinner("Running optimization experiment (testing 64 configurations)..."):
-            df = fetch_data(ticker, interval, include_extended, full=True)
+            df = load_history(ticker, interval, include_extended)
             if df is None: st.stop()
             
-            # Calculate ALL indicators upfront (candlesticks always included)
-            df = calculate_indicators(df, True, True, True, True, True, True, True, True)
-            for p in ['CDLDOJI', 'CDLHAMMER', 'CDLENGULFING', 'CDLMORNINGSTAR', 'CDLEVENINGSTAR',
-                      'CDL3WHITESOLDIERS', 'CDL3BLACKCROWS', 'CDLHARAMI', 'CDLPIERCING', 'CDLDARKCLOUDCOVER']:
-                df[p] = getattr(abstract, p)(df)
+            # Calculate ALL indicators upfront (candlesticks always included), reusing cached groups
+            df = frame_cache().indicators(df, history_key, (True,) * 8, patterns=True)
             
             # Fractional factorial design (2^6 = 64 experiments) for 6 key indicator groups
             # Testing: MACD, RSI_Divergence, Volume, Trend, OBV, StochRSI
             # (Fibonacci, MSB, Supply/Demand excluded to keep experiment size manageable)
-            import itertools
-            experiments = list(itertools.product([False, True], repeat=6))
-            
-            results = []
             progress_bar = st.progress(0)
             status_text = st.empty()
             
-            for idx, (use_macd, use_rsi_div, use_volume, use_trend, use_obv, use_stoch) in enumerate(experiments):
-                status_text.text(f"Testing configuration {idx+1}/{len(experiments)}...")
-                progress_bar.progress((idx + 1) / len(experiments))
-                
-                correct = total = 0
-                bullish_correct = bullish_total = 0
-                bearish_correct = bearish_total = 0
-                
-                # Start after enough data for all indicators
-                start_idx = 200
-                
-                for i in range(start_idx, len(df) - 1):
-                    current = df.iloc[i]
-                    next_candle = df.iloc[i + 1]
-                    
-                    # Use the same scoring logic as calculate_score but with flags
-                    score = 0
-                    
-                    # ALWAYS include candlestick patterns as baseline
-                    if current['CDLENGULFING'] == 100: score += 3
-                    if current['CDLENGULFING'] == -100: score -= 3
-                    if current['CDLMORNINGSTAR'] == 100: score += 4
-                    if current['CDLEVENINGSTAR'] == -100: score -= 4
-                    if current['CDLHAMMER'] == 100: score += 2
-                    if current['CDLDOJI'] == 100: score += 1
-                    if current['CDL3WHITESOLDIERS'] == 100: score += 3
-                    if current['CDL3BLACKCROWS'] == -100: score -= 3
-                    if current['CDLHARAMI'] == 100: score += 2
-                    if current['CDLPIERCING'] == 100: score += 2
-                    if current['CDLDARKCLOUDCOVER'] == -100: score -= 2
-                    
-                    # MACD signals
-                    if use_macd and not pd.isna(current['MACD']):
-                        try:
-                            macd_val = float(current['MACD'])
-                            macd_sig = float(current['MACD_signal'])
-                            macd_hist = float(current['MACD_hist'])
-                            
-                            if macd_val > macd_sig and macd_hist > 0:
-                                score += 4 if abs(macd_hist) > 0.5 else 2
-                            elif macd_val < macd_sig and macd_hist < 0:
-                                score -= 4 if abs(macd_hist) > 0.5 else 2
-                        except: pass
-                    
-                    # RSI with divergence
-                    if use_rsi_div and not pd.isna(current['RSI']):
-                        try:
-                            rsi = float(current['RSI'])
-                            if i >= start_idx + 5:
-                                prev_rsi = float(df.iloc[i-5]['RSI'])
-                                prev_close = float(df.iloc[i-5]['close'])
-                                curr_close = float(current['close'])
-                                
-                                # Bullish divergence: price lower, RSI higher
-                                if curr_close < prev_close and rsi > prev_rsi:
-                                    score += 7
-                                # Bearish divergence: price higher, RSI lower
-                                elif curr_close > prev_close and rsi < prev_rsi:
-                                    score -= 7
-                            
-                            if rsi < 30: score += 2
-                            elif rsi > 70: score -= 2
-                        except: pass
-                    
-                    # Volume spike
-                    if use_volume and not pd.isna(current['volume_ratio']):
-                        try:
-                            vol_ratio = float(current['volume_ratio'])
-                            if vol_ratio > 2.0:
-                                if score > 0: score += 3
-                                elif score < 0: score -= 3
-                        except: pass
-                    
-                    # Trend with Golden/Death cross
-                    if use_trend and not pd.isna(current['SMA_50']):
-                        try:
-                            sma20 = float(current['SMA_20'])
-                            sma50 = float(current['SMA_50'])
-                            sma200 = float(current['SMA_200'])
-                            close = float(current['close'])
-                            
-                            # Golden cross detection
-                            if i >= start_idx + 1:
-                                prev_20 = float(df.iloc[i-1]['SMA_20'])
-                                prev_50 = float(df.iloc[i-1]['SMA_50'])
-                                
-                                if sma20 > sma50 and prev_20 <= prev_50:
-                                    score += 5
-                                elif sma20 < sma50 and prev_20 >= prev_50:
-                                    score -= 5
-                            
-                            # Trend alignment
-                            if close > sma200:
-                                score += 1
-                            elif close < sma200:
-                                score -= 1
-                        except: pass
-                    
-                    # OBV
-                    if use_obv and not pd.isna(current['OBV']):
-                        try:
-                            obv = float(current['OBV'])
-                            obv_sma = float(current['OBV_SMA'])
-                            if obv > obv_sma:
-                                score += 2
-                            elif obv < obv_sma:
-                                score -= 2
-                        except: pass
-                    
-                    # Stochastic RSI
-                    if use_stoch and not pd.isna(current['STOCH_RSI']):
-                        try:
-                            stoch = float(current['STOCH_RSI'])
-                            if stoch < 20:
-                                score += 3
-                            elif stoch > 80:
-                                score -= 3
-                        except: pass
-                    
-                    prediction = "BULLISH" if score > sensitivity else "BEARISH" if score < -sensitivity else "NEUTRAL"
-                    if prediction == "NEUTRAL": continue
-                    
-                    actual = "BULLISH" if next_candle['close'] > current['close'] else "BEARISH"
-                    total += 1
-                    if prediction == actual: correct += 1
-                    
-                    if prediction == "BULLISH":
-                        bullish_total += 1
-                        if actual == "BULLISH": bullish_correct += 1
-                    else:
-                        bearish_total += 1
-                        if actual == "BEARISH": bearish_correct += 1
-                
-                acc = (correct / total * 100) if total > 0 else 0
-                bull_acc = (bullish_correct / bullish_total * 100) if bullish_total > 0 else 0
-                bear_acc = (bearish_correct / bearish_total * 100) if bearish_total > 0 else 0
-                
-                results.append({
-                    'MACD': use_macd,
-                    'RSI_Div': use_rsi_div,
-                    'Volume': use_volume,
-                    'Trend': use_trend,
-                    'OBV': use_obv,
-                    'StochRSI': use_stoch,
-                    'Accuracy': acc,
-                    'Bullish_Acc': bull_acc,
-                    'Bearish_Acc': bear_acc,
-                    'Signals': total,
-                    'Indicator_Count': sum([use_macd, use_rsi_div, use_volume, use_trend, use_obv, use_stoch])
-                })
+            def show_progress(done, total):
+                status_text.text(f"Tested {done}/{total} configurations...")
+                progress_bar.progress(done / total)
+            
+            # Every configuration is scored at once from the rule terms, computed once; on more than one
+            # core, long histories are split into blocks of bars counted by the worker processes
+            executor = process_pool() if (os.cpu_count() or 1) > 1 else None
+            results = run_optimization(df, sensitivity, progress=show_progress, executor=executor)
             
             progress_bar.empty()
             status_text.empty()
@@ -964,6 +741,48 @@ with tab3:
             top_10 = results_df.nlargest(10, 'Accuracy')[['MACD', 'RSI_Div', 'Volume', 'Trend', 'OBV', 'StochRSI', 'Accuracy', 'Signals']].copy()
             top_10['Accuracy'] = top_10['Accuracy'].apply(lambda x: f"{x:.2f}%")
             st.dataframe(top_10, use_container_width=True)
+    
+    st.markdown("---")
+    st.subheader("Parameter Sweep")
+    st.write("Search indicator periods (RSI, MACD, SMAs, Stoch RSI), the volume thresholds and how much each group weighs, not just which groups are on.")
+    col1, col2 = st.columns(2)
+    with col1:
+        sweep_strategy = st.selectbox("Search", ["Successive Halving", "Random"], key="sweep_strategy",
+                                      help="Successive halving scores every configuration on recent bars first and only keeps the best third for longer windows")
+    with col2:
+        sweep_configs = st.number_input("Configurations", min_value=27, max_value=20000, value=729, step=27, key="sweep_configs")
+    
+    if st.button("Run Parameter Sweep", key="sweep"):
+        with st.spinner(f"Sweeping {int(sweep_configs)} configurations..."):
+            df = load_history(ticker, interval, include_extended)
+            if df is None: st.stop()
+            
+            df = frame_cache().indicators(df, history_key, (False,) * 8, patterns=True)
+            
+            progress_bar = st.progress(0)
+            status_text = st.empty()
+            
+            def show_sweep(done, total):
+                status_text.text(f"Scored {done}/{total} configurations...")
+                progress_bar.progress(min(done / total, 1.0))
+            
+            # Indicator series are computed once per distinct period; batches go to the worker processes with more than one core
+            executor = process_pool() if (os.cpu_count() or 1) > 1 else None
+            search = successive_halving if sweep_strategy == "Successive Halving" else random_search
+            rows = search(df, sensitivity, int(sweep_configs), executor=executor, progress=show_sweep)
+            
+            progress_bar.empty()
+            status_text.empty()
+            
+            sweep_df = pd.DataFrame(rows)
+            best = rows[0]
+            st.markdown(f"### 🎯 Best: {best['Accuracy']:.2f}% ({int(best['Signals'])} signals over {int(best['Bars'])} bars)")
+            changed = {name: f"{SWEEP_DEFAULTS[name]} → {best[name]}" for name in SWEEP_DEFAULTS if best[name] != SWEEP_DEFAULTS[name]}
+            if changed:
+                st.write("Changed from the current rules: " + ", ".join(f"**{name}** {change}" for name, change in changed.items()))
+            st.dataframe(sweep_df.head(20).style.format({'Accuracy': '{:.2f}%', 'Bullish_Acc': '{:.2f}%', 'Bearish_Acc': '{:.2f}%'}),
+                         use_container_width=True)
+            st.info("With this many parameters some configurations fit past bars by luck; confirm a winner on other tickers or a later period before changing the rules.")
 
 with tab4:
     st.header("📨 Telegram Messages")
@@ -1028,14 +847,8 @@ with tab4:
             else:
                 try:
                     with st.spinner("Sending message..."):
-                        # Create async function to send message
-                        async def send_telegram_message():
-                            bot = Bot(token=TELEGRAM_API_KEY)
-                            async with bot:
-                                await bot.send_message(chat_id=int(chat_id), text=message)
-                        
-                        # Run async function
-                        asyncio.run(send_telegram_message())
+                        # One bot and connection pool for the whole app, on its own event loop
+                        get_sender(TELEGRAM_API_KEY).send(int(chat_id), message).result(timeout=30)
                     
                     st.success(f"✅ Message sent successfully to chat ID: {chat_id}")
                     
@@ -1058,4 +871,86 @@ with tab4:
             4. Copy the Chat ID and paste it above
             
             **Note:** Make sure to start a chat with your bot first by searching for it on Telegram and sending `/start`.
-            """)
\ No newline at end of file
+            """)
+        
+        # Signal alerts
+        st.markdown("---")
+        st.markdown("#### 🚨 Signal Alerts")
+        st.write("Score a watchlist on every new candle in the background and message this chat when a ticker turns bullish or bearish past the sidebar sensitivity.")
+        
+        daemons = alert_daemons()
+        daemon = daemons.get(chat_id)
+        if daemon is None:
+            alert_watchlist = st.text_area("Alert Watchlist", "AAPL, MSFT, NVDA",
+                                           help="Tickers separated by commas, spaces or new lines")
+            if st.button("▶️ Start Alerts", key="alerts_start"):
+                alert_tickers = parse_watchlist(alert_watchlist)
+                if not chat_id or not chat_id.lstrip("-").isdigit():
+                    st.error("❌ Please enter a numeric Chat ID")
+                elif not alert_tickers:
+                    st.error("❌ Please enter at least one ticker")
+                else:
+                    flags = (use_momentum, use_trend, use_macd, use_obv, use_stoch_rsi, use_fibonacci, use_msb, use_supply_demand)
+                    daemons[chat_id] = AlertDaemon(get_sender(TELEGRAM_API_KEY), [int(chat_id)], alert_tickers, interval,
+                                                   include_extended, flags, sensitivity, api_key=API_KEY, cache=bar_cache).start()
+                    st.rerun()
+        else:
+            alert_metrics = daemon.metrics()
+            st.success(f"🟢 Watching {', '.join(daemon.tickers)} on {daemon.interval} candles (sensitivity {daemon.sensitivity})")
+            col1, col2, col3, col4 = st.columns(4)
+            col1.metric("Alerts", alert_metrics['alerts'])
+            col2.metric("Messages", alert_metrics['messages'])
+            col3.metric("p99 From Poll", f"{alert_metrics['latency_ms_p99']:.0f} ms")
+            col4.metric("p99 From Candle Close", f"{alert_metrics['close_latency_ms_p99'] / 1000:.1f} s")
+            if alert_metrics['last_error']:
+                st.warning(f"⚠️ Last send failed: {alert_metrics['last_error']}")
+            if st.button("⏹️ Stop Alerts", key="alerts_stop"):
+                daemon.stop()
+                daemons.pop(chat_id)
+                st.rerun()
+
+with tab5:
+    st.header("🔎 Watchlist Scanner")
+    st.write("Score every ticker in a watchlist with the sidebar settings and rank the strongest signals.")
+    
+    watchlist = st.text_area("Watchlist", "AAPL, MSFT, NVDA, AMZN, GOOGL, META, TSLA",
+                             help="Tickers separated by commas, spaces or new lines")
+    
+    if st.button("Scan Watchlist", key="scan", type="primary"):
+        tickers = parse_watchlist(watchlist)
+        if not tickers:
+            st.error("❌ Please enter at least one ticker")
+            st.stop()
+        
+        progress_bar = st.progress(0)
+        status_text = st.empty()
+        
+        def show_scan_progress(done, total):
+            status_text.text(f"Scored {done}/{total} symbols...")
+            progress_bar.progress(done / total)
+        
+        flags = (use_momentum, use_trend, use_macd, use_obv, use_stoch_rsi, use_fibonacci, use_msb, use_supply_demand)
+        results, stats = scan(tickers, interval, include_extended, flags, sensitivity, API_KEY,
+                              cache=bar_cache, progress=show_scan_progress)
+        progress_bar.empty()
+        status_text.empty()
+        
+        col1, col2, col3 = st.columns(3)
+        col1.metric("Symbols", stats['symbols'])
+        col2.metric("API Calls", stats['api_calls'])
+        col3.metric("Throughput", f"{stats['symbols_per_sec']:.1f} symbols/s")
+        st.caption(f"⏱️ Scanned in {stats['seconds']:.2f}s")
+        
+        columns = ['Ticker', 'Score', 'Close', 'Last Bar', 'Signals']
+        bullish = results[results['Direction'] == "BULLISH"]
+        bearish = results[results['Direction'] == "BEARISH"].sort_values('Score')
+        
+        st.markdown("### 🟢 Strongest Bullish")
+        st.dataframe(bullish[columns].head(25), use_container_width=True, hide_index=True)
+        st.markdown("### 🔴 Strongest Bearish")
+        st.dataframe(bearish[columns].head(25), use_container_width=True, hide_index=True)
+        
+        errors = results[results['Error'].notna()]
+        if len(errors):
+            with st.expander(f"⚠️ {len(errors)} symbols failed"):
+                st.dataframe(errors[['Ticker', 'Error']], use_container_width=True, hide_index=True)
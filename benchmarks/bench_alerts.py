@@ -0,0 +1,83 @@
+"""Telegram delivery: a new Bot and event loop per message vs. the shared sender, and alert latency.
+
+The first part sends the same messages the way the Messages tab used to
+(asyncio.run with a fresh Bot each time) and through one TelegramSender.
+The second runs the alert daemon on a watchlist while candles close on
+every symbol at once and reports how long alerts took from the poll that
+brought in the bar to Telegram accepting the message. The first candle
+only records each symbol's direction. Both talk to a local
+fake Telegram endpoint.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_alerts [symbols] [candles]
+"""
+import asyncio
+import sys
+import threading
+import time
+
+from telegram import Bot
+
+from predictor.alerts import AlertDaemon, TelegramSender
+from predictor.synthetic import FakeTelegram, synthetic_bars
+
+TOKEN = "123456:BENCH"
+FLAGS = (True, True, True, True, True, True, True, True)
+MESSAGES = 20
+N_BARS = 300
+
+
+def per_message_bot(url):
+    async def send():
+        bot = Bot(token=TOKEN, base_url=url)
+        async with bot:
+            await bot.send_message(chat_id=1, text="ping")
+
+    start = time.perf_counter()
+    for _ in range(MESSAGES):
+        asyncio.run(send())
+    return (time.perf_counter() - start) * 1000 / MESSAGES
+
+
+def shared_sender(sender):
+    sender.send(1, "warm up").result()
+    start = time.perf_counter()
+    for _ in range(MESSAGES):
+        sender.send(1, "ping").result()
+    return (time.perf_counter() - start) * 1000 / MESSAGES
+
+
+def alert_latency(sender, symbols, candles):
+    bars = {f"BENCH{i}": synthetic_bars(N_BARS + candles, seed=i) for i in range(symbols)}
+    shown = [N_BARS]
+    daemon = AlertDaemon(sender, [1], list(bars), "15min", True, FLAGS, sensitivity=2,
+                         fetch=lambda ticker: bars[ticker].iloc[:shown[0]]).start()
+    for candle in range(candles):
+        shown[0] = N_BARS + candle
+        # Every symbol's candle closes at the same moment
+        polls = [threading.Thread(target=poller._poll) for poller in daemon.pollers]
+        for poll in polls:
+            poll.start()
+        for poll in polls:
+            poll.join()
+        time.sleep(1)
+    daemon.stop()
+    return daemon.metrics()
+
+
+def main(symbols=50, candles=10):
+    with FakeTelegram() as telegram:
+        sender = TelegramSender(TOKEN, telegram.url)
+        print(f"new Bot per message  {per_message_bot(telegram.url):7.2f} ms/message")
+        print(f"shared sender        {shared_sender(sender):7.2f} ms/message")
+        m = alert_latency(sender, symbols, candles)
+        print(f"{symbols} symbols x {candles} candles: {m['alerts']} alerts in {m['messages']} messages, "
+              f"{m['errors']} errors")
+        print(f"poll to delivery     p50 {m['latency_ms_p50']:7.2f} ms   p99 {m['latency_ms_p99']:7.2f} ms   "
+              f"max {m['latency_ms_max']:7.2f} ms")
+        sender.close()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
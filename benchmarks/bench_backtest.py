@@ -0,0 +1,42 @@
+"""Backtest loop vs. vectorized engine: timing.
+
+The loop scores each candle with calculate_score on the frame up to it,
+the way the Live tab scores the latest one; run_backtest scores the whole
+frame at once. tests/test_backtest.py checks that both count the same
+predictions.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_backtest [n_bars]
+"""
+import sys
+import time
+
+from predictor.backtest import run_backtest, run_backtest_loop
+from predictor.indicators import add_patterns, calculate_indicators
+from predictor.synthetic import synthetic_bars
+
+ALL = (True, True, True, True, True, True, True, True)
+
+
+def prepare(n_bars):
+    return add_patterns(calculate_indicators(synthetic_bars(n_bars), *ALL))
+
+
+def main(n_bars=5_000):
+    df = prepare(n_bars)
+
+    start = time.perf_counter()
+    run_backtest_loop(df, ALL, 4)
+    loop_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    run_backtest(df, ALL, 4)
+    vector_time = time.perf_counter() - start
+
+    print(f"loop:       {loop_time * 1000:9.1f} ms")
+    print(f"vectorized: {vector_time * 1000:9.1f} ms ({loop_time / vector_time:.0f}x)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,95 @@
+"""Local bar store: append throughput, range queries and memory.
+
+Appends S symbols of N one-minute bars in compact-sized chunks, the way
+refreshes arrive, then times a one-day range query against loading the
+same series from the bar cache's .npz file. A scan over every symbol is
+run twice, once through the memory maps and once holding each series as
+a DataFrame, to compare the growth in anonymous memory (the mapped pages
+belong to the page cache, not the process). tests/test_barstore.py checks
+what append keeps and that a stored range backtests like the in-memory
+frame.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_barstore [n_bars] [symbols]
+"""
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from predictor.barstore import BarStore
+from predictor.cache import COMPACT_BARS, BarCache
+from predictor.synthetic import synthetic_bars
+
+QUERIES = 200
+
+
+def rss_anon():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("RssAnon:"):
+                return int(line.split()[1]) * 1024
+    return 0
+
+
+def scan_store(store, symbols):
+    # Highest close of every series, touching only the mapped pages
+    total = 0.0
+    for k in range(symbols):
+        _, rows = store.read(f"SYM{k}", "1min", True)
+        total += float(rows[:, 3].max())
+    return total
+
+
+def scan_frames(cache, symbols):
+    frames = [cache._load(cache.path(f"SYM{k}", "1min", True))[0] for k in range(symbols)]
+    return sum(float(df['close'].max()) for df in frames), frames
+
+
+def main(n_bars=200_000, symbols=20):
+    store = BarStore(tempfile.mkdtemp())
+    cache = BarCache(tempfile.mkdtemp(), max_bytes=1 << 40)
+    frames = {}
+    start = time.perf_counter()
+    for k in range(symbols):
+        df = frames[k] = synthetic_bars(n_bars, freq="1min", seed=k)
+        for lo in range(0, n_bars, COMPACT_BARS):
+            store.append(f"SYM{k}", "1min", True, df.iloc[max(0, lo - 5):lo + COMPACT_BARS])
+    seconds = time.perf_counter() - start
+    print(f"append {symbols} x {n_bars:,} bars in {COMPACT_BARS}-bar chunks: {seconds:6.2f} s "
+          f"({symbols * n_bars / seconds:,.0f} bars/s)")
+    for k, df in frames.items():
+        cache._save(cache.path(f"SYM{k}", "1min", True), df, True)
+        assert store.extent(f"SYM{k}", "1min", True)[2] == n_bars
+
+    days = frames[0].index.normalize().unique()
+    rng = np.random.default_rng(0)
+    picks = [(f"SYM{rng.integers(symbols)}", days[rng.integers(len(days))]) for _ in range(QUERIES)]
+    start = time.perf_counter()
+    for ticker, day in picks:
+        store.frame(ticker, "1min", True, day, day + pd.Timedelta(days=1) - pd.Timedelta(1))
+    stored = (time.perf_counter() - start) / QUERIES
+    start = time.perf_counter()
+    for ticker, day in picks:
+        cache._load(cache.path(ticker, "1min", True))[0].loc[day:day + pd.Timedelta(days=1) - pd.Timedelta(1)]
+    loaded = (time.perf_counter() - start) / QUERIES
+    print(f"one-day range query: store {stored * 1000:7.3f} ms   npz load + loc {loaded * 1000:7.2f} ms "
+          f"({loaded / stored:.0f}x)")
+
+    del frames
+    before = rss_anon()
+    scan_store(store, symbols)
+    mapped = rss_anon() - before
+    before = rss_anon()
+    _, held = scan_frames(cache, symbols)
+    in_memory = rss_anon() - before
+    del held
+    print(f"scan {symbols} symbols, anonymous memory growth: memory maps {mapped / 1e6:7.2f} MB   "
+          f"DataFrames {in_memory / 1e6:7.2f} MB")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,104 @@
+"""Fetch + parse latency of the pooled client against a recorded local fixture.
+
+Compact (100 bars) and full (20k bars) responses are recorded from the
+synthetic Alpha Vantage stand-in, then served as static bodies, gzipped
+when the client asks for it. Compares the old path (a fresh requests.get,
+stdlib json, DataFrame.from_dict(...).astype(float)) with the shared
+session, orjson and the direct-to-NumPy parse.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_client [repeats]
+"""
+import gzip
+import json
+import statistics
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+import requests
+
+from predictor.client import _loads, get_json, series_frame
+from predictor.synthetic import synthetic_bars, time_series_payload
+
+TS_KEY = "Time Series (1min)"
+
+
+def record():
+    bars = synthetic_bars(20000, "1min", seed=7)
+    return {"/compact": json.dumps(time_series_payload(bars.iloc[-100:], "1min")).encode(),
+            "/full": json.dumps(time_series_payload(bars, "1min")).encode()}
+
+
+def serve(bodies):
+    gzipped = {path: gzip.compress(body, 6) for path, body in bodies.items()}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+        # Headers and body go out in separate writes; don't let Nagle stall keep-alive responses
+        disable_nagle_algorithm = True
+
+        def do_GET(self):
+            gzip_ok = "gzip" in self.headers.get("Accept-Encoding", "")
+            body = (gzipped if gzip_ok else bodies)[self.path]
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            if gzip_ok:
+                self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, gzipped
+
+
+def legacy(url):
+    resp = requests.get(url).json()
+    df = pd.DataFrame.from_dict(resp[TS_KEY], orient="index")
+    df = df.astype(float)
+    df.index = pd.to_datetime(df.index).tz_localize('US/Eastern')
+    df.sort_index(inplace=True)
+    df.columns = ["open", "high", "low", "close", "volume"]
+    return df
+
+
+def pooled(url):
+    return series_frame(get_json(url)[TS_KEY], tz='US/Eastern')
+
+
+def timed(fn, url, repeats):
+    fn(url)
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        fn(url)
+        samples.append(time.perf_counter() - start)
+    return statistics.median(samples) * 1000
+
+
+def main(repeats=20):
+    bodies = record()
+    server, gzipped = serve(bodies)
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    print(f"json decoder: {_loads.__module__}")
+    try:
+        for name in ("compact", "full"):
+            url = f"{base}/{name}"
+            pd.testing.assert_frame_equal(legacy(url), pooled(url))
+            old_ms, new_ms = timed(legacy, url, repeats), timed(pooled, url, repeats)
+            print(f"{name:8s} {len(bodies['/' + name]) / 1e6:5.2f} MB ({len(gzipped['/' + name]) / 1e6:4.2f} MB gzip)  "
+                  f"legacy {old_ms:7.2f} ms  pooled {new_ms:7.2f} ms  ({old_ms / new_ms:.1f}x)")
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
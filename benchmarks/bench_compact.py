@@ -0,0 +1,74 @@
+"""Memory of the compact indicator layout, and signal agreement with float64.
+
+Compares a fully computed indicator frame in float64 with its compact
+forms (float32 derived series, int8 patterns, bit-packed swing flags).
+Then it checks the share of bars that get the same score and signals
+from both, which must be at least compact.SIGNAL_AGREEMENT, and how
+many optimizer counts and backtests differ. Last, fills a frame cache
+with several symbols in each layout.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_compact [n_bars] [symbols]
+"""
+import sys
+import time
+
+import pandas as pd
+
+from predictor.backtest import run_backtest
+from predictor.compact import SIGNAL_AGREEMENT, CompactFrame, compact_dtypes, signal_agreement
+from predictor.framecache import FrameCache
+from predictor.indicators import add_patterns, calculate_indicators
+from predictor.optimizer import evaluate_masks, full_factorial
+from predictor.synthetic import synthetic_bars
+
+FLAGS = (True, True, True, True, True, True, True, True)
+SENSITIVITY = 4
+SELECTIONS = [FLAGS, (True, True) + (False,) * 6, (True,) + (False,) * 7, (False,) * 8]
+
+
+def check_parity(df, compact):
+    masks = full_factorial()
+    expected, actual = evaluate_masks(df, masks, SENSITIVITY), evaluate_masks(compact, masks, SENSITIVITY)
+    optimizer = sum(int((expected[key] != actual[key]).sum()) for key in expected)
+    backtest = sum(run_backtest(df, flags, SENSITIVITY) != run_backtest(compact, flags, SENSITIVITY)
+                   for flags in SELECTIONS)
+    agreement = min(signal_agreement(df, compact, flags) for flags in SELECTIONS)
+    return optimizer, backtest, agreement
+
+
+def main(n_bars=20_000, symbols=10):
+    df = add_patterns(calculate_indicators(synthetic_bars(n_bars), *FLAGS))
+    compact = compact_dtypes(df)
+    stored = CompactFrame(df)
+    pd.testing.assert_frame_equal(stored.to_frame(), compact)
+    wide = df.memory_usage(index=True).sum()
+    print(f"float64 frame       {wide / 1e6:7.2f} MB")
+    print(f"compact dtypes      {compact.memory_usage(index=True).sum() / 1e6:7.2f} MB")
+    print(f"CompactFrame        {stored.nbytes / 1e6:7.2f} MB  ({wide / stored.nbytes:.2f}x smaller)")
+
+    optimizer, backtest, agreement = check_parity(df, compact)
+    assert agreement >= SIGNAL_AGREEMENT, agreement
+    print(f"signals: {agreement:.4%} of bars agree (at least {SIGNAL_AGREEMENT:.1%} required); "
+          f"{optimizer} of 384 optimizer counts and {backtest} of {len(SELECTIONS)} backtests differ")
+
+    for compact_cache in (False, True):
+        cache = FrameCache(compact=compact_cache)
+        start = time.perf_counter()
+        for k in range(symbols):
+            key = (f"SYM{k}", "15min", True, True)
+            bars = cache.frame(key, lambda k=k: synthetic_bars(n_bars, seed=k))
+            cache.indicators(bars, key, FLAGS, patterns=True)
+        build = time.perf_counter() - start
+        start = time.perf_counter()
+        cache.indicators(cache.frame(("SYM0", "15min", True, True), None), ("SYM0", "15min", True, True),
+                         FLAGS, patterns=True)
+        rerun = time.perf_counter() - start
+        label = "compact" if compact_cache else "float64"
+        print(f"frame cache, {label}: {cache.bytes / 1e6:7.2f} MB for {symbols} symbols   "
+              f"first runs {build * 1000:7.1f} ms   cached rerun {rerun * 1000:6.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
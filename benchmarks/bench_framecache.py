@@ -0,0 +1,51 @@
+"""Rerun cost with the in-memory frame cache vs. recomputing every indicator.
+
+Simulates the Streamlit reruns behind a button press: a first run, a rerun
+with nothing changed, and a rerun after toggling one indicator flag.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_framecache [n_bars]
+"""
+import sys
+import time
+
+import pandas as pd
+
+from predictor.framecache import FrameCache
+from predictor.indicators import add_patterns, calculate_indicators
+from predictor.synthetic import synthetic_bars
+
+KEY = ("SYNTH", "15min", True, True)
+FLAGS = (True, True, True, True, False, True, True, True)
+TOGGLED = (True, True, True, True, True, True, True, True)
+
+
+def uncached(bars, flags):
+    return add_patterns(calculate_indicators(bars.copy(), *flags))
+
+
+def cached(cache, bars, flags):
+    df = cache.frame(KEY, lambda: bars)
+    return cache.indicators(df, KEY, flags, patterns=True)
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main(n_bars=20_000):
+    bars = synthetic_bars(n_bars)
+    cache = FrameCache()
+    for label, flags in (("first run", FLAGS), ("rerun, no change", FLAGS), ("toggle Stoch RSI", TOGGLED)):
+        expected, full_ms = timed(uncached, bars, flags)
+        actual, cached_ms = timed(cached, cache, bars, flags)
+        pd.testing.assert_frame_equal(actual[expected.columns], expected)
+        print(f"{label:18s} recompute {full_ms:7.2f} ms   cached {cached_ms:7.2f} ms")
+    print(f"cache: {cache.bytes / 1e6:.1f} MB, {cache.stats}")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,54 @@
+"""Incremental indicator state vs. full recompute: timing.
+
+tests/test_incremental.py checks that appended, revised and trimmed
+states match a full recompute.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_incremental [n_bars]
+"""
+import sys
+import time
+
+from talib import abstract
+
+from predictor.incremental import IndicatorState
+from predictor.indicators import calculate_indicators
+from predictor.patterns import PATTERNS
+from predictor.synthetic import synthetic_bars
+
+FLAGS = (True,) * 8
+
+
+def full_recompute(bars):
+    df = bars.copy()
+    for p in PATTERNS:
+        df[p] = getattr(abstract, p)(df)
+    return calculate_indicators(df, *FLAGS)
+
+
+def main(n_bars=2_000):
+    bars = synthetic_bars(n_bars + 1)
+    state = IndicatorState(FLAGS)
+    state.sync(bars.iloc[:-1])
+
+    start = time.perf_counter()
+    full_recompute(bars)
+    full_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    state.sync(bars)
+    append_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(100):
+        state.append(bars.index[-1], *bars.iloc[-1].tolist())
+    bare_append = (time.perf_counter() - start) / 100
+
+    print(f"full recompute:         {full_time * 1000:8.2f} ms")
+    print(f"sync with one new bar:  {append_time * 1000:8.2f} ms (incl. frame build)")
+    print(f"append one bar:         {bare_append * 1000:8.2f} ms")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,239 @@
+"""Rule table vs the rules as they were written, and its throughput.
+
+reference_score below is calculate_score from before the rule table in
+predictor/rules.py. tests/test_rules.py checks that it, score_frame and
+calculate_score give every bar the same score and signal list, for every
+indicator selection, on a compact (float32) frame and on a frame with RSI
+divergences planted in it (a random walk almost never has ten monotonic
+closes). Here both table paths are timed on the same frame.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_kernel [n_bars] [timed_bars]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from predictor.indicators import add_patterns, calculate_indicators
+from predictor.scoring import calculate_score, score_frame
+from predictor.synthetic import synthetic_bars
+
+ALL = (True, True, True, True, True, True, True, True)
+
+
+def reference_score(current, df, flags):
+    """calculate_score as it was written before the rule table, branch by branch."""
+    use_momentum, use_trend, use_macd, use_obv, use_stoch_rsi, use_fibonacci, use_msb, use_supply_demand = flags
+    score = 0
+    signals = []
+
+    # 1. Candlestick patterns
+    if current['CDLENGULFING'] == 100: score += 3; signals.append("Bullish Engulfing")
+    if current['CDLENGULFING'] == -100: score -= 3; signals.append("Bearish Engulfing")
+    if current['CDLMORNINGSTAR'] == 100: score += 4; signals.append("Morning Star")
+    if current['CDLEVENINGSTAR'] == -100: score -= 4; signals.append("Evening Star")
+    if current['CDLHAMMER'] == 100: score += 2; signals.append("Hammer")
+    if current['CDLDOJI'] == 100: score += 1; signals.append("Doji")
+    if current['CDL3WHITESOLDIERS'] == 100: score += 3; signals.append("Three White Soldiers")
+    if current['CDL3BLACKCROWS'] == -100: score -= 3; signals.append("Three Black Crows")
+    if current['CDLHARAMI'] == 100: score += 2; signals.append("Bullish Harami")
+    if current['CDLPIERCING'] == 100: score += 2; signals.append("Piercing Pattern")
+    if current['CDLDARKCLOUDCOVER'] == -100: score -= 2; signals.append("Dark Cloud Cover")
+
+    # 2. MACD Signals (Strongest momentum filter)
+    if use_macd and 'MACD' in current:
+        try:
+            if not pd.isna(current['MACD']):
+                macd = float(current['MACD'])
+                signal = float(current['MACD_signal'])
+                hist = float(current['MACD_hist'])
+                prev_hist = float(df['MACD_hist'].iloc[-2]) if len(df) > 1 and not pd.isna(df['MACD_hist'].iloc[-2]) else 0.0
+
+                # Bullish MACD
+                if macd > signal and hist > 0:
+                    score += 4
+                    signals.append("MACD Bullish")
+                if macd > signal and hist > prev_hist and hist > 0:
+                    score += 5
+                    signals.append("MACD Momentum Surge")
+                if macd > 0 and macd > signal:
+                    score += 6
+                    signals.append("MACD Above Zero (Strong Bull)")
+
+                # Bearish MACD
+                if macd < signal and hist < 0:
+                    score -= 4
+                    signals.append("MACD Bearish")
+                if hist < prev_hist and hist < 0:
+                    score -= 5
+                    signals.append("MACD Momentum Fade")
+                if macd < 0 and macd < signal:
+                    score -= 6
+                    signals.append("MACD Below Zero (Strong Bear)")
+        except (ValueError, TypeError, KeyError):
+            pass
+
+    # 3. RSI Divergence + Volume Spike
+    if use_momentum and 'RSI' in current and not pd.isna(current['RSI']):
+        rsi_val = float(current['RSI'])
+        recent = df.iloc[-10:] if len(df) >= 10 else df
+
+        # RSI Divergence
+        if len(recent) >= 3:
+            if recent['close'].is_monotonic_decreasing and recent['RSI'].is_monotonic_increasing and rsi_val < 45:
+                score += 7
+                signals.append("Bullish RSI Divergence")
+            if recent['close'].is_monotonic_increasing and recent['RSI'].is_monotonic_decreasing and rsi_val > 55:
+                score -= 7
+                signals.append("Bearish RSI Divergence")
+
+        # Standard RSI levels
+        if rsi_val < 30:
+            score += 2
+            signals.append("RSI Oversold")
+        elif rsi_val > 70:
+            score -= 2
+            signals.append("RSI Overbought")
+
+        # Volume confirmation
+        if 'volume_ratio' in current and float(current['volume_ratio']) > 2.0:
+            score += 3 if score > 0 else -3
+            signals.append("Volume Explosion")
+        elif 'volume_ratio' in current and float(current['volume_ratio']) > 1.5:
+            if score > 0:
+                score += 1
+                signals.append("High Volume (Bullish)")
+            elif score < 0:
+                score -= 1
+                signals.append("High Volume (Bearish)")
+
+    # 4. Trend Filter – Kill counter-trend noise (Golden Cross)
+    if use_trend and 'SMA_20' in current and 'SMA_50' in current:
+        if not pd.isna(current['SMA_20']) and not pd.isna(current['SMA_50']):
+            # Price position relative to SMAs
+            if float(current['close']) > float(current['SMA_20']) and float(current['close']) > float(current['SMA_50']):
+                score += 2
+                signals.append("Uptrend (Above SMAs)")
+            elif float(current['close']) < float(current['SMA_20']) and float(current['close']) < float(current['SMA_50']):
+                score -= 2
+                signals.append("Downtrend (Below SMAs)")
+
+            # Golden/Death Cross
+            if float(current['SMA_20']) > float(current['SMA_50']):
+                prev_20 = float(df['SMA_20'].iloc[-2]) if len(df) > 1 else float(current['SMA_20'])
+                prev_50 = float(df['SMA_50'].iloc[-2]) if len(df) > 1 else float(current['SMA_50'])
+                if prev_20 <= prev_50:  # Just crossed
+                    score += 5
+                    signals.append("Golden Cross (Fresh)")
+                else:
+                    score += 1
+                    signals.append("Golden Cross")
+            elif float(current['SMA_20']) < float(current['SMA_50']):
+                prev_20 = float(df['SMA_20'].iloc[-2]) if len(df) > 1 else float(current['SMA_20'])
+                prev_50 = float(df['SMA_50'].iloc[-2]) if len(df) > 1 else float(current['SMA_50'])
+                if prev_20 >= prev_50:  # Just crossed
+                    score -= 5
+                    signals.append("Death Cross (Fresh)")
+                else:
+                    score -= 1
+                    signals.append("Death Cross")
+
+            # Strong trend filter using SMA_200
+            if 'SMA_200' in current and not pd.isna(current['SMA_200']):
+                if float(current['close']) > float(current['SMA_200']):
+                    score = max(score, 0)  # Only bullish signals
+                else:
+                    score = min(score, 0)  # Only bearish signals
+
+    # 5. On-Balance Volume
+    if use_obv and 'OBV' in current and 'OBV_SMA' in current:
+        if not pd.isna(current['OBV']) and not pd.isna(current['OBV_SMA']):
+            if float(current['OBV']) > float(current['OBV_SMA']):
+                score += 2
+                signals.append("OBV Bullish (Accumulation)")
+            else:
+                score -= 2
+                signals.append("OBV Bearish (Distribution)")
+
+    # 6. Stochastic RSI
+    if use_stoch_rsi and 'STOCH_RSI' in current and not pd.isna(current['STOCH_RSI']):
+        if float(current['STOCH_RSI']) < 20:
+            score += 3
+            signals.append("Stoch RSI Oversold")
+        elif float(current['STOCH_RSI']) > 80:
+            score -= 3
+            signals.append("Stoch RSI Overbought")
+
+    # 7. Fibonacci Retracements
+    if use_fibonacci and 'FIB_618' in current:
+        price = float(current['close'])
+        if not pd.isna(current['FIB_618']):
+            # Price at key Fibonacci levels
+            if abs(price - float(current['FIB_618'])) / price < 0.005:  # Within 0.5%
+                score += 4
+                signals.append("At Fib 61.8% (Golden Ratio)")
+            elif abs(price - float(current['FIB_500'])) / price < 0.005:
+                score += 2
+                signals.append("At Fib 50%")
+            elif abs(price - float(current['FIB_382'])) / price < 0.005:
+                score += 2
+                signals.append("At Fib 38.2%")
+
+    # 8. Market Structure Break
+    if use_msb and 'MSB_high' in current and 'MSB_low' in current:
+        # Break of structure (BOS): close beyond the latest swing, once two swings are confirmed
+        if not pd.isna(current['MSB_high']) and float(current['close']) > float(current['MSB_high']):
+            score += 5
+            signals.append("Market Structure Break (Bullish)")
+        if not pd.isna(current['MSB_low']) and float(current['close']) < float(current['MSB_low']):
+            score -= 5
+            signals.append("Market Structure Break (Bearish)")
+
+    # 9. Supply and Demand Zones
+    if use_supply_demand and 'supply_zone' in current and 'demand_zone' in current:
+        if not pd.isna(current['supply_zone']) and not pd.isna(current['demand_zone']):
+            # Price at supply zone (resistance)
+            if float(current['close']) >= float(current['supply_zone']):
+                score -= 3
+                signals.append("At Supply Zone (Resistance)")
+            # Price at demand zone (support)
+            elif float(current['close']) <= float(current['demand_zone']):
+                score += 3
+                signals.append("At Demand Zone (Support)")
+
+    return score, signals
+
+
+def with_divergences(df):
+    # Runs of ten falling closes under rising RSI (and the reverse), every 100 bars
+    df = df.copy()
+    close, rsi = df['close'].to_numpy().copy(), df['RSI'].to_numpy().copy()
+    for start in range(100, len(df) - 12, 100):
+        sign = 1 if start % 200 else -1
+        close[start:start + 12] = close[start] - sign * np.arange(12) * 0.01
+        rsi[start:start + 12] = (40 if sign > 0 else 60) + sign * np.arange(12) * 0.1
+    df['close'], df['RSI'] = close, rsi
+    return df
+
+
+def main(n_bars=1_000_000, timed_bars=3_000):
+    df = add_patterns(calculate_indicators(synthetic_bars(n_bars), *ALL))
+    start = time.perf_counter()
+    for i in range(len(df) - timed_bars, len(df)):
+        calculate_score(df.iloc[:i + 1], *ALL)
+    loop = (time.perf_counter() - start) / timed_bars
+    score_frame(df, ALL)
+    best = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        score_frame(df, ALL)
+        best = min(best, time.perf_counter() - start)
+    print(f"calculate_score per bar: {1 / loop:12,.0f} bars/s")
+    print(f"score_frame, {n_bars:,} bars: {n_bars / best:12,.0f} bars/s  ({loop * n_bars / best:,.0f}x)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,53 @@
+"""Market structure break from forward-filled swing levels vs filtering swings per bar.
+
+The reference below is the scoring code it replaces: every bar filters the
+frame up to it for swing highs and lows and takes the latest of the last
+two. tests/test_msb.py checks that both fire on the same bars and that
+calculate_score lists the same MSB signals.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_msb [n_bars]
+"""
+import sys
+import time
+
+import numpy as np
+
+from predictor.indicators import add_patterns, calculate_indicators
+from predictor.synthetic import synthetic_bars
+
+
+def msb_loop(df):
+    """Bullish and bearish breaks of every bar, filtering the frame up to it each time.
+
+    The swing flags are centered on five bars, so at bar i only the swings
+    up to bar i - 2 are known; the frame the live signal had at bar i
+    (recomputed on the bars up to it) has no swing after that.
+    """
+    bullish, bearish = np.zeros(len(df), dtype=bool), np.zeros(len(df), dtype=bool)
+    for i in range(len(df)):
+        window, close = df.iloc[:max(i - 1, 0)], float(df['close'].iloc[i])
+        recent_highs = window[window['is_swing_high'] == True].tail(2)
+        recent_lows = window[window['is_swing_low'] == True].tail(2)
+        bullish[i] = len(recent_highs) >= 2 and close > float(recent_highs.iloc[-1]['high'])
+        bearish[i] = len(recent_lows) >= 2 and close < float(recent_lows.iloc[-1]['low'])
+    return bullish, bearish
+
+
+def main(n_bars=20_000):
+    df = add_patterns(calculate_indicators(synthetic_bars(n_bars), False, False, False, False, False, False, True, False))
+
+    start = time.perf_counter()
+    msb_loop(df)
+    loop = time.perf_counter() - start
+    start = time.perf_counter()
+    df = calculate_indicators(df, False, False, False, False, False, False, True, False)
+    actual = (df['close'] > df['MSB_high']).to_numpy(), (df['close'] < df['MSB_low']).to_numpy()
+    vectorized = time.perf_counter() - start
+    print(f"{n_bars} bars: per-bar filter {loop:7.2f} s   swing columns {vectorized * 1000:7.2f} ms "
+          f"({loop / vectorized:,.0f}x)   breaks {int(actual[0].sum())} bullish, {int(actual[1].sum())} bearish")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,42 @@
+"""Per-row optimizer loop vs. batched mask evaluation: timing.
+
+The loop scores each bar on its own through the live signal's path with a
+configuration's groups; the batch scores all 64 configurations from one
+matrix of rule conditions. tests/test_optimizer.py checks that they count
+the same signals.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_optimizer [n_bars]
+"""
+import sys
+import time
+
+from predictor.indicators import add_patterns, calculate_indicators
+from predictor.optimizer import full_factorial, run_config_loop, run_optimization
+from predictor.synthetic import synthetic_bars
+
+
+def prepare(n_bars):
+    df = calculate_indicators(synthetic_bars(n_bars), True, True, True, True, True, True, True, True)
+    return add_patterns(df)
+
+
+def main(n_bars=10_000, sensitivity=4):
+    df = prepare(n_bars)
+
+    start = time.perf_counter()
+    results = run_optimization(df, sensitivity)
+    batched_time = time.perf_counter() - start
+
+    masks = full_factorial()
+    start = time.perf_counter()
+    run_config_loop(df, *masks[-1], sensitivity)
+    loop_time = time.perf_counter() - start
+
+    print(f"loop (64 configs, extrapolated): {loop_time * len(masks):9.2f} s")
+    print(f"batched (64 configs):            {batched_time:9.3f} s")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
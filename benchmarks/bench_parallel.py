@@ -0,0 +1,67 @@
+"""Optimizer on worker processes over shared memory: scaling at 1-16 workers.
+
+The rule terms and next-bar outcomes go into shared memory once; each
+task maps them and counts all 64 configurations on its block of bars,
+so the tasks only carry the blocks' names. tests/test_parallel.py checks
+that the counts equal the in-process ones and that progress reaches
+64/64. Scaling stops at the machine's core count (printed); more workers
+than cores only add overhead.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_parallel [n_bars]
+"""
+import multiprocessing
+import os
+import pickle
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from predictor.indicators import add_patterns, calculate_indicators
+from predictor.optimizer import START_IDX, full_factorial, next_bar_up, rule_terms, run_optimization
+from predictor.synthetic import synthetic_bars
+from predictor.workers import shared_arrays
+
+SENSITIVITY = 4
+WORKERS = [1, 2, 4, 8, 16]
+
+
+def prepare(n_bars):
+    df = calculate_indicators(synthetic_bars(n_bars), True, True, True, True, True, True, True, True)
+    return add_patterns(df)
+
+
+def best_of(fn, repeat=3):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(n_bars=300_000):
+    df = prepare(n_bars)
+    masks = full_factorial()
+    serial = best_of(lambda: run_optimization(df, SENSITIVITY))
+    print(f"{n_bars:,} bars, {len(masks)} configurations, {os.cpu_count()} CPU(s)")
+    print(f"in process       {serial * 1000:8.1f} ms")
+
+    terms = rule_terms(df, START_IDX)
+    with shared_arrays(terms, next_bar_up(df, START_IDX).astype(np.float64)) as specs:
+        shipped = len(pickle.dumps((specs, 0, len(terms[0]), masks, SENSITIVITY)))
+    print(f"per task: {shipped:,} bytes pickled vs {terms.nbytes:,} bytes of rule terms in shared memory")
+
+    for workers in WORKERS:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            # First run starts the workers
+            run_optimization(df, SENSITIVITY, executor=pool, tasks=workers)
+            elapsed = best_of(lambda: run_optimization(df, SENSITIVITY, executor=pool, tasks=workers))
+        print(f"{workers:3d} worker(s)    {elapsed * 1000:8.1f} ms  ({serial / elapsed:.2f}x in-process)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
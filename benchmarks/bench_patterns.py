@@ -0,0 +1,43 @@
+"""Ten abstract-API pattern calls vs. the one-pass pattern engine.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_patterns [repeats]
+"""
+import sys
+import timeit
+
+import numpy as np
+from talib import abstract
+
+from predictor.indicators import add_patterns
+from predictor.patterns import PATTERNS, ohlc_arrays, pattern_matrix
+from predictor.synthetic import synthetic_bars
+
+
+def abstract_columns(df):
+    for p in PATTERNS:
+        df[p] = getattr(abstract, p)(df)
+    return df
+
+
+def main(repeats=20):
+    for n_bars in (100, 2_000, 20_000):
+        bars = synthetic_bars(n_bars, seed=n_bars)
+        expected = abstract_columns(bars.copy())[PATTERNS]
+        matrix = pattern_matrix(*ohlc_arrays(bars))
+        assert (matrix == expected.to_numpy()).all()
+        assert (add_patterns(bars.copy())[PATTERNS].to_numpy() == matrix).all()
+
+        old = min(timeit.repeat(lambda: abstract_columns(bars.copy()), number=1, repeat=repeats))
+        new = min(timeit.repeat(lambda: add_patterns(bars.copy()), number=1, repeat=repeats))
+        raw = min(timeit.repeat(lambda: pattern_matrix(*ohlc_arrays(bars)), number=1, repeat=repeats))
+        old_bytes = expected.memory_usage(index=False).sum()
+        print(f"{n_bars:6d} bars  abstract {old * 1000:7.2f} ms  add_patterns {new * 1000:7.2f} ms "
+              f"({old / new:4.1f}x)  matrix only {raw * 1000:7.2f} ms  "
+              f"{old_bytes / 1024:7.1f} KiB -> {matrix.nbytes / 1024:6.1f} KiB")
+    assert matrix.dtype == np.int8
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,87 @@
+"""Live refresh cost: every session fetching on its own vs. one background poller.
+
+Simulates several sessions watching the same series while new candles
+close. The blocking path is the old auto-refresh, where each session's
+rerun fetched (with a simulated API latency) and synced the indicators
+before rendering. With the poller one fetch per candle serves everyone and
+a session only reads the latest snapshot, even while a poll is in flight.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_poller [n_bars] [sessions] [candles]
+"""
+import sys
+import threading
+import time
+
+import pandas as pd
+
+from predictor.incremental import get_state
+from predictor.poller import Poller
+from predictor.synthetic import synthetic_bars
+
+FLAGS = (True, True, True, True, True, True, True, True)
+LATENCY = 0.2
+
+
+class SlowFetch:
+    """Returns the first `shown` bars after LATENCY seconds, counting calls."""
+
+    def __init__(self, bars, shown):
+        self.bars = bars
+        self.shown = shown
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(LATENCY)
+        return self.bars.iloc[:self.shown]
+
+
+def blocking(bars, n_bars, sessions, candles):
+    fetch = SlowFetch(bars, n_bars)
+    state = get_state("BLOCKING", "15min", True, FLAGS)
+    renders = []
+    for candle in range(candles):
+        fetch.shown = n_bars + candle
+        for _ in range(sessions):
+            start = time.perf_counter()
+            state.sync(fetch())
+            renders.append((time.perf_counter() - start) * 1000)
+    return fetch.calls, renders
+
+
+def polled(bars, n_bars, sessions, candles):
+    fetch = SlowFetch(bars, n_bars)
+    poller = Poller(("POLLED", "15min", True), fetch)
+    while poller.subscribe(FLAGS) is None:
+        time.sleep(0.01)
+    renders = []
+    for candle in range(candles):
+        fetch.shown = n_bars + candle
+        # The candle-close poll runs while the sessions keep rendering
+        poll = threading.Thread(target=poller._poll)
+        poll.start()
+        for _ in range(sessions):
+            start = time.perf_counter()
+            poller.subscribe(FLAGS)
+            renders.append((time.perf_counter() - start) * 1000)
+        poll.join()
+    return fetch.calls, renders, poller.subscribe(FLAGS)
+
+
+def main(n_bars=2_000, sessions=20, candles=5):
+    bars = synthetic_bars(n_bars + candles)
+    for label, (calls, renders, *rest) in (("blocking", blocking(bars, n_bars, sessions, candles)),
+                                           ("poller", polled(bars, n_bars, sessions, candles))):
+        renders = pd.Series(renders)
+        print(f"{label:9s} API calls {calls:4d}   render avg {renders.mean():7.2f} ms   "
+              f"p95 {renders.quantile(0.95):7.2f} ms   max {renders.max():7.2f} ms")
+    snapshot = rest[0]
+    expected = get_state("REFERENCE", "15min", True, FLAGS).sync(bars.iloc[:n_bars + candles - 1])
+    pd.testing.assert_frame_equal(snapshot['frame'], expected)
+    print(f"poller snapshot matches a direct sync ({len(expected)} bars, version {snapshot['version']})")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
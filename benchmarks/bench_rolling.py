@@ -0,0 +1,73 @@
+"""Per-bar Fibonacci levels and the sorted-window supply/demand quantiles.
+
+The Fibonacci levels used to be one snapshot of the last 50 bars broadcast
+to every row, so any earlier bar was scored against prices after it. Now
+each bar gets the levels of the 50 bars up to it: this checks them against
+slicing the frame bar by bar, checks that the latest bar still gets the
+snapshot levels, and counts the bars whose Fibonacci signal the snapshot
+got wrong. The supply and demand zones must match pandas' rolling quantile
+exactly, with and without gaps in the data.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_rolling [n_bars]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from predictor.indicators import indicator_columns, rolling_quantile
+from predictor.synthetic import synthetic_bars
+
+RATIOS = {'FIB_236': 0.236, 'FIB_382': 0.382, 'FIB_500': 0.500, 'FIB_618': 0.618}
+CHECKED_BARS = 2_000
+
+
+def snapshot_levels(df):
+    """The old levels: the last 50 bars of df, the same for every row."""
+    recent = df.iloc[-min(50, len(df)):]
+    high, low = recent['high'].max(), recent['low'].min()
+    return {name: high - ratio * (high - low) for name, ratio in RATIOS.items()}
+
+
+def fib_signal(close, levels):
+    # The order calculate_score checks them in: 61.8%, then 50%, then 38.2%
+    near = {name: np.abs(close - levels[name]) / close < 0.005 for name in ('FIB_618', 'FIB_500', 'FIB_382')}
+    return np.where(near['FIB_618'], 618, np.where(near['FIB_500'], 500, np.where(near['FIB_382'], 382, 0)))
+
+
+def main(n_bars=200_000):
+    df = synthetic_bars(n_bars)
+
+    start = time.perf_counter()
+    levels = indicator_columns(df, 'fibonacci')
+    rolling = time.perf_counter() - start
+    for i in range(n_bars - CHECKED_BARS, n_bars):
+        expected = snapshot_levels(df.iloc[:i + 1])
+        assert all(levels[name].iloc[i] == expected[name] for name in RATIOS), i
+    short = df.iloc[:30]
+    assert all(indicator_columns(short, 'fibonacci')[name].iloc[-1] == snapshot_levels(short)[name] for name in RATIOS)
+    close = df['close'].to_numpy()
+    wrong = fib_signal(close, snapshot_levels(df)) != fib_signal(close, {n: v.to_numpy() for n, v in levels.items()})
+    print(f"fibonacci: {n_bars} bars in {rolling * 1000:6.2f} ms; levels match slicing on the last {CHECKED_BARS} bars; "
+          f"the snapshot gave a different Fibonacci signal on {int(wrong.sum()):,} bars")
+
+    gappy = df.copy()
+    gappy.iloc[np.random.default_rng(0).choice(n_bars, 50, replace=False), :4] = np.nan
+    for frame, label in ((df, "bars"), (gappy, "bars with gaps")):
+        for column, q in (('high', 0.95), ('low', 0.05)):
+            start = time.perf_counter()
+            expected = frame[column].rolling(window=20).quantile(q)
+            generic = time.perf_counter() - start
+            start = time.perf_counter()
+            actual = rolling_quantile(frame[column], 20, q)
+            sorted_windows = time.perf_counter() - start
+            pd.testing.assert_series_equal(actual, expected, check_exact=True, check_names=False)
+            print(f"quantile {q:.2f} of {column}, {label}: pandas {generic * 1000:7.2f} ms   "
+                  f"sorted windows {sorted_windows * 1000:7.2f} ms ({generic / sorted_windows:.1f}x), identical")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
@@ -0,0 +1,32 @@
+"""Watchlist scan throughput against the local Alpha Vantage stand-in.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_scanner [n_symbols]
+"""
+import os
+import sys
+import tempfile
+
+from predictor.cache import BarCache
+from predictor.scanner import scan
+from predictor.synthetic import FakeAlphaVantage
+
+FLAGS = (True, True, True, False, False, False, False, False)
+
+
+def main(n_symbols=300):
+    tickers = [f"SYM{i:03d}" for i in range(n_symbols)]
+    with FakeAlphaVantage(auto_bars=500) as fake:
+        os.environ["ALPHA_VANTAGE_URL"] = fake.url
+        cache = BarCache(tempfile.mkdtemp())
+        # First pass starts the scoring workers and fills the cache
+        for label in ("cold (API + workers start)", "warm (cache)"):
+            results, stats = scan(tickers, "15min", True, FLAGS, 4, "demo", cache=cache)
+            assert results['Error'].isna().all(), results['Error'].dropna().head()
+            print(f"{label:28s} {stats['seconds']:6.2f} s  {stats['symbols_per_sec']:7.1f} symbols/s  "
+                  f"{stats['api_calls']} API calls")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
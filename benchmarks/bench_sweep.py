@@ -0,0 +1,48 @@
+"""Parameter sweep throughput and series reuse.
+
+Random search and successive halving run over the full space, with and
+without the process pool. tests/test_sweep.py checks that the defaults
+reproduce the Optimize tab's counts.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sweep [n_bars] [n_configs]
+"""
+import sys
+import time
+
+from predictor.indicators import add_patterns
+from predictor.sweep import random_configs, run_sweep, successive_halving
+from predictor.synthetic import synthetic_bars
+from predictor.workers import process_pool
+
+SENSITIVITY = 4
+
+
+def main(n_bars=20_000, n_configs=5_000):
+    bars = add_patterns(synthetic_bars(n_bars))
+
+    configs = random_configs(n=n_configs)
+    start = time.perf_counter()
+    counts, stats = run_sweep(bars, configs, SENSITIVITY)
+    seconds = time.perf_counter() - start
+    print(f"random {n_configs} configs, in process:  {seconds:7.2f} s  ({n_configs / seconds:,.0f} configs/s)   "
+          f"series computed {stats['computed']}, reused {stats['reused']}")
+
+    start = time.perf_counter()
+    pooled, stats = run_sweep(bars, configs, SENSITIVITY, executor=process_pool())
+    seconds = time.perf_counter() - start
+    assert all((pooled[key] == counts[key]).all() for key in counts)
+    print(f"random {n_configs} configs, process pool: {seconds:7.2f} s  ({n_configs / seconds:,.0f} configs/s)   "
+          f"series computed {stats['computed']}, reused {stats['reused']}")
+
+    start = time.perf_counter()
+    rows = successive_halving(bars, SENSITIVITY, n_configs)
+    seconds = time.perf_counter() - start
+    full = sum(row['Bars'] == rows[0]['Bars'] for row in rows)
+    print(f"successive halving {n_configs} configs:  {seconds:7.2f} s  ({full} scored on all bars, "
+          f"best {rows[0]['Accuracy']:.2f}% on {rows[0]['Signals']} signals)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
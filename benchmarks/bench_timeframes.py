@@ -0,0 +1,86 @@
+"""Timeframes built from one fetched series vs pandas resample, and vs fetching each one.
+
+reference below gives the bars resample_bars must match: clock-time
+buckets for intraday timeframes, the 09:30-16:00 session for days, and
+Monday-to-Friday weeks labelled with their last trading day
+(tests/test_timeframes.py checks that, across DST changes too). Both are
+timed on the same series. Last, the confluence check's API calls:
+one fetch of the base interval instead of one per timeframe.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_timeframes [n_bars]
+"""
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+from predictor.cache import BarCache
+from predictor.data import fetch_data
+from predictor.timeframes import CONFLUENCE_TIMEFRAMES, base_interval, confluence, resample_bars
+from predictor.synthetic import FakeAlphaVantage, synthetic_bars
+
+AGG = {'open': 'first', 'high': 'max', 'low': 'min', 'close': 'last', 'volume': 'sum'}
+FLAGS = (True, True, True, False, False, False, False, False)
+
+
+def reference(df, timeframe, intraday=True):
+    """The same bars through pandas' resample."""
+    session = df.between_time("09:30", "15:59") if intraday else df
+    if timeframe == "1day":
+        return session.resample("D").agg(AGG).dropna(subset=['open'])
+    if timeframe == "1week":
+        weeks = session.resample("W-MON", label="left", closed="left")
+        bars = weeks.agg(AGG).dropna(subset=['open'])
+        # Labelled with the last trading day of the week, like the API
+        last_day = session.index.normalize().to_series(index=session.index).resample("W-MON", label="left",
+                                                                                      closed="left").max()
+        bars.index = pd.DatetimeIndex(last_day.loc[bars.index])
+        return bars
+    return df.resample(timeframe, label="left", closed="left").agg(AGG).dropna(subset=['open'])
+
+
+def best_of(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(n_bars=200_000):
+    timeframes = ["5min", "15min", "30min", "60min", "1day", "1week"]
+    df = synthetic_bars(n_bars, "5min", start="2020-01-02 04:00")
+
+    ours = best_of(lambda: resample_bars(df, "5min", timeframes))
+    theirs = best_of(lambda: [reference(df, timeframe) for timeframe in timeframes])
+    print(f"{n_bars:,} 5min bars -> {len(timeframes) - 1} timeframes: resample_bars {ours * 1e3:8.1f} ms  "
+          f"pandas resample {theirs * 1e3:8.1f} ms  ({theirs / ours:.1f}x)")
+
+    # API calls for one confluence check, every timeframe fetched vs the base only
+    with FakeAlphaVantage(auto_bars=6_000) as fake:
+        os.environ["ALPHA_VANTAGE_URL"] = fake.url
+        cache = BarCache(tempfile.mkdtemp())
+        start = time.perf_counter()
+        for timeframe in CONFLUENCE_TIMEFRAMES:
+            fetch_data("AAPL", timeframe, True, full=True, cache=cache)
+        separate, separate_calls = time.perf_counter() - start, len(fake.requests)
+
+        base = base_interval(CONFLUENCE_TIMEFRAMES)
+        start = time.perf_counter()
+        bars = fetch_data("MSFT", base, True, full=True, cache=cache)
+        rows, summary = confluence(resample_bars(bars, base, CONFLUENCE_TIMEFRAMES), FLAGS, 4)
+        single = time.perf_counter() - start
+        single_calls = len(fake.requests) - separate_calls
+    print(f"confluence of {', '.join(CONFLUENCE_TIMEFRAMES)}: {separate_calls} API calls fetching each "
+          f"({separate * 1e3:.0f} ms, fetch only) vs {single_calls} from {base} ({single * 1e3:.0f} ms, scored)")
+    print(pd.DataFrame(rows)[['Timeframe', 'Bars', 'Score', 'Direction']].to_string(index=False))
+    print(f"confluence: {summary['direction']} {summary['score']:+.1f}, {summary['agree']}/{summary['timeframes']} agree")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
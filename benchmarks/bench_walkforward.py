@@ -0,0 +1,49 @@
+"""Walk-forward folds: scaling with worker processes.
+
+Uses a 30-year synthetic daily history, a one-year training window and a
+monthly test window (re-optimized every month). tests/test_walkforward.py
+checks that folds match the Optimize tab and never overlap.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_walkforward [n_bars] [train_bars] [test_bars]
+"""
+import multiprocessing
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from predictor.indicators import add_patterns, calculate_indicators
+from predictor.synthetic import synthetic_bars
+from predictor.walkforward import walk_forward
+
+SENSITIVITY = 4
+
+
+def prepare(n_bars):
+    df = calculate_indicators(synthetic_bars(n_bars, "B", seed=11), True, True, True, True, True, True, True, True)
+    return add_patterns(df)
+
+
+def main(n_bars=7_560, train_bars=252, test_bars=21):
+    df = prepare(n_bars)
+
+    start = time.perf_counter()
+    folds, summary = walk_forward(df, SENSITIVITY, train_bars, test_bars)
+    serial = time.perf_counter() - start
+    print(f"{summary['folds']} folds, in-sample {summary['train_accuracy']:.2f}% "
+          f"vs out-of-sample {summary['test_accuracy']:.2f}%")
+    print(f"in process       {serial * 1000:8.1f} ms")
+
+    for workers in sorted({1, 2, os.cpu_count() or 1}):
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+            walk_forward(df, SENSITIVITY, train_bars, test_bars, executor=pool, tasks=workers)  # warm up
+            start = time.perf_counter()
+            walk_forward(df, SENSITIVITY, train_bars, test_bars, executor=pool, tasks=workers)
+            elapsed = time.perf_counter() - start
+        print(f"{workers:3d} worker(s)    {elapsed * 1000:8.1f} ms  ({serial / elapsed:.2f}x in-process)")
+
+
+if __name__ == "__main__":
+    main(*(int(arg) for arg in sys.argv[1:]))
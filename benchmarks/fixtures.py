@@ -0,0 +1,91 @@
+"""Alpha Vantage response fixtures for the benchmark suite.
+
+One gzipped response body per interval and output size, kept in
+benchmarks/fixtures/. Missing files are generated from seeded synthetic
+bars in the API's JSON layout, with the bar counts a real response has,
+so every machine parses the same bytes. With an API key the real responses
+can be recorded over them:
+
+    python -m benchmarks.fixtures [--record] [--ticker IBM] [--api-key KEY]
+"""
+import argparse
+import gzip
+import hashlib
+import json
+import os
+import sys
+from pathlib import Path
+
+from predictor.cache import COMPACT_BARS
+from predictor.client import _loads, session
+from predictor.data import build_request, parse_time_series
+from predictor.synthetic import FREQUENCIES, synthetic_bars, time_series_key, time_series_payload
+
+DIRECTORY = Path(__file__).with_name("fixtures")
+INTERVALS = ["1min", "15min", "1day", "1week"]
+SIZES = ["compact", "full"]
+
+# Bars in a full response: 30 days of extended-hours intraday bars, daily and weekly since late 1999
+FULL_BARS = {"1min": 20_160, "15min": 1_344, "1day": 6_300, "1week": 1_350}
+
+
+def path(interval, size):
+    return DIRECTORY / f"{interval}-{size}.json.gz"
+
+
+def generate(interval, size):
+    """The response body for one fixture, from synthetic bars (weekly has no compact size, as in the API)."""
+    frame = synthetic_bars(FULL_BARS[interval], FREQUENCIES[interval], seed=INTERVALS.index(interval))
+    if size == "compact" and interval != "1week":
+        frame = frame.iloc[-COMPACT_BARS:]
+    return json.dumps(time_series_payload(frame, interval)).encode()
+
+
+def load(interval, size):
+    """Response body bytes of one fixture, generating and saving it the first time."""
+    file = path(interval, size)
+    if not file.exists():
+        DIRECTORY.mkdir(exist_ok=True)
+        # mtime=0 keeps the gzip bytes the same on every machine
+        file.write_bytes(gzip.compress(generate(interval, size), mtime=0))
+    return gzip.decompress(file.read_bytes())
+
+
+def digest(interval, size):
+    """Short SHA-256 of a fixture's body, to tell whether two runs parsed the same data."""
+    return hashlib.sha256(load(interval, size)).hexdigest()[:12]
+
+
+def record(ticker, api_key):
+    """Replace every fixture with the API's actual response for ticker."""
+    DIRECTORY.mkdir(exist_ok=True)
+    for interval in INTERVALS:
+        for size in SIZES:
+            url, ts_key = build_request(ticker, interval, True, size == "full", api_key)
+            resp = session().get(url, timeout=(3.05, 60))
+            resp.raise_for_status()
+            body = resp.content
+            # Parsing first keeps an error or throttling note from replacing a good fixture
+            bars = len(parse_time_series(_loads(body), ts_key))
+            path(interval, size).write_bytes(gzip.compress(body, mtime=0))
+            print(f"{interval:>6} {size:<8} {bars:7,} bars  {len(body) / 1e6:6.2f} MB")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.fixtures", description=__doc__.splitlines()[0])
+    parser.add_argument("--record", action="store_true", help="fetch real responses instead of generating")
+    parser.add_argument("--ticker", default="IBM")
+    parser.add_argument("--api-key", default=os.environ.get("ALPHA_VANTAGE_API_KEY", "demo"))
+    args = parser.parse_args(argv)
+    if args.record:
+        record(args.ticker, args.api_key)
+        return
+    for interval in INTERVALS:
+        for size in SIZES:
+            body = load(interval, size)
+            print(f"{interval:>6} {size:<8} {len(body) / 1e6:6.2f} MB  {digest(interval, size)}  "
+                  f"{time_series_key(interval)}")
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
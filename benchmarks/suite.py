@@ -0,0 +1,226 @@
+"""Stage-by-stage timings of the pipeline, written as JSON for comparing commits.
+
+Times parsing the recorded Alpha Vantage responses (benchmarks/fixtures.py),
+each calculate_indicators group, the candlestick patterns, calculate_score
+on the latest bar, the backtest and the 64-configuration optimizer, at
+several history sizes of synthetic bars. Every case runs once to warm up
+and then --repeat times; the JSON keeps min, median and mean seconds, and
+rate is units per second at the minimum.
+
+Run from the repository root:
+
+    python -m benchmarks.suite run [--sizes 1000 10000 100000] [--repeat 5] [--stages ...] [--output FILE]
+    python -m benchmarks.suite compare OLD.json NEW.json [--threshold 0.1]
+
+run writes benchmarks/results/<commit>.json unless --output is given.
+compare prints each case's change in minimum time and exits with status 1
+when any case is slower than the threshold allows.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import fixtures
+from predictor.backtest import run_backtest
+from predictor.client import _loads
+from predictor.data import parse_time_series
+from predictor.indicators import FLAGS, GROUPS, add_patterns, calculate_indicators
+from predictor.optimizer import run_optimization
+from predictor.scoring import calculate_score
+from predictor.synthetic import synthetic_bars, time_series_key
+
+RESULTS = Path(__file__).with_name("results")
+STAGES = ["parse", "indicators", "patterns", "score", "backtest", "optimize"]
+SIZES = [1_000, 10_000, 100_000]
+ALL = (True,) * len(FLAGS)
+SENSITIVITY = 4
+# calculate_score takes well under a millisecond; one timed run is this many calls
+SCORE_CALLS = 200
+
+
+def measure(fn, setup=None, repeat=5, number=1):
+    """Seconds per call of fn(*setup()), one warm-up run then repeat timed runs; setup is not timed."""
+    times = []
+    for run in range(repeat + 1):
+        args = setup() if setup else ()
+        start = time.perf_counter()
+        for _ in range(number):
+            fn(*args)
+        if run:
+            times.append((time.perf_counter() - start) / number)
+    return times
+
+
+def result(stage, case, bars, times, units=None, unit="bars"):
+    best = min(times)
+    return {'stage': stage, 'case': case, 'bars': bars, 'repeat': len(times),
+            'min_s': best, 'median_s': statistics.median(times), 'mean_s': statistics.fmean(times),
+            'unit': unit, 'rate': (bars if units is None else units) / best}
+
+
+def flags_for(group):
+    return tuple(name == group for name in FLAGS)
+
+
+def parse_stage(sizes, repeat):
+    # Fixtures have their own sizes; the history sizes only apply to the other stages
+    for interval in fixtures.INTERVALS:
+        for size in fixtures.SIZES:
+            body, ts_key = fixtures.load(interval, size), time_series_key(interval)
+            bars = len(parse_time_series(_loads(body), ts_key))
+            times = measure(lambda: parse_time_series(_loads(body), ts_key), repeat=repeat)
+            yield result('parse', f"{interval}/{size}", bars, times)
+
+
+def indicators_stage(sizes, repeat):
+    for n in sizes:
+        bars = synthetic_bars(n)
+        for group in GROUPS + ['all']:
+            flags = ALL if group == 'all' else flags_for(group)
+            times = measure(calculate_indicators, lambda: (bars.copy(), *flags), repeat)
+            yield result('indicators', f"{group}/{n}", n, times)
+
+
+def patterns_stage(sizes, repeat):
+    for n in sizes:
+        bars = synthetic_bars(n)
+        yield result('patterns', f"{n}", n, measure(add_patterns, lambda: (bars.copy(),), repeat))
+
+
+def prepared(n):
+    return add_patterns(calculate_indicators(synthetic_bars(n), *ALL))
+
+
+def score_stage(sizes, repeat, frames):
+    for n in sizes:
+        df = frames(n)
+        times = measure(lambda: calculate_score(df, *ALL), repeat=repeat, number=SCORE_CALLS)
+        yield result('score', f"{n}", n, times, units=1, unit="calls")
+
+
+def backtest_stage(sizes, repeat, frames):
+    for n in sizes:
+        df = frames(n)
+        yield result('backtest', f"{n}", n, measure(lambda: run_backtest(df, ALL, SENSITIVITY), repeat=repeat))
+
+
+def optimize_stage(sizes, repeat, frames):
+    for n in sizes:
+        df = frames(n)
+        times = measure(lambda: run_optimization(df, SENSITIVITY), repeat=repeat)
+        yield result('optimize', f"{n}", n, times, units=64, unit="configs")
+
+
+def git(*args):
+    try:
+        return subprocess.run(["git", *args], capture_output=True, text=True, check=True,
+                              cwd=Path(__file__).parent).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    try:
+        import talib
+        talib_version = talib.__version__
+    except ImportError:
+        talib_version = None
+    commit = git("rev-parse", "--short", "HEAD")
+    return {
+        'commit': commit,
+        'dirty': bool(git("status", "--porcelain", "--untracked-files=no")) if commit else None,
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'numpy': np.__version__,
+        'pandas': pd.__version__,
+        'talib': talib_version,
+        'platform': platform.platform(),
+        'processor': platform.machine(),
+        'cpu_count': os.cpu_count(),
+        'fixtures': {f"{interval}/{size}": fixtures.digest(interval, size)
+                     for interval in fixtures.INTERVALS for size in fixtures.SIZES},
+    }
+
+
+def run(args):
+    cache = {}
+
+    def frames(n):
+        # Indicators and patterns for the scoring stages, computed once per size
+        if n not in cache:
+            cache[n] = prepared(n)
+        return cache[n]
+
+    stages = {'parse': parse_stage, 'indicators': indicators_stage, 'patterns': patterns_stage,
+              'score': lambda sizes, repeat: score_stage(sizes, repeat, frames),
+              'backtest': lambda sizes, repeat: backtest_stage(sizes, repeat, frames),
+              'optimize': lambda sizes, repeat: optimize_stage(sizes, repeat, frames)}
+    report = {'meta': environment(), 'results': []}
+    report['meta'].update({'sizes': args.sizes, 'repeat': args.repeat})
+    for stage in args.stages:
+        for row in stages[stage](args.sizes, args.repeat):
+            report['results'].append(row)
+            print(f"{row['stage']:<11} {row['case']:<22} {row['min_s'] * 1e3:10.3f} ms  "
+                  f"{row['rate']:14,.0f} {row['unit']}/s", flush=True)
+
+    meta = report['meta']
+    output = args.output or RESULTS / f"{meta['commit'] or 'local'}{'-dirty' if meta['dirty'] else ''}.json"
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2) + "\n")
+    print(f"wrote {output}")
+
+
+def compare(args):
+    old, new = (json.loads(Path(path).read_text()) for path in (args.old, args.new))
+    for key in ('fixtures', 'cpu_count', 'platform'):
+        if old['meta'].get(key) != new['meta'].get(key):
+            print(f"note: {key} differs between the runs")
+    before = {(row['stage'], row['case']): row for row in old['results']}
+    regressions = 0
+    for row in new['results']:
+        base = before.get((row['stage'], row['case']))
+        if base is None:
+            continue
+        ratio = row['min_s'] / base['min_s']
+        slower = ratio > 1 + args.threshold
+        regressions += slower
+        print(f"{row['stage']:<11} {row['case']:<22} {base['min_s'] * 1e3:10.3f} -> {row['min_s'] * 1e3:10.3f} ms"
+              f"  {ratio:6.2f}x{'  SLOWER' if slower else ''}")
+    print(f"{regressions} regression(s) over {args.threshold:.0%}: {old['meta']['commit']} -> {new['meta']['commit']}")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite", description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    p = commands.add_parser("run", help="time the stages and write a JSON report")
+    p.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="history sizes in bars")
+    p.add_argument("--repeat", type=int, default=5)
+    p.add_argument("--stages", nargs="+", choices=STAGES, default=STAGES)
+    p.add_argument("--output", help="report path (default: benchmarks/results/<commit>.json)")
+    p.set_defaults(func=run)
+
+    p = commands.add_parser("compare", help="compare two reports, exit 1 on a regression")
+    p.add_argument("old")
+    p.add_argument("new")
+    p.add_argument("--threshold", type=float, default=0.10, help="allowed slowdown of the minimum time")
+    p.set_defaults(func=compare)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
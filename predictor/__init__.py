@@ -0,0 +1,4 @@
+"""Candlestick Predictor core: the scoring and backtest logic behind app.py.
+
+Importable without Streamlit; `python -m predictor --help` lists the command line jobs.
+"""
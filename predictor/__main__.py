@@ -0,0 +1,5 @@
+# python -m predictor ...
+from .cli import main
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,275 @@
+# Telegram delivery: one bot on a background event loop, and a daemon that pushes live signal alerts
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+
+import pandas as pd
+from telegram import Bot
+from telegram.error import RetryAfter, TelegramError
+
+from .data import fetch_data
+from .metrics import ALERT_CLOSE_LATENCY, ALERT_LATENCY, SCORES, SIGNAL_DIRECTIONS, TELEGRAM_SECONDS
+from .poller import INTERVAL_SECONDS, get_poller
+from .scoring import calculate_score, signal_direction
+
+DEFAULT_URL = "https://api.telegram.org/bot"
+# Seconds alerts are collected before sending, so one candle close makes one message per chat
+BATCH_WINDOW = 0.2
+# Telegram rejects longer messages
+MAX_MESSAGE_CHARS = 4096
+# (ticker, bar, direction) alerts remembered to drop repeats
+SEEN_ALERTS = 10_000
+LATENCY_SAMPLES = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def bar_close(bar, interval):
+    """Epoch seconds when bar's candle closed: its start plus the interval, 16:00 for daily and weekly bars."""
+    bar = pd.Timestamp(bar)
+    if bar.tzinfo is None:
+        bar = bar.tz_localize('US/Eastern')
+    step = INTERVAL_SECONDS.get(interval)
+    if step is None:
+        # Daily bars are labelled with their date, weekly ones with their last trading day
+        return (bar.normalize() + pd.Timedelta(hours=16)).timestamp()
+    return bar.timestamp() + step
+
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    return {name: 1000 * samples[int(q * (len(samples) - 1))] if samples else 0.0
+            for name, q in (('p50', 0.50), ('p99', 0.99), ('max', 1.0))}
+
+
+def _seconds(delay):
+    return delay.total_seconds() if hasattr(delay, 'total_seconds') else float(delay)
+
+
+class TelegramSender:
+    """One Bot, and so one pooled HTTP client, on an event loop in its own thread.
+
+    send() can be called from any thread, Streamlit's script threads
+    included, and returns a concurrent.futures.Future with the sent message.
+    The bot is initialized on the first send, and again on the next one
+    if that fails.
+    """
+
+    def __init__(self, token, base_url=None):
+        self.bot = Bot(token=token, base_url=base_url or os.environ.get("TELEGRAM_API_URL", DEFAULT_URL))
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.loop.run_forever, name="telegram", daemon=True)
+        self.thread.start()
+        self._init = None
+
+    def submit(self, coro):
+        return asyncio.run_coroutine_threadsafe(coro, self.loop)
+
+    def send(self, chat_id, text):
+        return self.submit(self.send_message(chat_id, text))
+
+    async def send_message(self, chat_id, text):
+        if self._init is None:
+            self._init = asyncio.ensure_future(self.bot.initialize())
+        init = self._init
+        try:
+            await asyncio.shield(init)
+        except Exception:
+            # A failed start (network blip, bad token) is tried again by the next send
+            if self._init is init:
+                self._init = None
+            raise
+        start = time.perf_counter()
+        try:
+            try:
+                message = await self.bot.send_message(chat_id=chat_id, text=text)
+            except RetryAfter as e:
+                # Flood control: wait as long as Telegram asks, then try once more
+                await asyncio.sleep(_seconds(e.retry_after))
+                message = await self.bot.send_message(chat_id=chat_id, text=text)
+        except Exception:
+            TELEGRAM_SECONDS.observe(time.perf_counter() - start, result="error")
+            raise
+        TELEGRAM_SECONDS.observe(time.perf_counter() - start, result="ok")
+        return message
+
+    async def _shutdown(self):
+        if self._init is None:
+            return
+        try:
+            await asyncio.shield(self._init)
+        except Exception:
+            return  # never initialized, nothing to shut down
+        await self.bot.shutdown()
+
+    def close(self):
+        self.submit(self._shutdown()).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+
+
+_senders = {}
+_senders_lock = threading.Lock()
+
+
+def get_sender(token, base_url=None):
+    """The shared TelegramSender for a bot token, created on first use."""
+    with _senders_lock:
+        if (token, base_url) not in _senders:
+            _senders[(token, base_url)] = TelegramSender(token, base_url)
+        return _senders[(token, base_url)]
+
+
+def format_alerts(alerts, interval, limit=MAX_MESSAGE_CHARS):
+    """Message texts for a batch of alerts, split to fit Telegram's length limit."""
+    lines = []
+    for alert in alerts:
+        icon = "🟢" if alert['direction'] == "BULLISH" else "🔴"
+        lines.append(f"{icon} {alert['ticker']} {alert['direction']} (score {alert['score']:+.1f}) "
+                     f"close {alert['close']:.2f} | {interval} bar {alert['bar'].strftime('%m/%d %H:%M %Z')}")
+        if alert['signals']:
+            lines.append(f"    {', '.join(alert['signals'])}"[:limit])
+    texts = []
+    text = ""
+    for line in lines:
+        if text and len(text) + 1 + len(line) > limit:
+            texts.append(text)
+            text = ""
+        text = f"{text}\n{line}" if text else line
+    if text:
+        texts.append(text)
+    return texts
+
+
+class AlertDaemon:
+    """Sends a Telegram alert when a watched symbol's live score crosses sensitivity.
+
+    Each ticker is followed through the shared background poller, so the
+    latest candle is scored with calculate_score as soon as a poll brings it
+    in. A symbol alerts when it turns BULLISH or BEARISH; the same bar and
+    direction never alerts twice. The first poll of each symbol only
+    records its direction, so a restarted daemon doesn't alert on every
+    symbol that is already BULLISH or BEARISH. Alerts raised within batch_window of each
+    other go out together, one message per chat, through sender.
+    """
+
+    def __init__(self, sender, chat_ids, tickers, interval, extended, flags, sensitivity,
+                 api_key=None, cache=None, fetch=None, batch_window=BATCH_WINDOW):
+        self.sender = sender
+        self.chat_ids = list(chat_ids)
+        self.tickers = list(tickers)
+        self.interval = interval
+        self.extended = extended
+        self.flags = tuple(flags)
+        self.sensitivity = sensitivity
+        # Every poll tops up the bars, whatever the cache TTL
+        self.fetch = fetch or (lambda ticker: fetch_data(ticker, interval, extended, api_key=api_key,
+                                                         cache=cache, max_age=0))
+        self.batch_window = batch_window
+        self.lock = threading.Lock()
+        self.directions = {}
+        self.seen = OrderedDict()
+        self.pending = []
+        self.flushing = False
+        self.pollers = []
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.close_latencies = deque(maxlen=LATENCY_SAMPLES)
+        self.stats = {'alerts': 0, 'duplicates': 0, 'messages': 0, 'errors': 0}
+        self.last_error = None
+
+    def start(self):
+        for ticker in self.tickers:
+            poller = get_poller(ticker, self.interval, self.extended, lambda ticker=ticker: self.fetch(ticker))
+            poller.listen(self.flags, self._on_snapshot)
+            self.pollers.append(poller)
+        return self
+
+    def stop(self):
+        for poller in self.pollers:
+            poller.unlisten(self.flags, self._on_snapshot)
+        self.pollers = []
+
+    def _on_snapshot(self, key, snapshot):
+        # Runs on the poller's thread, right after the new bars are synced
+        df = snapshot['frame']
+        latest = df.iloc[-1]
+        score, signals = calculate_score(df, *self.flags)
+        direction = signal_direction(score, self.sensitivity)
+        SCORES.observe(score)
+        SIGNAL_DIRECTIONS.inc(direction=direction)
+        ticker = key[0]
+        with self.lock:
+            first = ticker not in self.directions
+            previous = self.directions.get(ticker)
+            self.directions[ticker] = direction
+            if first or direction == "NEUTRAL" or direction == previous:
+                return
+            seen = (ticker, df.index[-1], direction)
+            if seen in self.seen:
+                self.stats['duplicates'] += 1
+                return
+            self.seen[seen] = True
+            if len(self.seen) > SEEN_ALERTS:
+                self.seen.popitem(last=False)
+            self.stats['alerts'] += 1
+        alert = {'ticker': ticker, 'direction': direction, 'score': float(score), 'close': float(latest['close']),
+                 'bar': df.index[-1], 'signals': list(signals), 'polled_at': snapshot['fetched_at'].timestamp(),
+                 'closed_at': bar_close(df.index[-1], self.interval)}
+        self.sender.loop.call_soon_threadsafe(self._queue, alert)
+
+    def _queue(self, alert):
+        self.pending.append(alert)
+        if not self.flushing:
+            self.flushing = True
+            self.sender.loop.call_later(self.batch_window, lambda: asyncio.ensure_future(self._flush()))
+
+    async def _flush(self):
+        batch, self.pending, self.flushing = self.pending, [], False
+        texts = format_alerts(batch, self.interval)
+
+        async def deliver(chat_id):
+            # A chat's messages go in order, chats in parallel
+            sent = 0
+            for text in texts:
+                try:
+                    await self.sender.send_message(chat_id, text)
+                    sent += 1
+                except (TelegramError, OSError, asyncio.TimeoutError) as e:
+                    # Telegram refusing the message, or the network failing under it: the next alert tries again
+                    logger.warning("alert to chat %s failed: %s", chat_id, e)
+                    with self.lock:
+                        self.stats['errors'] += 1
+                        self.last_error = str(e)
+                except Exception as e:
+                    # Anything else is a bug, but it must not stop the other chats or the latency accounting
+                    logger.exception("alert to chat %s failed", chat_id)
+                    with self.lock:
+                        self.stats['errors'] += 1
+                        self.last_error = repr(e)
+            return sent
+
+        sent = await asyncio.gather(*(deliver(chat_id) for chat_id in self.chat_ids))
+        now = time.time()
+        with self.lock:
+            self.stats['messages'] += sum(sent)
+            self.latencies.extend(now - alert['polled_at'] for alert in batch)
+            self.close_latencies.extend(now - alert['closed_at'] for alert in batch)
+        for alert in batch:
+            ALERT_LATENCY.observe(now - alert['polled_at'])
+            ALERT_CLOSE_LATENCY.observe(now - alert['closed_at'])
+
+    def metrics(self):
+        with self.lock:
+            latencies, close_latencies = list(self.latencies), list(self.close_latencies)
+            metrics = dict(self.stats)
+            metrics['watching'] = len(self.pollers)
+            metrics['last_error'] = self.last_error
+        # Milliseconds to Telegram accepting the message: latency_ms_* from the poll that brought in
+        # the bar, close_latency_ms_* from the candle's close (the poll delay and publish wait included)
+        for name, value in _percentiles(latencies).items():
+            metrics[f'latency_ms_{name}'] = value
+        for name, value in _percentiles(close_latencies).items():
+            metrics[f'close_latency_ms_{name}'] = value
+        return metrics
@@ -0,0 +1,81 @@
+# Vectorized backtest engine for the Backtest tab
+import numpy as np
+
+from .scoring import calculate_score, score_frame, signal_direction
+from .timing import stage
+
+# Bars before each indicator flag's columns fill in (volume SMA, SMA_50, MACD 26 + 9, OBV SMA,
+# RSI 14 + Stoch 14, Fibonacci, swings, zone quantiles), in calculate_indicators' flag order
+WARMUP = [20, 50, 33, 20, 27, 0, 0, 20]
+
+
+def backtest_start(flags):
+    # Skip the warm-up bars the enabled indicators need
+    return max([bars for bars, enabled in zip(WARMUP, flags) if enabled], default=0)
+
+
+def tally(scores, close, sensitivity, start_idx=0):
+    """Compare each bar's prediction with the next candle's direction.
+
+    Neutral predictions are skipped. Returns the counts the Backtest tab
+    reports.
+    """
+    scores = np.asarray(scores)[start_idx:-1]
+    close = np.asarray(close, dtype=np.float64)
+    went_up = close[start_idx + 1:] > close[start_idx:-1]
+
+    bullish = scores > sensitivity
+    bearish = scores < -sensitivity
+    bullish_correct = int(np.count_nonzero(bullish & went_up))
+    bearish_correct = int(np.count_nonzero(bearish & ~went_up))
+    bullish_total = int(np.count_nonzero(bullish))
+    bearish_total = int(np.count_nonzero(bearish))
+
+    return {
+        'correct': bullish_correct + bearish_correct,
+        'total': bullish_total + bearish_total,
+        'bullish_correct': bullish_correct,
+        'bullish_total': bullish_total,
+        'bearish_correct': bearish_correct,
+        'bearish_total': bearish_total,
+    }
+
+
+def run_backtest(df, flags, sensitivity):
+    """Counts of the live signal's predictions over df, with the eight indicator flags of the sidebar.
+
+    df needs the pattern columns and the indicators of the enabled flags.
+    """
+    with stage("score"):
+        scores, _ = score_frame(df, flags)
+    with stage("tally"):
+        return tally(scores, df['close'].to_numpy(dtype=np.float64), sensitivity, backtest_start(flags))
+
+
+def run_backtest_loop(df, flags, sensitivity):
+    """Reference per-candle implementation that run_backtest must match: calculate_score on each prefix."""
+    counts = dict.fromkeys(['correct', 'total', 'bullish_correct', 'bullish_total',
+                            'bearish_correct', 'bearish_total'], 0)
+
+    for i in range(backtest_start(flags), len(df) - 1):
+        current = df.iloc[i]
+        next_candle = df.iloc[i + 1]
+
+        score, _ = calculate_score(df.iloc[:i + 1], *flags)
+        prediction = signal_direction(score, sensitivity)
+        if prediction == "NEUTRAL":
+            continue
+
+        actual_direction = "BULLISH" if next_candle['close'] > current['close'] else "BEARISH"
+        counts['total'] += 1
+        if prediction == actual_direction:
+            counts['correct'] += 1
+
+        if prediction == "BULLISH":
+            counts['bullish_total'] += 1
+            if actual_direction == "BULLISH": counts['bullish_correct'] += 1
+        else:
+            counts['bearish_total'] += 1
+            if actual_direction == "BEARISH": counts['bearish_correct'] += 1
+
+    return counts
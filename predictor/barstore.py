@@ -0,0 +1,161 @@
+# Local history of every series fetched: append-only bar files read through memory maps
+import os
+import tempfile
+import threading
+
+import numpy as np
+import pandas as pd
+
+from .cache import COLUMNS, DEFAULT_DIR, check_ticker
+
+ROW_BYTES = 8 * len(COLUMNS)
+
+# One lock per series file, shared by every BarStore in the process (the app's, the CLI's, ...)
+_series_locks = {}
+_series_locks_lock = threading.Lock()
+
+
+def _series_lock(path):
+    key = os.path.realpath(path)
+    with _series_locks_lock:
+        return _series_locks.setdefault(key, threading.Lock())
+
+
+def _ns(when):
+    """UTC nanoseconds of a timestamp; naive times are US/Eastern like the bars."""
+    when = pd.Timestamp(when)
+    if when.tzinfo is None:
+        when = when.tz_localize('US/Eastern')
+    return when.value
+
+
+class BarStore:
+    """Append-only OHLCV files per (ticker, interval, extended), read through memory maps.
+
+    Each series is a .ts file of int64 UTC nanosecond timestamps and an
+    .ohlcv file of the matching float64 rows (open, high, low, close,
+    volume). Bars newer than the last stored one are appended, so the
+    history grows past what one outputsize=full call returns. Range
+    queries binary-search the timestamps and return views into the mapped
+    files: only the pages a query covers are read, and nothing is copied.
+    Appends to a series are serialized across all BarStore instances in a
+    process. One process should write a store; any number can read it.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory or os.environ.get("PREDICTOR_BAR_STORE", os.path.join(DEFAULT_DIR, "bars"))
+        os.makedirs(self.directory, exist_ok=True)
+        self._maps = {}
+
+    def paths(self, ticker, interval, extended):
+        session = "ext" if extended else "reg"
+        base = os.path.join(self.directory, f"{check_ticker(ticker)}_{interval}_{session}")
+        return base + ".ts", base + ".ohlcv"
+
+    def _open(self, ticker, interval, extended):
+        ts_path, ohlcv_path = self.paths(ticker, interval, extended)
+        try:
+            ts_stat, ohlcv_stat = os.stat(ts_path), os.stat(ohlcv_path)
+        except FileNotFoundError:
+            return np.empty(0, dtype=np.int64), np.empty((0, len(COLUMNS)))
+        # The rows are written before their timestamps, a torn append leaves extra rows only
+        n = min(ts_stat.st_size // 8, ohlcv_stat.st_size // ROW_BYTES)
+        version = (n, ts_stat.st_ino, ohlcv_stat.st_ino)
+        cached = self._maps.get(ts_path)
+        if cached is None or cached[0] != version:
+            if n == 0:
+                return np.empty(0, dtype=np.int64), np.empty((0, len(COLUMNS)))
+            ts = np.memmap(ts_path, dtype='<i8', mode='r', shape=(n,))
+            ohlcv = np.memmap(ohlcv_path, dtype='<f8', mode='r', shape=(n, len(COLUMNS)))
+            cached = self._maps[ts_path] = (version, ts, ohlcv)
+        return cached[1], cached[2]
+
+    def read(self, ticker, interval, extended, start=None, end=None):
+        """(timestamps, rows) of the bars from start to end inclusive, as views into the files.
+
+        timestamps are int64 UTC nanoseconds, rows an (n, 5) float64 array in
+        COLUMNS order. start and end are anything pd.Timestamp accepts.
+        """
+        ts, ohlcv = self._open(ticker, interval, extended)
+        lo = 0 if start is None else int(np.searchsorted(ts, _ns(start), 'left'))
+        hi = len(ts) if end is None else int(np.searchsorted(ts, _ns(end), 'right'))
+        return ts[lo:hi], ohlcv[lo:hi]
+
+    def frame(self, ticker, interval, extended, start=None, end=None):
+        """OHLCV frame in US/Eastern for a date range, its values a read-only view of the file."""
+        times, rows = self.read(ticker, interval, extended, start, end)
+        index = pd.DatetimeIndex(np.asarray(times).view('M8[ns]')).tz_localize('UTC').tz_convert('US/Eastern')
+        return pd.DataFrame(np.asarray(rows), index=index, columns=COLUMNS, copy=False)
+
+    def extent(self, ticker, interval, extended):
+        """(first bar, last bar, bar count) of a stored series, or None."""
+        ts, _ = self._open(ticker, interval, extended)
+        if not len(ts):
+            return None
+        first, last = (pd.Timestamp(int(t), tz='UTC').tz_convert('US/Eastern') for t in (ts[0], ts[-1]))
+        return first, last, len(ts)
+
+    def series(self):
+        """(ticker, interval, extended) of every stored series."""
+        keys = []
+        for name in sorted(os.listdir(self.directory)):
+            if name.endswith(".ts"):
+                ticker, interval, session = name[:-len(".ts")].rsplit("_", 2)
+                keys.append((ticker, interval, session == "ext"))
+        return keys
+
+    def append(self, ticker, interval, extended, df):
+        """Add the bars of df that are not stored yet; returns how many were added.
+
+        A revised last bar (the candle that was still forming) is rewritten
+        in place. Bars older than the first stored one mean a rewrite of the
+        whole series; bars inside the stored range are left alone.
+        """
+        if not len(df):
+            return 0
+        times = df.index.asi8
+        rows = np.ascontiguousarray(df[COLUMNS].to_numpy(dtype=np.float64))
+        ts_path, ohlcv_path = self.paths(ticker, interval, extended)
+        with _series_lock(ts_path):
+            ts, ohlcv = self._open(ticker, interval, extended)
+            if len(ts) and times[0] < ts[0]:
+                return self._merge(ticker, interval, extended, times, rows, ts, ohlcv)
+            added = times > ts[-1] if len(ts) else np.ones(len(times), dtype=bool)
+            if len(ts):
+                k = int(np.searchsorted(times, ts[-1]))
+                if k < len(times) and times[k] == ts[-1] and not np.array_equal(rows[k], ohlcv[-1]):
+                    with open(ohlcv_path, "r+b") as f:
+                        f.seek((len(ts) - 1) * ROW_BYTES)
+                        f.write(rows[k].tobytes())
+            if added.any():
+                # Truncate a torn append before adding after it
+                self._append_files(ts_path, ohlcv_path, len(ts), times[added], rows[added])
+            return int(added.sum())
+
+    def _append_files(self, ts_path, ohlcv_path, n, times, rows):
+        for path, width in ((ohlcv_path, ROW_BYTES), (ts_path, 8)):
+            if os.path.exists(path) and os.path.getsize(path) != n * width:
+                os.truncate(path, n * width)
+        with open(ohlcv_path, "ab") as f:
+            f.write(rows.astype('<f8').tobytes())
+        with open(ts_path, "ab") as f:
+            f.write(times.astype('<i8').tobytes())
+
+    def _merge(self, ticker, interval, extended, times, rows, ts, ohlcv):
+        # Older history than stored: interleave and write new files, stored bars win on ties
+        all_times = np.concatenate((np.asarray(ts), times))
+        all_rows = np.concatenate((np.asarray(ohlcv), rows))
+        all_times, first = np.unique(all_times, return_index=True)
+        all_rows = all_rows[first]
+        ts_path, ohlcv_path = self.paths(ticker, interval, extended)
+        for path, data in ((ohlcv_path, all_rows.astype('<f8')), (ts_path, all_times.astype('<i8'))):
+            fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            with os.fdopen(fd, "wb") as f:
+                f.write(data.tobytes())
+            os.replace(tmp, path)
+        return len(all_times) - len(ts)
+
+    def import_cache(self, cache):
+        """Append every series held in a BarCache; returns {(ticker, interval, extended): bars added}."""
+        return {(ticker, interval, extended): self.append(ticker, interval, extended, frame)
+                for ticker, interval, extended, frame in cache.entries()}
@@ -0,0 +1,162 @@
+# Persistent on-disk OHLCV cache in front of the Alpha Vantage fetch
+import logging
+import os
+import re
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from .metrics import BAR_CACHE
+from .timing import stage
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ["open", "high", "low", "close", "volume"]
+
+# Bars in a compact response
+COMPACT_BARS = 100
+
+# Seconds a cached series is served without asking the API for new bars
+CACHE_TTL = {"1min": 30, "5min": 60, "15min": 120, "30min": 300, "60min": 600,
+             "1day": 3600, "1week": 6 * 3600}
+
+DEFAULT_DIR = os.path.join(os.path.expanduser("~"), ".cache", "candlestick-predictor")
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+# Tickers as Alpha Vantage spells them (BRK.B, RDS-A); anything else could name a path outside the directory
+TICKER_PATTERN = re.compile(r"[A-Za-z0-9.\-]+")
+
+
+def check_ticker(ticker):
+    """ticker, if it is safe to use in a file name; raises ValueError otherwise."""
+    if not isinstance(ticker, str) or not TICKER_PATTERN.fullmatch(ticker) or set(ticker) == {"."}:
+        raise ValueError(f"invalid ticker {ticker!r}: only letters, digits, '.' and '-' are allowed")
+    return ticker
+
+
+class BarCache:
+    """Columnar .npz files keyed by (ticker, interval, extended).
+
+    A hit within the interval's TTL is served from disk. A stale entry is
+    topped up with the compact tail and the new bars merged in, so only the
+    first request for a series pays for the full history. If the top-up
+    fails, the cached bars are served and a warning logged. The least recently
+    used files are evicted once the directory grows past max_bytes.
+    """
+
+    def __init__(self, directory=None, max_bytes=None):
+        self.directory = directory or os.environ.get("PREDICTOR_CACHE_DIR", DEFAULT_DIR)
+        self.max_bytes = max_bytes or int(os.environ.get("PREDICTOR_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        os.makedirs(self.directory, exist_ok=True)
+
+    def path(self, ticker, interval, extended):
+        session = "ext" if extended else "reg"
+        return os.path.join(self.directory, f"{check_ticker(ticker)}_{interval}_{session}.npz")
+
+    def get(self, ticker, interval, extended, full, fetch, max_age=None):
+        """Return the series, calling fetch(full) only for what the cache lacks.
+
+        max_age overrides the interval's TTL; 0 always tops up with new bars.
+        """
+        path = self.path(ticker, interval, extended)
+        with stage("bar cache read"):
+            frame, fetched_at, has_full = self._load(path)
+
+        if frame is not None and (has_full or not full):
+            if max_age is None:
+                max_age = CACHE_TTL.get(interval, 60)
+            if time.time() - fetched_at < max_age:
+                BAR_CACHE.inc(result="fresh")
+                return self._view(frame, interval, full, fetched_at)
+
+            try:
+                tail = fetch(False)
+            except Exception as e:
+                BAR_CACHE.inc(result="stale")
+                logger.warning("top-up of %s %s failed, serving cached bars from %s: %s", ticker, interval,
+                               pd.Timestamp(fetched_at, unit='s', tz='UTC').isoformat(), e)
+                return self._view(frame, interval, full, fetched_at)
+            BAR_CACHE.inc(result="topup")
+            # The compact tail must overlap the cached bars, otherwise bars are missing in between
+            if len(tail) and tail.index[0] <= frame.index[-1]:
+                merged = pd.concat([frame, tail])
+                merged = merged[~merged.index.duplicated(keep='last')].sort_index()
+                self._save(path, merged, has_full)
+                return self._view(merged, interval, full, time.time())
+            if not has_full:
+                self._save(path, tail, False)
+                return self._view(tail, interval, full, time.time())
+
+        BAR_CACHE.inc(result="miss")
+        fetch_full = full or has_full
+        frame = fetch(fetch_full)
+        self._save(path, frame, fetch_full)
+        return self._view(frame, interval, full, time.time())
+
+    def entries(self):
+        """(ticker, interval, extended, frame) for every series in the cache."""
+        for name in sorted(os.listdir(self.directory)):
+            if not name.endswith(".npz"):
+                continue
+            ticker, interval, session = name[:-len(".npz")].rsplit("_", 2)
+            frame, _, _ = self._load(os.path.join(self.directory, name))
+            if frame is not None:
+                yield ticker, interval, session == "ext", frame
+
+    def _view(self, frame, interval, full, fetched_at):
+        # Weekly series have no compact size, the API always returns all of it
+        view = frame if full or interval == "1week" else frame.iloc[-COMPACT_BARS:]
+        # When the newest bars were fetched, so caches in front of this one don't add their own TTL to it
+        view.attrs['fetched_at'] = fetched_at
+        return view
+
+    def _load(self, path):
+        try:
+            with np.load(path) as data:
+                index = pd.DatetimeIndex(data['index'], tz='UTC').tz_convert('US/Eastern')
+                frame = pd.DataFrame({c: data[c] for c in COLUMNS}, index=index)
+                fetched_at, has_full = float(data['fetched_at']), bool(data['full'])
+        except (OSError, KeyError, ValueError):
+            return None, 0.0, False
+        # Mark as recently used for eviction
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return frame, fetched_at, has_full
+
+    def _save(self, path, frame, has_full):
+        with stage("bar cache write"):
+            self._write(path, frame, has_full)
+
+    def _write(self, path, frame, has_full):
+        arrays = {c: frame[c].to_numpy(dtype=np.float64) for c in COLUMNS}
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "wb") as f:
+            np.savez(f, index=frame.index.asi8, fetched_at=time.time(), full=has_full, **arrays)
+        os.replace(tmp, path)
+        self._evict(keep=path)
+
+    def _evict(self, keep):
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(".npz"):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if path != keep:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total -= size
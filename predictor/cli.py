@@ -0,0 +1,285 @@
+# Command line entry point: the app's scoring, backtest and optimizer without Streamlit
+import argparse
+import json
+import os
+import sys
+import time
+
+import pandas as pd
+
+from .alerts import AlertDaemon, get_sender
+from .backtest import run_backtest
+from .barstore import BarStore
+from .cache import BarCache
+from .data import AlphaVantageError, fetch_data
+from .indicators import add_patterns, calculate_indicators
+from .metrics import start_server
+from .optimizer import run_optimization
+from .scanner import parse_watchlist, scan, score_symbol
+from .sweep import random_search, successive_halving
+from .timeframes import CONFLUENCE_TIMEFRAMES, MINUTES, base_interval, confluence, resample_bars
+from .walkforward import walk_forward
+from .workers import process_pool
+
+INTERVALS = ["1min", "5min", "15min", "30min", "60min", "1day", "1week"]
+
+# Same order as calculate_indicators' flags; the app's sidebar defaults are on
+INDICATORS = ["momentum", "trend", "macd", "obv", "stoch_rsi", "fibonacci", "msb", "supply_demand"]
+DEFAULT_INDICATORS = "momentum,trend,macd"
+
+
+def _flags(text):
+    names = [n.strip() for n in text.split(",") if n.strip()]
+    unknown = set(names) - set(INDICATORS)
+    if unknown:
+        raise argparse.ArgumentTypeError(f"unknown indicator(s): {', '.join(sorted(unknown))}")
+    return tuple(name in names for name in INDICATORS)
+
+
+def _timeframes(text):
+    names = [n.strip() for n in text.split(",") if n.strip()]
+    unknown = set(names) - set(MINUTES)
+    if unknown or not names:
+        raise argparse.ArgumentTypeError(f"unknown timeframe(s): {', '.join(sorted(unknown))}" if unknown
+                                         else "no timeframes given")
+    return names
+
+
+def _end(text):
+    # A bare date ends with its last bar
+    end = pd.Timestamp(text)
+    return end + pd.Timedelta(days=1) - pd.Timedelta(1) if len(text) <= 10 else end
+
+
+def _percent(correct, total):
+    return (correct / total * 100) if total > 0 else 0
+
+
+def _load(args, full):
+    # A date range is read from the local bar store, without calling the API
+    if args.start is not None or args.end is not None:
+        df = BarStore(args.store_dir).frame(args.ticker, args.interval, args.extended, args.start, args.end)
+        if not len(df):
+            raise SystemExit(f"predictor: no stored {args.ticker} {args.interval} bars in that range")
+        return df
+    cache = store = None
+    if not args.no_cache:
+        cache, store = BarCache(args.cache_dir), BarStore(args.store_dir)
+    return fetch_data(args.ticker, args.interval, args.extended, full, api_key=args.api_key, cache=cache, store=store)
+
+
+def cmd_signal(args):
+    df = _load(args, full=False)
+    return score_symbol(args.ticker, df, args.indicators, args.sensitivity)
+
+
+def cmd_confluence(args):
+    # One fetch of the finest timeframe; the others are aggregated from it
+    args.interval = base_interval(args.timeframes)
+    bars = _load(args, full=True)
+    rows, summary = confluence(resample_bars(bars, args.interval, args.timeframes), args.indicators, args.sensitivity)
+    return {'confluence': summary, 'timeframes': pd.DataFrame(rows)}
+
+
+def cmd_backtest(args):
+    df = add_patterns(calculate_indicators(_load(args, full=True), *args.indicators))
+    results = run_backtest(df, args.indicators, args.sensitivity)
+    results.update({
+        'ticker': args.ticker,
+        'interval': args.interval,
+        'candles': len(df),
+        'accuracy': _percent(results['correct'], results['total']),
+        'bullish_accuracy': _percent(results['bullish_correct'], results['bullish_total']),
+        'bearish_accuracy': _percent(results['bearish_correct'], results['bearish_total']),
+    })
+    return results
+
+
+def _optimizer_frame(args):
+    df = calculate_indicators(_load(args, full=True), True, True, True, True, True, True, True, True)
+    return add_patterns(df)
+
+
+def cmd_optimize(args):
+    executor = process_pool() if args.parallel else None
+    results = pd.DataFrame(run_optimization(_optimizer_frame(args), args.sensitivity, executor=executor))
+    return results.sort_values('Accuracy', ascending=False, kind='stable').head(args.top)
+
+
+def cmd_sweep(args):
+    executor = process_pool() if args.parallel else None
+    df = _load(args, full=True)
+    if args.strategy == "halving":
+        rows = successive_halving(df, args.sensitivity, args.configs, args.eta, seed=args.seed, executor=executor)
+    else:
+        rows = random_search(df, args.sensitivity, args.configs, seed=args.seed, executor=executor)
+    return pd.DataFrame(rows).head(args.top)
+
+
+def cmd_walkforward(args):
+    executor = process_pool() if args.parallel else None
+    folds, summary = walk_forward(_optimizer_frame(args), args.sensitivity, args.train_bars, args.test_bars,
+                                  executor=executor)
+    return {'summary': summary, 'folds': folds}
+
+
+def _watchlist(path):
+    return parse_watchlist(sys.stdin.read() if path == "-" else open(path).read())
+
+
+def cmd_scan(args):
+    cache = None if args.no_cache else BarCache(args.cache_dir)
+    results, stats = scan(_watchlist(args.watchlist), args.interval, args.extended, args.indicators,
+                          args.sensitivity, args.api_key, cache=cache)
+    return {'stats': stats, 'results': results}
+
+
+def cmd_alerts(args):
+    if args.metrics_port:
+        start_server(args.metrics_port)
+    cache = None if args.no_cache else BarCache(args.cache_dir)
+    sender = get_sender(args.token)
+    daemon = AlertDaemon(sender, args.chat_id, _watchlist(args.watchlist), args.interval, args.extended,
+                         args.indicators, args.sensitivity, api_key=args.api_key, cache=cache).start()
+    try:
+        while True:
+            time.sleep(args.report_every)
+            m = daemon.metrics()
+            print(f"{pd.Timestamp.now(tz='US/Eastern'):%H:%M:%S} alerts {m['alerts']} messages {m['messages']} "
+                  f"errors {m['errors']} p99 {m['latency_ms_p99']:.0f} ms from poll, "
+                  f"{m['close_latency_ms_p99'] / 1000:.1f} s from candle close", file=sys.stderr, flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.stop()
+        sender.close()
+    return daemon.metrics()
+
+
+def cmd_store(args):
+    store = BarStore(args.store_dir)
+    if args.action == "import":
+        added = store.import_cache(BarCache(args.cache_dir))
+        print(f"imported {sum(added.values())} bars into {len(added)} series", file=sys.stderr)
+    rows = []
+    for ticker, interval, extended in store.series():
+        first, last, count = store.extent(ticker, interval, extended)
+        rows.append({'ticker': ticker, 'interval': interval, 'extended': extended,
+                     'bars': count, 'first': first, 'last': last})
+    return pd.DataFrame(rows, columns=['ticker', 'interval', 'extended', 'bars', 'first', 'last'])
+
+
+def _print(result, as_json):
+    if as_json:
+        if isinstance(result, pd.DataFrame):
+            result = result.to_dict(orient='records')
+        elif isinstance(result, dict):
+            result = {k: v.to_dict(orient='records') if isinstance(v, pd.DataFrame) else v for k, v in result.items()}
+        print(json.dumps(result, indent=2, default=str))
+        return
+    if isinstance(result, pd.DataFrame):
+        print(result.to_string(index=False))
+        return
+    for key, value in result.items():
+        if isinstance(value, pd.DataFrame):
+            print(value.to_string(index=False))
+        elif isinstance(value, list):
+            print(pd.DataFrame(value).to_string(index=False))
+        elif isinstance(value, dict):
+            for k, v in value.items():
+                print(f"{k:>18}: {v:.2f}" if isinstance(v, float) else f"{k:>18}: {v}")
+        else:
+            print(f"{key:>18}: {value:.2f}" if isinstance(value, float) else f"{key:>18}: {value}")
+
+
+def build_parser():
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--interval", choices=INTERVALS, default="15min")
+    common.add_argument("--regular-hours", dest="extended", action="store_false",
+                        help="exclude pre-market and after-hours bars")
+    common.add_argument("--sensitivity", type=int, default=4, help="signal threshold (default 4)")
+    common.add_argument("--indicators", type=_flags, default=_flags(DEFAULT_INDICATORS),
+                        help=f"comma separated, from {','.join(INDICATORS)} (default {DEFAULT_INDICATORS})")
+    common.add_argument("--api-key", help="Alpha Vantage key (default $ALPHA_VANTAGE_API_KEY, then demo)")
+    common.add_argument("--no-cache", action="store_true", help="skip the on-disk bar cache")
+    common.add_argument("--cache-dir", help="bar cache directory (default $PREDICTOR_CACHE_DIR)")
+    common.add_argument("--store-dir", help="local bar store directory (default $PREDICTOR_BAR_STORE)")
+    common.add_argument("--start", type=pd.Timestamp, help="first bar to use from the local bar store, e.g. 2024-01-02")
+    common.add_argument("--end", type=_end, help="last bar to use from the local bar store (a date includes the whole day)")
+    common.add_argument("--json", action="store_true", help="print JSON instead of a table")
+
+    parser = argparse.ArgumentParser(prog="python -m predictor",
+                                     description="Candlestick Predictor scoring, backtests and optimizer.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    signal = commands.add_parser("signal", parents=[common], help="score the latest candle")
+    signal.add_argument("--ticker", required=True, type=str.upper)
+    signal.set_defaults(run=cmd_signal)
+
+    confluence_cmd = commands.add_parser("confluence", parents=[common],
+                                         help="score the latest candle on several timeframes from one fetch")
+    confluence_cmd.add_argument("--ticker", required=True, type=str.upper)
+    confluence_cmd.add_argument("--timeframes", type=_timeframes, default=CONFLUENCE_TIMEFRAMES,
+                                help=f"comma separated (default {','.join(CONFLUENCE_TIMEFRAMES)}); "
+                                     "the finest is fetched, --interval is ignored")
+    confluence_cmd.set_defaults(run=cmd_confluence)
+
+    backtest = commands.add_parser("backtest", parents=[common], help="next-candle accuracy over the full history")
+    backtest.add_argument("--ticker", required=True, type=str.upper)
+    backtest.set_defaults(run=cmd_backtest)
+
+    optimize = commands.add_parser("optimize", parents=[common], help="rank the 64 indicator configurations")
+    optimize.add_argument("--ticker", required=True, type=str.upper)
+    optimize.add_argument("--top", type=int, default=10, help="configurations to show (default 10)")
+    optimize.add_argument("--parallel", action="store_true", help="count blocks of bars on the worker processes")
+    optimize.set_defaults(run=cmd_optimize)
+
+    sweep = commands.add_parser("sweep", parents=[common], help="search indicator periods and score weights")
+    sweep.add_argument("--ticker", required=True, type=str.upper)
+    sweep.add_argument("--strategy", choices=["random", "halving"], default="halving",
+                       help="random search, or successive halving (default)")
+    sweep.add_argument("--configs", type=int, default=729, help="configurations to sample (default 729)")
+    sweep.add_argument("--eta", type=int, default=3, help="halving keeps the best 1/eta per rung (default 3)")
+    sweep.add_argument("--seed", type=int, default=0)
+    sweep.add_argument("--top", type=int, default=10, help="configurations to show (default 10)")
+    sweep.add_argument("--parallel", action="store_true", help="score batches on the worker processes")
+    sweep.set_defaults(run=cmd_sweep)
+
+    walk = commands.add_parser("walkforward", parents=[common], help="optimize on one window, test on the next")
+    walk.add_argument("--ticker", required=True, type=str.upper)
+    walk.add_argument("--train-bars", type=int, default=500)
+    walk.add_argument("--test-bars", type=int, default=100)
+    walk.add_argument("--parallel", action="store_true", help="run folds on the worker processes")
+    walk.set_defaults(run=cmd_walkforward)
+
+    scanner = commands.add_parser("scan", parents=[common], help="score and rank a watchlist")
+    scanner.add_argument("watchlist", help="file of tickers (comma, space or newline separated), - for stdin")
+    scanner.set_defaults(run=cmd_scan)
+
+    alerts = commands.add_parser("alerts", parents=[common],
+                                 help="send Telegram alerts when a watchlist signal fires, until interrupted")
+    alerts.add_argument("watchlist", help="file of tickers (comma, space or newline separated), - for stdin")
+    alerts.add_argument("--chat-id", type=int, action="append", required=True,
+                        help="Telegram chat to notify (repeat for several)")
+    alerts.add_argument("--token", default=os.environ.get("TELEGRAM_API_KEY"),
+                        required="TELEGRAM_API_KEY" not in os.environ, help="bot token (default $TELEGRAM_API_KEY)")
+    alerts.add_argument("--report-every", type=float, default=60, help="seconds between status lines (default 60)")
+    alerts.add_argument("--metrics-port", type=int, default=os.environ.get("PREDICTOR_METRICS_PORT"),
+                        help="serve Prometheus metrics at http://127.0.0.1:PORT/metrics (default $PREDICTOR_METRICS_PORT)")
+    alerts.set_defaults(run=cmd_alerts)
+
+    store = commands.add_parser("store", parents=[common], help="list the local bar store, or import the bar cache")
+    store.add_argument("action", choices=["list", "import"])
+    store.set_defaults(run=cmd_store)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    try:
+        result = args.run(args)
+    except AlphaVantageError as e:
+        print(f"predictor: {e.kind}: {e}", file=sys.stderr)
+        return 2
+    _print(result, args.json)
+    return 0
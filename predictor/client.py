@@ -0,0 +1,74 @@
+# Shared HTTP client for Alpha Vantage: pooled keep-alive session, gzip, timeouts and fast JSON
+import json
+import threading
+from operator import itemgetter
+
+import numpy as np
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from .metrics import API_SECONDS
+from .timing import stage
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:  # orjson is optional, the stdlib decoder is ~2x slower
+    _loads = json.loads
+
+# (connect, read) seconds; full intraday histories can take a while to generate
+TIMEOUT = (3.05, 30)
+POOL_SIZE = 32
+
+COLUMNS = ["open", "high", "low", "close", "volume"]
+_FIELDS = itemgetter("1. open", "2. high", "3. low", "4. close", "5. volume")
+
+_session = None
+_session_lock = threading.Lock()
+
+
+def session():
+    """The keep-alive session every request shares, created on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            _session = requests.Session()
+            # Enough pooled connections for the scheduler and scanner threads
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=POOL_SIZE)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+            _session.headers.update({"Accept-Encoding": "gzip, deflate", "Accept": "application/json"})
+        return _session
+
+
+def get_json(url, timeout=TIMEOUT):
+    with stage("http"), API_SECONDS.time():
+        resp = session().get(url, timeout=timeout)
+        resp.raise_for_status()
+        body = resp.content
+    with stage("decode"):
+        return _loads(body)
+
+
+def series_arrays(series):
+    """Timestamps (datetime64[ns]) and an (n, 5) float64 OHLCV array, oldest bar first.
+
+    series is the {timestamp: {"1. open": ..., ...}} mapping of a time series
+    response. Values go straight to NumPy, without building a DataFrame of
+    strings first.
+    """
+    times = np.array(list(series), dtype="datetime64[ns]")
+    values = np.array(list(map(_FIELDS, series.values())), dtype=np.float64).reshape(-1, 5)
+    # The API sends newest first
+    order = np.argsort(times, kind="stable")
+    return times[order], values[order]
+
+
+def series_frame(series, tz=None):
+    """OHLCV frame for a time series mapping, sorted and optionally localized."""
+    times, values = series_arrays(series)
+    index = pd.DatetimeIndex(times)
+    if tz is not None:
+        index = index.tz_localize(tz)
+    return pd.DataFrame(values, index=index, columns=COLUMNS)
@@ -0,0 +1,85 @@
+# Compact storage of indicator frames: float32 derived series, int8 patterns, bit-packed flags
+import numpy as np
+import pandas as pd
+
+from .patterns import PATTERNS
+from .scoring import score_frame
+
+# Fetched bars keep full precision; every column computed from them can be float32
+BASE_COLUMNS = ["open", "high", "low", "close", "volume"]
+# Swing levels are copied highs and lows the close is compared with, they stay exact too
+EXACT_COLUMNS = BASE_COLUMNS + ["MSB_high", "MSB_low"]
+# Rounding a derived series to float32 (about 7 significant digits) can flip a rule's comparison
+# when its two sides are that close, e.g. MACD and MACD_signal on the bar they cross. At least
+# this share of bars must get the same score and signals from a compact frame as from float64
+SIGNAL_AGREEMENT = 0.999
+
+
+class PackedBits:
+    """A boolean column stored eight values to a byte."""
+
+    def __init__(self, values):
+        values = np.asarray(values, dtype=bool)
+        self.bits = np.packbits(values)
+        self.size = len(values)
+
+    @property
+    def nbytes(self):
+        return self.bits.nbytes
+
+    def unpack(self):
+        return np.unpackbits(self.bits, count=self.size).astype(bool)
+
+
+def pack(name, values):
+    """Storage form of one column: float32, int8 patterns or PackedBits; OHLCV and swing levels are left alone."""
+    values = values.to_numpy() if isinstance(values, pd.Series) else np.asarray(values)
+    if name in EXACT_COLUMNS:
+        return values
+    if values.dtype == bool:
+        return PackedBits(values)
+    if name in PATTERNS:
+        return values.astype(np.int8, copy=False)
+    if values.dtype.kind == 'f':
+        return values.astype(np.float32, copy=False)
+    return values
+
+
+def unpack(values):
+    return values.unpack() if isinstance(values, PackedBits) else values
+
+
+def compact_dtypes(df):
+    """df with derived float columns as float32 and pattern columns as int8.
+
+    Boolean columns stay bool, a DataFrame has no bit-packed dtype; use
+    CompactFrame to hold a frame at rest.
+    """
+    return pd.DataFrame({c: unpack(pack(c, df[c])) for c in df.columns}, index=df.index)
+
+
+class CompactFrame:
+    """An indicator frame held in its compact layout until to_frame() is called.
+
+    OHLCV stays float64, derived series are float32, pattern flags int8 and
+    boolean columns (the swing flags) bit-packed.
+    """
+
+    def __init__(self, df):
+        self.index = df.index
+        self.columns = {c: pack(c, df[c]) for c in df.columns}
+
+    @property
+    def nbytes(self):
+        return int(self.index.nbytes) + sum(v.nbytes for v in self.columns.values())
+
+    def to_frame(self):
+        return pd.DataFrame({c: unpack(v) for c, v in self.columns.items()}, index=self.index)
+
+
+def signal_agreement(df, compact, flags):
+    """Share of bars of df that score_frame gives the same score and signals on compact."""
+    scores, masks = score_frame(df, flags)
+    compact_scores, compact_masks = score_frame(compact, flags)
+    same = (scores == compact_scores) & (masks == compact_masks)
+    return float(same.mean()) if len(same) else 1.0
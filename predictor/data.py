@@ -0,0 +1,97 @@
+# Alpha Vantage time series requests and parsing
+import os
+from time import perf_counter
+
+from .client import series_frame
+from .metrics import FETCH_SECONDS, FETCHES
+from .scheduler import BACKTEST, LIVE, get_scheduler
+from .timing import stage
+
+DEFAULT_URL = "https://www.alphavantage.co/query"
+
+
+class AlphaVantageError(Exception):
+    """The API answered without a time series.
+
+    kind is the response key that explained why ("Note" for rate limits,
+    "Error Message", "Information"), or "No data" when the series is missing.
+    """
+
+    def __init__(self, kind, message):
+        super().__init__(message)
+        self.kind = kind
+
+
+def build_request(ticker, interval, extended, full, api_key):
+    """Return the query URL and the response key holding the time series."""
+    base = os.environ.get("ALPHA_VANTAGE_URL", DEFAULT_URL)
+    size = "full" if full else "compact"
+
+    # Determine which API function to use based on interval
+    if interval == "1day":
+        url = f"{base}?function=TIME_SERIES_DAILY&symbol={ticker}&outputsize={size}&apikey={api_key}"
+        ts_key = "Time Series (Daily)"
+    elif interval == "1week":
+        url = f"{base}?function=TIME_SERIES_WEEKLY&symbol={ticker}&apikey={api_key}"
+        ts_key = "Weekly Time Series"
+    else:
+        extended_param = "&extended_hours=true" if extended else ""
+        url = f"{base}?function=TIME_SERIES_INTRADAY&symbol={ticker}&interval={interval}&outputsize={size}&apikey={api_key}{extended_param}&adjusted=false"
+        ts_key = f"Time Series ({interval})"
+    return url, ts_key
+
+
+def parse_time_series(resp, ts_key):
+    """Turn an Alpha Vantage JSON response into a sorted OHLCV frame in US/Eastern."""
+    for kind in ("Note", "Error Message", "Information"):
+        if kind in resp:
+            raise AlphaVantageError(kind, resp[kind])
+    if ts_key not in resp:
+        raise AlphaVantageError("No data", "No data. Check ticker.")
+
+    # Localize to US/Eastern timezone (Alpha Vantage uses ET)
+    return series_frame(resp[ts_key], tz='US/Eastern')
+
+
+def fetch_frame(ticker, interval, extended, full, api_key, priority=LIVE):
+    """Fetch through the shared scheduler, which rate limits and retries throttled calls."""
+    url, ts_key = build_request(ticker, interval, extended, full, api_key)
+    # request covers the scheduler's wait, the HTTP call and the JSON decode on its worker thread
+    with stage("request"):
+        resp = get_scheduler().fetch(url, priority)
+    with stage("parse"):
+        return parse_time_series(resp, ts_key)
+
+
+def fetch_data(ticker, interval, extended, full=False, api_key=None, cache=None, priority=None, max_age=None,
+               store=None):
+    """OHLCV frame for ticker, served from cache (a BarCache) when one is given.
+
+    api_key defaults to $ALPHA_VANTAGE_API_KEY, then "demo". Full-history
+    pulls queue behind live refreshes unless priority says otherwise.
+    max_age is passed to the cache (seconds a cached series stays fresh).
+    With a store (a BarStore) the bars are also added to the local history.
+    Raises AlphaVantageError when the API returns no series.
+    """
+    api_key = api_key or os.environ.get("ALPHA_VANTAGE_API_KEY", "demo")
+    if priority is None:
+        priority = BACKTEST if full else LIVE
+
+    def fetch(full):
+        return fetch_frame(ticker, interval, extended, full, api_key, priority)
+
+    start = perf_counter()
+    try:
+        df = cache.get(ticker, interval, extended, full, fetch, max_age) if cache else fetch(full)
+    except AlphaVantageError as e:
+        FETCHES.inc(interval=interval, result=e.kind.lower().replace(" ", "_"))
+        raise
+    except Exception:
+        FETCHES.inc(interval=interval, result="error")
+        raise
+    if store is not None:
+        with stage("bar store"):
+            store.append(ticker, interval, extended, df)
+    FETCHES.inc(interval=interval, result="ok")
+    FETCH_SECONDS.observe(perf_counter() - start, interval=interval)
+    return df
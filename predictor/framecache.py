@@ -0,0 +1,145 @@
+# In-memory LRU of fetched frames and indicator columns, shared by every app session
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import pandas as pd
+
+from .cache import CACHE_TTL
+from .compact import CompactFrame, pack, unpack
+from .indicators import FLAGS, GROUPS, add_patterns, indicator_columns
+from .metrics import INDICATOR_SECONDS
+from .patterns import ohlc_arrays, pattern_matrix
+from .timing import stage
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+
+def _nbytes(value):
+    if isinstance(value, pd.DataFrame):
+        return int(value.memory_usage(index=True).sum())
+    if isinstance(value, dict):
+        return sum(getattr(v, 'nbytes', 8) for v in value.values())
+    return getattr(value, 'nbytes', 64)
+
+
+def fingerprint(df):
+    """Identifies a version of a series: bar count plus the last bar's time and values."""
+    if not len(df):
+        return (0,)
+    last = df.iloc[-1]
+    return (len(df), df.index[-1].value, float(last['close']), float(last['volume']))
+
+
+class FrameCache:
+    """Memory-bounded LRU with a TTL per entry.
+
+    Holds fetched frames keyed by (ticker, interval, extended, full) and the
+    columns of each indicator group keyed by the series, its fingerprint and
+    the group, plus the assembled frame for each flag set. Toggling one
+    indicator flag therefore only computes that group, and a rerun with
+    nothing changed gets a copy of the finished frame. Entries
+    expire after the interval's TTL and the least recently used are evicted
+    past max_bytes. With compact (default $PREDICTOR_COMPACT_FRAMES) the
+    indicator columns are held as float32, int8 and bit-packed flags, and
+    come back in that layout (see compact.SIGNAL_AGREEMENT for what that
+    can change).
+    """
+
+    def __init__(self, max_bytes=None, compact=None):
+        self.max_bytes = max_bytes or int(os.environ.get("PREDICTOR_FRAME_CACHE_MAX_BYTES", DEFAULT_MAX_BYTES))
+        if compact is None:
+            compact = os.environ.get("PREDICTOR_COMPACT_FRAMES", "") not in ("", "0")
+        self.compact = compact
+        self.entries = OrderedDict()
+        self.bytes = 0
+        self.lock = threading.Lock()
+        self.stats = {'hits': 0, 'misses': 0, 'evictions': 0}
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or entry[1] < time.monotonic():
+                if entry is not None:
+                    self._remove(key)
+                self.stats['misses'] += 1
+                return None
+            self.entries.move_to_end(key)
+            self.stats['hits'] += 1
+            return entry[0]
+
+    def put(self, key, value, ttl):
+        size = _nbytes(value)
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            self.entries[key] = (value, time.monotonic() + ttl, size)
+            self.bytes += size
+            while self.bytes > self.max_bytes and len(self.entries) > 1:
+                self._remove(next(iter(self.entries)))
+                self.stats['evictions'] += 1
+
+    def _remove(self, key):
+        _, _, size = self.entries.pop(key)
+        self.bytes -= size
+
+    def frame(self, key, load):
+        """Fetched frame for key = (ticker, interval, extended, full), calling load() on a miss.
+
+        Held until the interval's TTL after the bars were fetched (their
+        attrs['fetched_at'], see BarCache.get). Returns a copy, callers add
+        columns to it.
+        """
+        df = self.get(('bars',) + key)
+        if df is None:
+            df = load()
+            if df is None:
+                return None
+            # Bars from the BarCache may already be part of their TTL old; only keep them for the rest of it
+            age = time.time() - df.attrs.get('fetched_at', time.time())
+            self.put(('bars',) + key, df, CACHE_TTL.get(key[1], 60) - max(age, 0))
+        return df.copy()
+
+    def indicators(self, df, key, flags, patterns=False):
+        """df with the enabled indicator groups added, each from cache when it can.
+
+        flags are in calculate_indicators' order. With patterns=True the
+        candlestick pattern columns are added too. Returns the frame.
+        """
+        ttl = CACHE_TTL.get(key[1], 60)
+        base = key + fingerprint(df)
+        # A rerun with nothing changed gets the assembled frame back
+        assembled = self.get(('assembled',) + base + (tuple(flags), patterns))
+        if assembled is not None:
+            return assembled.to_frame() if self.compact else assembled.copy()
+
+        enabled = dict(zip(FLAGS, flags))
+        added = {}
+        for group in GROUPS:
+            if not enabled[group]:
+                continue
+            columns = self.get(('indicators',) + base + (group,))
+            if columns is None:
+                with stage(group):
+                    columns = indicator_columns(df, group).items()
+                if self.compact:
+                    columns = {c: pack(c, v) for c, v in columns}
+                else:
+                    columns = {c: v.to_numpy() if isinstance(v, pd.Series) else v for c, v in columns}
+                self.put(('indicators',) + base + (group,), columns, ttl)
+            added.update((c, unpack(v)) for c, v in columns.items())
+        if added:
+            # One concat instead of a column insert per indicator
+            df = pd.concat([df.drop(columns=list(added), errors='ignore'),
+                            pd.DataFrame(added, index=df.index)], axis=1)
+
+        if patterns:
+            matrix = self.get(('patterns',) + base)
+            if matrix is None:
+                with stage("patterns"), INDICATOR_SECONDS.time(group="patterns"):
+                    matrix = pattern_matrix(*ohlc_arrays(df))
+                self.put(('patterns',) + base, matrix, ttl)
+            df = add_patterns(df, matrix)
+        self.put(('assembled',) + base + (tuple(flags), patterns), CompactFrame(df) if self.compact else df.copy(), ttl)
+        return df
@@ -0,0 +1,453 @@
+# Incremental indicator state: append one bar at a time instead of recomputing the frame
+import bisect
+import math
+import pickle
+import threading
+import time
+from collections import OrderedDict, deque
+
+import numpy as np
+import pandas as pd
+
+from .indicators import last_swing
+from .metrics import INDICATOR_ROLLBACKS
+from .patterns import PATTERNS, pattern_matrix
+
+NAN = float('nan')
+OHLCV = ["open", "high", "low", "close", "volume"]
+
+# Column order of the patterns followed by calculate_indicators
+COLUMNS = (["open", "high", "low", "close", "volume"] + PATTERNS +
+           ['MACD', 'MACD_signal', 'MACD_hist', 'RSI', 'volume_sma', 'volume_ratio',
+            'SMA_20', 'SMA_50', 'SMA_200', 'OBV', 'OBV_SMA', 'STOCH_RSI',
+            'FIB_236', 'FIB_382', 'FIB_500', 'FIB_618',
+            'swing_high', 'swing_low', 'is_swing_high', 'is_swing_low', 'MSB_high', 'MSB_low',
+            'supply_zone', 'demand_zone'])
+
+# Bars of history handed to TA-Lib to find the candlestick patterns of the newest bar
+PATTERN_TAIL = 64
+# Newest bars of each sync that keep a checkpoint, so a revised or dropped bar this far back is rolled back
+ROLLBACK_BARS = 16
+# Bars kept per state; the oldest are dropped once twice this many have been appended
+MAX_BARS = 5000
+# States kept for get_state; the least recently used go first, and any not used for STATE_IDLE_TIMEOUT seconds
+MAX_STATES = 32
+STATE_IDLE_TIMEOUT = 3600
+
+
+class RollingMean:
+    """Mean of the last `window` values, NaN until the window is full."""
+
+    def __init__(self, window):
+        self.window = window
+        self.values = deque()
+        self.total = 0.0
+        self.updates = 0
+
+    def update(self, x):
+        self.values.append(x)
+        self.total += x
+        if len(self.values) > self.window:
+            self.total -= self.values.popleft()
+        # Re-sum now and then so the running total does not drift
+        self.updates += 1
+        if self.updates % 1000 == 0:
+            self.total = math.fsum(self.values)
+        return self.total / self.window if len(self.values) == self.window else NAN
+
+
+class EMA:
+    """TA-Lib EMA: seeded with the simple average of the first `period` values."""
+
+    def __init__(self, period):
+        self.period = period
+        self.k = 2.0 / (period + 1)
+        self.seed = []
+        self.value = NAN
+
+    def update(self, x):
+        if self.seed is not None:
+            self.seed.append(x)
+            if len(self.seed) < self.period:
+                return NAN
+            self.value = sum(self.seed) / self.period
+            self.seed = None
+            return self.value
+        self.value += self.k * (x - self.value)
+        return self.value
+
+
+class MACD:
+    """TA-Lib MACD; the fast EMA is seeded on the bars ending where the slow one starts."""
+
+    def __init__(self, fast=12, slow=26, signal=9):
+        self.fast = EMA(fast)
+        self.slow = EMA(slow)
+        self.signal = EMA(signal)
+        self.offset = slow - fast
+        self.count = 0
+
+    def update(self, x):
+        i = self.count
+        self.count += 1
+        slow = self.slow.update(x)
+        fast = self.fast.update(x) if i >= self.offset else NAN
+        if math.isnan(slow):
+            return NAN, NAN, NAN
+        macd = fast - slow
+        signal = self.signal.update(macd)
+        if math.isnan(signal):
+            return NAN, NAN, NAN
+        return macd, signal, macd - signal
+
+
+class RSI:
+    """TA-Lib RSI with Wilder smoothing."""
+
+    def __init__(self, period=14):
+        self.period = period
+        self.prev = None
+        self.count = 0
+        self.avg_gain = 0.0
+        self.avg_loss = 0.0
+
+    def update(self, close):
+        if self.prev is None:
+            self.prev = close
+            return NAN
+        diff = close - self.prev
+        self.prev = close
+        gain = diff if diff > 0 else 0.0
+        loss = -diff if diff < 0 else 0.0
+
+        self.count += 1
+        if self.count <= self.period:
+            self.avg_gain += gain
+            self.avg_loss += loss
+            if self.count < self.period:
+                return NAN
+            self.avg_gain /= self.period
+            self.avg_loss /= self.period
+        else:
+            self.avg_gain = (self.avg_gain * (self.period - 1) + gain) / self.period
+            self.avg_loss = (self.avg_loss * (self.period - 1) + loss) / self.period
+
+        total = self.avg_gain + self.avg_loss
+        return 100.0 * self.avg_gain / total if total != 0 else 0.0
+
+
+class OBV:
+    def __init__(self):
+        self.prev = None
+        self.value = 0.0
+
+    def update(self, close, volume):
+        if self.prev is not None:
+            self.value += volume * ((close > self.prev) - (close < self.prev))
+        self.prev = close
+        return self.value
+
+
+class RollingExtreme:
+    """Max (or min) of the last `window` values using a monotonic deque.
+
+    With partial=True the extreme of a not-yet-full window is returned
+    instead of NaN.
+    """
+
+    def __init__(self, window, largest=True, partial=False):
+        self.window = window
+        self.largest = largest
+        self.partial = partial
+        self.candidates = deque()
+        self.count = 0
+
+    def update(self, x):
+        i = self.count
+        self.count += 1
+        # Drop values the new one dominates; they can never be the extreme again
+        while self.candidates and (self.candidates[-1][1] <= x if self.largest else self.candidates[-1][1] >= x):
+            self.candidates.pop()
+        self.candidates.append((i, x))
+        if self.candidates[0][0] <= i - self.window:
+            self.candidates.popleft()
+        if self.count < self.window and not self.partial:
+            return NAN
+        return self.candidates[0][1]
+
+
+class RollingQuantile:
+    """Linearly interpolated quantile of the last `window` values, like pandas' rolling quantile."""
+
+    def __init__(self, window, q):
+        self.window = window
+        self.q = q
+        self.values = deque()
+        self.ordered = []
+
+    def update(self, x):
+        self.values.append(x)
+        bisect.insort(self.ordered, x)
+        if len(self.values) > self.window:
+            del self.ordered[bisect.bisect_left(self.ordered, self.values.popleft())]
+        if len(self.values) < self.window:
+            return NAN
+        pos = self.q * (self.window - 1)
+        lo = int(pos)
+        hi = min(lo + 1, self.window - 1)
+        return self.ordered[lo] + (self.ordered[hi] - self.ordered[lo]) * (pos - lo)
+
+
+class IndicatorState:
+    """Running indicator state for one (ticker, interval, extended) series.
+
+    Produces the same columns as the candlestick patterns plus
+    calculate_indicators, but appending a bar only touches the running
+    state of each indicator instead of recomputing the whole frame.
+    flags is the tuple of calculate_indicators' use_* arguments.
+    """
+
+    def __init__(self, flags):
+        (self.use_momentum, self.use_trend, self.use_macd, self.use_obv, self.use_stoch_rsi,
+         self.use_fibonacci, self.use_msb, self.use_supply_demand) = flags
+        self.flags = tuple(flags)
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        # Column buffers grow by doubling; rows [0, size) are filled
+        self.size = 0
+        self.times = np.empty(0, dtype=np.int64)
+        self.tz = None
+        self.rows = {}
+        self._state = {
+            'tail': deque(maxlen=PATTERN_TAIL),
+            'macd': MACD(12, 26, 9),
+            'rsi': RSI(14),
+            'volume_sma': RollingMean(20),
+            'sma': {window: RollingMean(window) for window in (20, 50, 200)},
+            'obv': OBV(),
+            'obv_sma': RollingMean(20),
+            'stoch_rsi': RSI(14),
+            'stoch_max': RollingExtreme(14, largest=True),
+            'stoch_min': RollingExtreme(14, largest=False),
+            'fib_high': RollingExtreme(50, largest=True, partial=True),
+            'fib_low': RollingExtreme(50, largest=False, partial=True),
+            'swing': deque(maxlen=5),
+            'supply': RollingQuantile(20, 0.95),
+            'demand': RollingQuantile(20, 0.05),
+        }
+        # (size, pickled state) before each of the newest bars appended with checkpoint=True
+        self._checkpoints = deque(maxlen=ROLLBACK_BARS)
+
+    def _grow(self):
+        capacity = max(2 * len(self.times), 256)
+
+        def grown(old):
+            new = np.empty(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            return new
+
+        self.times = grown(self.times)
+        self.rows = {name: grown(column) for name, column in self.rows.items()}
+
+    def _put(self, name, value):
+        column = self.rows.get(name)
+        if column is None:
+            if name in PATTERNS:
+                column = np.zeros(len(self.times), dtype=np.int8)
+            elif name.startswith('is_swing'):
+                column = np.zeros(len(self.times), dtype=bool)
+            else:
+                column = np.full(len(self.times), NAN)
+            self.rows[name] = column
+        column[self.size] = value
+
+    def append(self, timestamp, open_, high, low, close, volume, checkpoint=False):
+        """Add one bar and compute its indicator values.
+
+        With checkpoint=True the state before the bar is kept, so the state
+        can later be rolled back to just before it.
+        """
+        if checkpoint:
+            while self._checkpoints and self._checkpoints[-1][0] >= self.size:
+                self._checkpoints.pop()
+            self._checkpoints.append((self.size, pickle.dumps(self._state)))
+        s = self._state
+        if self.size == len(self.times):
+            self._grow()
+        if self.tz is None:
+            self.tz = timestamp.tz
+        self.times[self.size] = timestamp.value
+        for name, value in zip(OHLCV, [open_, high, low, close, volume]):
+            self._put(name, value)
+
+        # Candlestick patterns of the newest bar, from a short tail of history
+        s['tail'].append((open_, high, low, close))
+        tail = np.array(s['tail'], dtype=np.float64).T.copy()
+        for p, value in zip(PATTERNS, pattern_matrix(*tail)[-1]):
+            self._put(p, value)
+
+        if self.use_macd:
+            macd, signal, hist = s['macd'].update(close)
+            self._put('MACD', macd)
+            self._put('MACD_signal', signal)
+            self._put('MACD_hist', hist)
+
+        if self.use_momentum:
+            self._put('RSI', s['rsi'].update(close))
+            volume_sma = s['volume_sma'].update(volume)
+            self._put('volume_sma', volume_sma)
+            if volume_sma != 0:
+                self._put('volume_ratio', volume / volume_sma)
+            else:
+                self._put('volume_ratio', NAN if volume == 0 else math.inf)
+
+        if self.use_trend:
+            for window, sma in s['sma'].items():
+                self._put(f'SMA_{window}', sma.update(close))
+
+        if self.use_obv:
+            obv = s['obv'].update(close, volume)
+            self._put('OBV', obv)
+            self._put('OBV_SMA', s['obv_sma'].update(obv))
+
+        if self.use_stoch_rsi:
+            rsi = s['stoch_rsi'].update(close)
+            stoch = NAN
+            if not math.isnan(rsi):
+                highest, lowest = s['stoch_max'].update(rsi), s['stoch_min'].update(rsi)
+                if not math.isnan(highest):
+                    stoch = (rsi - lowest) / (highest - lowest) * 100 if highest != lowest else NAN
+            self._put('STOCH_RSI', stoch)
+
+        if self.use_fibonacci:
+            # Levels of the 50 bars up to this one
+            fib_high, fib_low = s['fib_high'].update(high), s['fib_low'].update(low)
+            diff = fib_high - fib_low
+            for name, ratio in [('FIB_236', 0.236), ('FIB_382', 0.382), ('FIB_500', 0.500), ('FIB_618', 0.618)]:
+                self._put(name, fib_high - ratio * diff)
+
+        if self.use_msb:
+            # A bar's swing needs the two bars after it, so this bar fills in the one two bars back
+            s['swing'].append((high, low))
+            self._put('swing_high', NAN)
+            self._put('swing_low', NAN)
+            self._put('is_swing_high', False)
+            self._put('is_swing_low', False)
+            if len(s['swing']) == 5:
+                swing_high = max(h for h, _ in s['swing'])
+                swing_low = min(l for _, l in s['swing'])
+                center_high, center_low = s['swing'][2]
+                center = self.size - 2
+                self.rows['swing_high'][center] = swing_high
+                self.rows['swing_low'][center] = swing_low
+                self.rows['is_swing_high'][center] = center_high == swing_high
+                self.rows['is_swing_low'][center] = center_low == swing_low
+
+        if self.use_supply_demand:
+            self._put('supply_zone', s['supply'].update(high))
+            self._put('demand_zone', s['demand'].update(low))
+
+        self.size += 1
+        if self.size > 2 * MAX_BARS:
+            self._trim()
+
+    def _rollback(self, size):
+        """Undo the appends after the first size bars, from the checkpoint taken before bar size."""
+        while self._checkpoints[-1][0] > size:
+            self._checkpoints.pop()
+        self._state = pickle.loads(self._checkpoints[-1][1])
+        if self.use_msb:
+            # The dropped bars filled in the swings of the two bars before them
+            start = max(size - 2, 0)
+            self.rows['swing_high'][start:self.size] = NAN
+            self.rows['swing_low'][start:self.size] = NAN
+            self.rows['is_swing_high'][start:self.size] = False
+            self.rows['is_swing_low'][start:self.size] = False
+        self.size = size
+
+    def _trim(self):
+        drop = self.size - MAX_BARS
+        for column in [self.times, *self.rows.values()]:
+            column[:MAX_BARS] = column[drop:self.size]
+        self.size = MAX_BARS
+        self._checkpoints = deque(((size - drop, state) for size, state in self._checkpoints if size >= drop),
+                                  maxlen=ROLLBACK_BARS)
+
+    def _common(self, df):
+        """How many stored bars df agrees with: up to the newest one it still has unchanged.
+
+        Only sizes the state can return to count: all of it, or a
+        checkpoint. 0 means nothing can be kept.
+        """
+        times = df.index.asi8
+        values = df[OHLCV].to_numpy(dtype=np.float64)
+        for size in sorted({self.size} | {size for size, _ in self._checkpoints}, reverse=True):
+            if size == 0:
+                break
+            k = int(np.searchsorted(times, self.times[size - 1]))
+            if k < len(times) and times[k] == self.times[size - 1] and \
+                    list(values[k]) == [self.rows[c][size - 1] for c in OHLCV]:
+                return size
+        return 0
+
+    def sync(self, df):
+        """Bring the state up to date with a freshly fetched frame.
+
+        Only bars newer than the last one seen are computed. When the newest
+        stored bars were revised or are gone from df (a forming bar the API
+        rewrote or dropped), the state is rolled back to the last bar df
+        still has unchanged, up to ROLLBACK_BARS back; a frame that doesn't
+        agree with any of those rebuilds the state. Both are counted in
+        INDICATOR_ROLLBACKS. Returns the indicator frame for the rows of df.
+        """
+        with self.lock:
+            if self.size:
+                keep = self._common(df)
+                if keep == 0:
+                    self.reset()
+                    INDICATOR_ROLLBACKS.inc(result="reset")
+                elif keep < self.size:
+                    self._rollback(keep)
+                    INDICATOR_ROLLBACKS.inc(result="rollback")
+            new = df[df.index.asi8 > self.times[self.size - 1]] if self.size else df
+            bars = new[OHLCV].to_numpy(dtype=np.float64).tolist()
+            for k, (timestamp, bar) in enumerate(zip(new.index, bars)):
+                # The newest bars may still be revised, keep checkpoints to roll them back
+                self.append(timestamp, *bar, checkpoint=k >= len(bars) - ROLLBACK_BARS)
+            return self.frame(tail=len(df))
+
+    def frame(self, tail=None):
+        start = 0 if tail is None else max(self.size - tail, 0)
+        index = pd.DatetimeIndex(self.times[start:self.size], tz='UTC').tz_convert(self.tz)
+        df = pd.DataFrame({name: values[start:self.size] for name, values in self.rows.items()}, index=index)
+        if self.use_msb:
+            # Swing flags are filled in two bars late, as last_swing confirms them, so every row gets
+            # the same levels as the batch path; they are derived when the frame is built
+            df['MSB_high'] = last_swing(df['high'], df['is_swing_high'])
+            df['MSB_low'] = last_swing(df['low'], df['is_swing_low'])
+        return df[[c for c in COLUMNS if c in df.columns]]
+
+
+_states = OrderedDict()
+_states_lock = threading.Lock()
+
+
+def get_state(ticker, interval, extended, flags):
+    """Shared IndicatorState for a series and indicator flags, created on first use.
+
+    At most MAX_STATES are kept: the least recently used one is dropped
+    when that is exceeded, and so is any idle for STATE_IDLE_TIMEOUT. A
+    dropped state is rebuilt from the bars on its next sync.
+    """
+    key = (ticker, interval, extended, tuple(flags))
+    now = time.monotonic()
+    with _states_lock:
+        entry = _states.get(key)
+        state = entry[0] if entry is not None else IndicatorState(flags)
+        _states[key] = (state, now)
+        _states.move_to_end(key)
+        while len(_states) > MAX_STATES or next(iter(_states.values()))[1] < now - STATE_IDLE_TIMEOUT:
+            _states.popitem(last=False)
+        return state
@@ -0,0 +1,154 @@
+# Technical indicators added to the OHLCV frame before scoring
+from time import perf_counter
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+from talib import abstract
+
+from .metrics import INDICATOR_SECONDS
+from .patterns import PATTERNS, ohlc_arrays, pattern_matrix
+from .timing import stage
+
+
+def add_patterns(df, matrix=None):
+    """Return df with an int8 column per candlestick pattern in PATTERNS.
+
+    matrix, if given, is a pattern_matrix already computed for df.
+    """
+    if matrix is None:
+        with stage("patterns"), INDICATOR_SECONDS.time(group="patterns"):
+            matrix = pattern_matrix(*ohlc_arrays(df))
+    patterns = pd.DataFrame(matrix, index=df.index, columns=PATTERNS)
+    # One concat keeps the ten columns in a single int8 block
+    return pd.concat([df.drop(columns=PATTERNS, errors='ignore'), patterns], axis=1)
+
+
+# A swing is the high (low) of the five bars centered on it, so it is only known two bars later
+SWING_CONFIRM_BARS = 2
+
+
+def last_swing(values, is_swing):
+    """Level of the latest confirmed swing at each bar, NaN until two swings are confirmed.
+
+    A swing flagged at bar k counts from bar k + SWING_CONFIRM_BARS on,
+    when the bars that make it a swing have closed, so no bar sees a swing
+    the live signal could not have known about yet. The market structure
+    break compares the close with this, so it is one forward fill over the
+    frame instead of a filter of every swing per bar.
+    """
+    flags = np.asarray(is_swing, dtype=bool)
+    confirmed = np.zeros(len(flags), dtype=bool)
+    confirmed[SWING_CONFIRM_BARS:] = flags[:len(flags) - SWING_CONFIRM_BARS]
+    positions = np.arange(len(flags)) - SWING_CONFIRM_BARS
+    latest = np.maximum.accumulate(np.where(confirmed, positions, 0)) if len(flags) else flags
+    levels = np.asarray(values, dtype=np.float64)[latest]
+    return pd.Series(np.where(np.cumsum(confirmed) >= 2, levels, np.nan), index=values.index)
+
+
+# Rows of sliding windows sorted at a time by rolling_quantile
+QUANTILE_CHUNK = 16384
+
+
+def rolling_quantile(values, window, q):
+    """Same as values.rolling(window).quantile(q), from sorted copies of the windows.
+
+    pandas keeps a skiplist per window; for the short supply and demand
+    windows sorting each one in a single numpy call is several times faster.
+    """
+    v = np.asarray(values, dtype=np.float64)
+    out = np.full(len(v), np.nan)
+    if len(v) < window:
+        return pd.Series(out, index=values.index)
+    # pandas' linear interpolation, written the same way so the result is bit for bit equal
+    pos = q * (window - 1)
+    lo = int(pos)
+    hi = min(lo + 1, window - 1)
+    windows = sliding_window_view(v, window)
+    for start in range(0, len(windows), QUANTILE_CHUNK):
+        chunk = np.sort(windows[start:start + QUANTILE_CHUNK], axis=1)
+        low, high = chunk[:, lo], chunk[:, hi]
+        out[window - 1 + start:window - 1 + start + len(chunk)] = low if pos == lo else low + (high - low) * (pos - lo)
+    # Any NaN in a window leaves it short of the window's observations, like pandas
+    missing = np.concatenate(([0], np.cumsum(np.isnan(v))))
+    out[window - 1:][missing[window:] - missing[:-window] > 0] = np.nan
+    return pd.Series(out, index=values.index)
+
+
+# calculate_indicators' flags, in argument order
+FLAGS = ['momentum', 'trend', 'macd', 'obv', 'stoch_rsi', 'fibonacci', 'msb', 'supply_demand']
+# Indicator groups in the order their columns are added
+GROUPS = ['macd', 'momentum', 'trend', 'obv', 'stoch_rsi', 'fibonacci', 'msb', 'supply_demand']
+
+
+def indicator_columns(df, group):
+    """The columns one indicator group adds, as {name: values}; reads only OHLCV."""
+    start = perf_counter()
+    columns = _group_columns(df, group)
+    INDICATOR_SECONDS.observe(perf_counter() - start, group=group)
+    return columns
+
+
+def _group_columns(df, group):
+    # MACD
+    if group == 'macd':
+        macd = abstract.MACD(df, fastperiod=12, slowperiod=26, signalperiod=9)
+        return {'MACD': macd['macd'], 'MACD_signal': macd['macdsignal'], 'MACD_hist': macd['macdhist']}
+    
+    # RSI and Volume
+    if group == 'momentum':
+        volume_sma = df['volume'].rolling(window=20).mean()
+        return {'RSI': abstract.RSI(df, timeperiod=14), 'volume_sma': volume_sma,
+                'volume_ratio': df['volume'] / volume_sma}
+    
+    # Trend (SMA)
+    if group == 'trend':
+        return {'SMA_20': df['close'].rolling(window=20).mean(),
+                'SMA_50': df['close'].rolling(window=50).mean(),
+                'SMA_200': df['close'].rolling(window=200).mean()}
+    
+    # On-Balance Volume
+    if group == 'obv':
+        obv = (df['volume'] * ((df['close'] > df['close'].shift(1)).astype(int) - (df['close'] < df['close'].shift(1)).astype(int))).cumsum()
+        return {'OBV': obv, 'OBV_SMA': obv.rolling(window=20).mean()}
+    
+    # Stochastic RSI
+    if group == 'stoch_rsi':
+        rsi = abstract.RSI(df, timeperiod=14)
+        stoch_rsi = (rsi - rsi.rolling(14).min()) / (rsi.rolling(14).max() - rsi.rolling(14).min()) * 100
+        return {'STOCH_RSI': stoch_rsi}
+    
+    # Fibonacci Retracement Levels of the 50 bars up to each bar (the latest bar's are the live levels)
+    if group == 'fibonacci':
+        high = df['high'].rolling(window=50, min_periods=1).max()
+        low = df['low'].rolling(window=50, min_periods=1).min()
+        diff = high - low
+        return {'FIB_236': high - 0.236 * diff, 'FIB_382': high - 0.382 * diff,
+                'FIB_500': high - 0.500 * diff, 'FIB_618': high - 0.618 * diff}
+    
+    # Market Structure Break
+    if group == 'msb':
+        swing_high = df['high'].rolling(window=5, center=True).max()
+        swing_low = df['low'].rolling(window=5, center=True).min()
+        is_swing_high, is_swing_low = df['high'] == swing_high, df['low'] == swing_low
+        return {'swing_high': swing_high, 'swing_low': swing_low,
+                'is_swing_high': is_swing_high, 'is_swing_low': is_swing_low,
+                'MSB_high': last_swing(df['high'], is_swing_high), 'MSB_low': last_swing(df['low'], is_swing_low)}
+    
+    # Supply and Demand Zones
+    if group == 'supply_demand':
+        return {'supply_zone': rolling_quantile(df['high'], 20, 0.95),
+                'demand_zone': rolling_quantile(df['low'], 20, 0.05)}
+    
+    raise ValueError(f"unknown indicator group: {group}")
+
+
+# Calculate all advanced indicators
+def calculate_indicators(df, use_momentum, use_trend, use_macd, use_obv, use_stoch_rsi, use_fibonacci, use_msb, use_supply_demand):
+    enabled = dict(zip(FLAGS, [use_momentum, use_trend, use_macd, use_obv, use_stoch_rsi, use_fibonacci, use_msb, use_supply_demand]))
+    for group in GROUPS:
+        if enabled[group]:
+            with stage(group):
+                for column, values in indicator_columns(df, group).items():
+                    df[column] = values
+    return df
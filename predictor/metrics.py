@@ -0,0 +1,303 @@
+# Counters, gauges and histograms in the Prometheus text format, served on a local port
+import bisect
+import os
+import threading
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from time import perf_counter
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Seconds; from a cached indicator group up to a slow full-history API call
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+# Live signal scores; the default threshold is 4
+SCORE_BUCKETS = (-20, -12, -8, -4, -1, 0, 4, 8, 12, 20)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Registry:
+    """The metrics a scrape reports, in registration order."""
+
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+
+    def register(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"metric {metric.name} is already registered")
+            self.metrics[metric.name] = metric
+
+    def snapshot(self):
+        """Current values of the counters and histograms, to pass to changes() later."""
+        with self.lock:
+            metrics = [m for m in self.metrics.values() if isinstance(m, (Counter, Histogram))]
+        return {metric.name: metric.copy_values() for metric in metrics}
+
+    def changes(self, before):
+        """What the counters and histograms gained since snapshot before, for add() in another registry."""
+        changes = {}
+        for name, values in self.snapshot().items():
+            metric, old = self.metrics[name], before.get(name, {})
+            gained = {key: metric.difference(value, old.get(key)) for key, value in values.items()}
+            gained = {key: value for key, value in gained.items() if value is not None}
+            if gained:
+                changes[name] = gained
+        return changes
+
+    def add(self, changes):
+        """Record changes() taken in a worker process."""
+        for name, values in changes.items():
+            metric = self.metrics.get(name)
+            if metric is not None:
+                for key, value in values.items():
+                    metric.add_values(key, value)
+
+    def render(self):
+        """Every metric in the text exposition format."""
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                label_text = ",".join(f'{key}="{_escape(val)}"' for key, val in labels)
+                lines.append(f"{name}{{{label_text}}} {_format(value)}" if labels else f"{name} {_format(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    kind = "untyped"
+
+    def __init__(self, name, help, labels=(), registry=REGISTRY):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labels)
+        self.lock = threading.Lock()
+        self.values = {}
+        self.function = None
+        if not self.labelnames:
+            # Reported as zero before the first observation, not missing
+            self.values[()] = self._zero()
+        registry.register(self)
+
+    def _zero(self):
+        return 0
+
+    def _key(self, labels):
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"{self.name} takes labels {self.labelnames}, got {tuple(labels)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def set_function(self, function):
+        """Read the value at scrape time from function() instead: a number, or {label values: number}."""
+        self.function = function
+
+    def samples(self):
+        if self.function is not None:
+            values = self.function()
+            values = values if isinstance(values, dict) else {(): values}
+        else:
+            with self.lock:
+                values = dict(self.values)
+        return [(self.name, tuple(zip(self.labelnames, key if isinstance(key, tuple) else (key,))), value)
+                for key, value in values.items()]
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def inc(self, amount=1, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def copy_values(self):
+        with self.lock:
+            return dict(self.values)
+
+    def difference(self, value, old):
+        gained = value - (old or 0)
+        return gained or None
+
+    def add_values(self, key, gained):
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + gained
+
+
+class Gauge(Metric):
+    kind = "gauge"
+
+    def set(self, value, **labels):
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+
+
+class Histogram(Metric):
+    """Counts of observations per bucket upper bound, plus their sum and count."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS, registry=REGISTRY):
+        self.buckets = tuple(sorted(buckets))
+        super().__init__(name, help, labels, registry)
+
+    def _zero(self):
+        return [[0] * (len(self.buckets) + 1), 0.0]
+
+    def observe(self, value, **labels):
+        key = self._key(labels)
+        # Index of the first bucket the value fits in; len(buckets) is +Inf
+        slot = bisect.bisect_left(self.buckets, value)
+        with self.lock:
+            counts = self.values.get(key)
+            if counts is None:
+                counts = self.values[key] = self._zero()
+            counts[0][slot] += 1
+            counts[1] += value
+
+    def copy_values(self):
+        with self.lock:
+            return {key: (list(counts), total) for key, (counts, total) in self.values.items()}
+
+    def difference(self, value, old):
+        counts, total = value
+        old_counts, old_total = old or ([0] * len(counts), 0.0)
+        gained = [now - then for now, then in zip(counts, old_counts)]
+        return (gained, total - old_total) if any(gained) else None
+
+    def add_values(self, key, gained):
+        counts, total = gained
+        with self.lock:
+            entry = self.values.get(key)
+            if entry is None:
+                entry = self.values[key] = self._zero()
+            entry[0] = [now + more for now, more in zip(entry[0], counts)]
+            entry[1] += total
+
+    @contextmanager
+    def time(self, **labels):
+        """Observe the seconds the with-block takes."""
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(perf_counter() - start, **labels)
+
+    def samples(self):
+        with self.lock:
+            values = {key: (list(counts), total) for key, (counts, total) in self.values.items()}
+        samples = []
+        for key, (counts, total) in values.items():
+            labels = tuple(zip(self.labelnames, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                samples.append((f"{self.name}_bucket", labels + (("le", _format(bound)),), cumulative))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, cumulative))
+        return samples
+
+
+# The live predictor's metrics; the modules that measure them import these
+API_CALLS = Counter("predictor_api_calls_total", "Alpha Vantage calls made by the request scheduler")
+API_THROTTLED = Counter("predictor_api_throttled_total", "Alpha Vantage responses that said the rate limit was hit")
+API_RETRIES = Counter("predictor_api_retries_total", "Throttled Alpha Vantage calls retried after a backoff")
+API_COALESCED = Counter("predictor_api_coalesced_total", "Requests that shared an identical in-flight call")
+API_ERRORS = Counter("predictor_api_errors_total", "Alpha Vantage calls that raised")
+API_QUEUE = Gauge("predictor_api_queue_depth", "Requests waiting in each scheduler lane", ["lane"])
+API_WAIT = Histogram("predictor_api_wait_seconds", "Seconds a request waited for the rate limiter")
+API_SECONDS = Histogram("predictor_api_request_seconds", "Seconds per Alpha Vantage HTTP call, body included")
+FETCHES = Counter("predictor_fetches_total", "fetch_data calls by interval and outcome", ["interval", "result"])
+FETCH_SECONDS = Histogram("predictor_fetch_seconds", "Seconds per fetch_data call, cache hits included", ["interval"])
+BAR_CACHE = Counter("predictor_bar_cache_total",
+                    "On-disk bar cache lookups: fresh (served), topup (new bars fetched), "
+                    "stale (top-up failed, cached bars served) or miss", ["result"])
+FRAME_CACHE_HITS = Counter("predictor_frame_cache_hits_total", "In-memory frame cache hits")
+FRAME_CACHE_MISSES = Counter("predictor_frame_cache_misses_total", "In-memory frame cache misses")
+FRAME_CACHE_EVICTIONS = Counter("predictor_frame_cache_evictions_total", "In-memory frame cache evictions")
+FRAME_CACHE_BYTES = Gauge("predictor_frame_cache_bytes", "Bytes held by the in-memory frame cache")
+INDICATOR_SECONDS = Histogram("predictor_indicator_seconds",
+                              "Seconds to compute one indicator group (or the candlestick patterns)", ["group"])
+INDICATOR_ROLLBACKS = Counter("predictor_indicator_rollbacks_total",
+                              "Live indicator states that no longer matched the fetched bars: rollback (to a "
+                              "checkpoint) or reset (rebuilt from scratch)", ["result"])
+SCORES = Histogram("predictor_score", "Live signal scores (Live tab and alert daemon)", buckets=SCORE_BUCKETS)
+SIGNAL_DIRECTIONS = Counter("predictor_signals_total", "Live signal directions (Live tab and alert daemon)", ["direction"])
+POLLERS = Gauge("predictor_pollers", "Background pollers running")
+AUTO_REFRESH_SESSIONS = Gauge("predictor_auto_refresh_sessions", "App sessions with Live auto-refresh on")
+TELEGRAM_SECONDS = Histogram("predictor_telegram_send_seconds", "Seconds per Telegram send_message", ["result"])
+ALERT_LATENCY = Histogram("predictor_alert_latency_seconds",
+                          "Seconds from the poll that brought in a bar to its alert being sent")
+ALERT_CLOSE_LATENCY = Histogram("predictor_alert_close_latency_seconds",
+                                "Seconds from a candle's close to its alert being sent")
+
+
+def measured(parent, fn, *args):
+    """fn(*args) in a worker process: (result, what it added to the counters and histograms).
+
+    A worker process counts into its own copy of REGISTRY, which /metrics
+    never sees. Submit measured(os.getpid(), fn, ...) instead of fn and
+    pass the changes to REGISTRY.add in the parent. Run in the parent
+    process itself (a thread pool), it already counted there and returns
+    no changes.
+    """
+    if os.getpid() == parent:
+        return fn(*args), {}
+    before = REGISTRY.snapshot()
+    result = fn(*args)
+    return result, REGISTRY.changes(before)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    registry = REGISTRY
+
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/", "/metrics"):
+            self.send_error(404)
+            return
+        body = self.registry.render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would flood stderr
+        pass
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_server(port=None, host=None, registry=REGISTRY):
+    """Serve /metrics on host:port from a daemon thread, once per process; returns the server.
+
+    port and host default to $PREDICTOR_METRICS_PORT (9464) and
+    $PREDICTOR_METRICS_HOST (127.0.0.1).
+    """
+    global _server
+    with _server_lock:
+        if _server is None:
+            port = int(port if port is not None else os.environ.get("PREDICTOR_METRICS_PORT", 9464))
+            host = host or os.environ.get("PREDICTOR_METRICS_HOST", "127.0.0.1")
+            handler = type("Handler", (_Handler,), {'registry': registry})
+            _server = ThreadingHTTPServer((host, port), handler)
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+        return _server
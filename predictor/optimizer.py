@@ -0,0 +1,221 @@
+# Batched evaluation of indicator on/off configurations for the Optimize tab
+import itertools
+import os
+from concurrent.futures import as_completed
+
+import numpy as np
+
+from .rules import DIVERGENCE_BARS, RULES, frame_columns
+from .workers import attach_arrays, shared_arrays
+
+# Indicator groups toggled by the experiment, in the order of the result columns
+GROUPS = ['MACD', 'RSI_Div', 'Volume', 'Trend', 'OBV', 'StochRSI']
+# The live rules of those groups, plus the candlestick patterns every configuration keeps
+# (Fibonacci, MSB and Supply/Demand stay out to keep the experiment at 64 configurations)
+OPTIMIZER_RULES = RULES.select(['Patterns'] + GROUPS)
+
+# Start after enough data for all indicators (SMA_200)
+START_IDX = 200
+
+# Masks scored per matrix product, bounds the (masks x bars) working set
+CHUNK_SIZE = 256
+
+# Fewer scored bars than this are counted in this process; the pool's round trip would cost more
+PARALLEL_MIN_BARS = 20_000
+
+
+def full_factorial(n_groups=len(GROUPS)):
+    """All on/off combinations, in the same order as itertools.product."""
+    return np.array(list(itertools.product([False, True], repeat=n_groups)), dtype=bool)
+
+
+def rule_terms(df, start_idx=START_IDX):
+    """The optimizer rules' terms (see RuleSet.terms) on bars start_idx..len(df)-2, (terms x bars).
+
+    Evaluated once on the whole frame, so any slice of the bars can be
+    scored for any configuration.
+    """
+    end = max(len(df) - 1, start_idx)
+    terms = OPTIMIZER_RULES.terms(frame_columns(df, OPTIMIZER_RULES.columns))
+    return np.ascontiguousarray(terms[:, start_idx:end])
+
+
+def group_multipliers(masks):
+    """Weights of OPTIMIZER_RULES' groups for each mask: patterns always on, the rest as masked."""
+    masks = np.asarray(masks, dtype=np.float64)
+    return np.hstack([np.ones((len(masks), 1)), masks])
+
+
+def score_masks(terms, masks):
+    """Scores of every bar for each configuration in masks, shape (masks x bars)."""
+    return OPTIMIZER_RULES.score(terms, group_multipliers(masks))
+
+
+def tally_scores(score, went_up, sensitivity, counts, rows):
+    """Store the prediction counts of each row of score (configs x bars) in counts[key][rows].
+
+    went_up is a float array, 1.0 where the next bar closed higher.
+    """
+    bullish = (score > sensitivity).astype(np.float64)
+    bearish = (score < -sensitivity).astype(np.float64)
+    counts['bullish_correct'][rows] = bullish @ went_up
+    counts['bullish_total'][rows] = bullish.sum(axis=1)
+    counts['bearish_correct'][rows] = bearish @ (1 - went_up)
+    counts['bearish_total'][rows] = bearish.sum(axis=1)
+
+
+def empty_counts(n):
+    return {key: np.zeros(n, dtype=np.int64)
+            for key in ['bullish_correct', 'bullish_total', 'bearish_correct', 'bearish_total']}
+
+
+def count_masks(terms, went_up, masks, sensitivity, progress=None):
+    """Prediction counts of every mask over precomputed rule terms.
+
+    Works on any slice of rule_terms' bars, with went_up[j] true when the
+    bar after bar j closed higher.
+    """
+    went_up = np.asarray(went_up, dtype=np.float64)
+    counts = empty_counts(len(masks))
+    for lo in range(0, len(masks), CHUNK_SIZE):
+        hi = min(lo + CHUNK_SIZE, len(masks))
+        score = score_masks(terms, masks[lo:hi])
+        tally_scores(score, went_up, sensitivity, counts, slice(lo, hi))
+        if progress:
+            progress(hi, len(masks))
+
+    counts['correct'] = counts['bullish_correct'] + counts['bearish_correct']
+    counts['total'] = counts['bullish_total'] + counts['bearish_total']
+    return counts
+
+
+def next_bar_up(df, start_idx=START_IDX):
+    """For bars start_idx..len(df)-2, whether the next bar closed higher."""
+    close = df['close'].to_numpy(dtype=np.float64)
+    return close[start_idx + 1:] > close[start_idx:-1]
+
+
+def _count_shared(specs, lo, hi, masks, sensitivity):
+    """count_masks on bars lo..hi of the rule terms in shared memory, run in a worker process."""
+    blocks, (terms, went_up) = attach_arrays(specs)
+    try:
+        return count_masks(terms[:, lo:hi], went_up[lo:hi], masks, sensitivity)
+    finally:
+        del terms, went_up
+        for block in blocks:
+            block.close()
+
+
+def count_parallel(terms, went_up, masks, sensitivity, executor, tasks=None, progress=None):
+    """count_masks with the bars split into tasks blocks (default two per CPU) run on executor.
+
+    terms and went_up are copied into shared memory once; each task maps
+    them without a copy and counts every mask on its block of bars, and the
+    blocks' counts add up. progress gets (done, total) configurations,
+    in proportion to the blocks finished.
+    """
+    n_bars = len(went_up)
+    n_tasks = max(1, min(tasks or 2 * (os.cpu_count() or 1), n_bars))
+    edges = np.linspace(0, n_bars, n_tasks + 1).astype(int)
+    counts = empty_counts(len(masks))
+    counts.update(correct=np.zeros(len(masks), dtype=np.int64), total=np.zeros(len(masks), dtype=np.int64))
+    with shared_arrays(terms, np.asarray(went_up, dtype=np.float64)) as specs:
+        futures = [executor.submit(_count_shared, specs, lo, hi, masks, sensitivity)
+                   for lo, hi in zip(edges[:-1], edges[1:])]
+        try:
+            for done, future in enumerate(as_completed(futures), 1):
+                for key, values in future.result().items():
+                    counts[key] += values
+                if progress:
+                    progress(len(masks) * done // len(futures), len(masks))
+        finally:
+            # The blocks are freed on the way out; tasks that haven't started must not look for them
+            for future in futures:
+                future.cancel()
+    return counts
+
+
+def evaluate_masks(df, masks, sensitivity, start_idx=START_IDX, progress=None, executor=None, tasks=None):
+    """Prediction counts for every configuration.
+
+    Returns a dict of integer arrays (one entry per mask) with the same keys
+    as backtest.tally. progress, if given, is called with (done, total)
+    after each chunk of masks. With an executor, histories of at least
+    PARALLEL_MIN_BARS scored bars are counted on it (see count_parallel).
+    """
+    masks = np.asarray(masks, dtype=bool)
+    terms, went_up = rule_terms(df, start_idx), next_bar_up(df, start_idx)
+    if executor is None or len(went_up) < PARALLEL_MIN_BARS:
+        return count_masks(terms, went_up, masks, sensitivity, progress)
+    return count_parallel(terms, went_up, masks, sensitivity, executor, tasks, progress)
+
+
+def _accuracy(correct, total):
+    correct, total = int(correct), int(total)
+    return (correct / total * 100) if total > 0 else 0
+
+
+def run_optimization(df, sensitivity, masks=None, progress=None, executor=None, tasks=None):
+    """Evaluate every configuration and return one result row per mask.
+
+    executor and tasks spread long histories over worker processes, see evaluate_masks.
+    """
+    masks = full_factorial() if masks is None else np.asarray(masks, dtype=bool)
+    counts = evaluate_masks(df, masks, sensitivity, progress=progress, executor=executor, tasks=tasks)
+
+    results = []
+    for k, mask in enumerate(masks):
+        row = {name: bool(flag) for name, flag in zip(GROUPS, mask)}
+        row.update({
+            'Accuracy': _accuracy(counts['correct'][k], counts['total'][k]),
+            'Bullish_Acc': _accuracy(counts['bullish_correct'][k], counts['bullish_total'][k]),
+            'Bearish_Acc': _accuracy(counts['bearish_correct'][k], counts['bearish_total'][k]),
+            'Signals': int(counts['total'][k]),
+            'Indicator_Count': int(mask.sum()),
+        })
+        results.append(row)
+    return results
+
+
+def run_config_loop(df, use_macd, use_rsi_div, use_volume, use_trend, use_obv, use_stoch, sensitivity):
+    """Reference per-row evaluation of one configuration that evaluate_masks must match.
+
+    Scores each bar on its own through the live signal's path (the rules of
+    the configuration's groups on the bars up to it) and tallies it.
+    """
+    groups = {'Patterns'} | {name for name, on in zip(GROUPS, (use_macd, use_rsi_div, use_volume, use_trend,
+                                                               use_obv, use_stoch)) if on}
+    columns = frame_columns(df, OPTIMIZER_RULES.columns)
+    close = columns['close']
+    correct = total = 0
+    bullish_correct = bullish_total = 0
+    bearish_correct = bearish_total = 0
+
+    for i in range(START_IDX, len(df) - 1):
+        lo = max(i + 1 - DIVERGENCE_BARS, 0)
+        scores, _ = OPTIMIZER_RULES.score_bars({name: values[lo:i + 1] for name, values in columns.items()},
+                                               groups, offset=lo)
+        score = scores[-1]
+
+        prediction = "BULLISH" if score > sensitivity else "BEARISH" if score < -sensitivity else "NEUTRAL"
+        if prediction == "NEUTRAL": continue
+
+        actual = "BULLISH" if close[i + 1] > close[i] else "BEARISH"
+        total += 1
+        if prediction == actual: correct += 1
+
+        if prediction == "BULLISH":
+            bullish_total += 1
+            if actual == "BULLISH": bullish_correct += 1
+        else:
+            bearish_total += 1
+            if actual == "BEARISH": bearish_correct += 1
+
+    return {
+        'correct': correct,
+        'total': total,
+        'bullish_correct': bullish_correct,
+        'bullish_total': bullish_total,
+        'bearish_correct': bearish_correct,
+        'bearish_total': bearish_total,
+    }
@@ -0,0 +1,40 @@
+# Candlestick patterns used by every tab and the weight each one adds to the score
+import numpy as np
+import talib
+
+PATTERNS = ['CDLDOJI', 'CDLHAMMER', 'CDLENGULFING', 'CDLMORNINGSTAR', 'CDLEVENINGSTAR',
+            'CDL3WHITESOLDIERS', 'CDL3BLACKCROWS', 'CDLHARAMI', 'CDLPIERCING', 'CDLDARKCLOUDCOVER']
+
+# (pattern column, TA-Lib value that fires the signal, score weight, signal name)
+PATTERN_RULES = [
+    ('CDLENGULFING', 100, 3, "Bullish Engulfing"),
+    ('CDLENGULFING', -100, -3, "Bearish Engulfing"),
+    ('CDLMORNINGSTAR', 100, 4, "Morning Star"),
+    ('CDLEVENINGSTAR', -100, -4, "Evening Star"),
+    ('CDLHAMMER', 100, 2, "Hammer"),
+    ('CDLDOJI', 100, 1, "Doji"),
+    ('CDL3WHITESOLDIERS', 100, 3, "Three White Soldiers"),
+    ('CDL3BLACKCROWS', -100, -3, "Three Black Crows"),
+    ('CDLHARAMI', 100, 2, "Bullish Harami"),
+    ('CDLPIERCING', 100, 2, "Piercing Pattern"),
+    ('CDLDARKCLOUDCOVER', -100, -2, "Dark Cloud Cover"),
+]
+
+
+def ohlc_arrays(df):
+    """open, high, low, close as contiguous float64 arrays, pulled out of the frame once."""
+    return [np.ascontiguousarray(df[c].to_numpy(dtype=np.float64)) for c in ("open", "high", "low", "close")]
+
+
+def pattern_matrix(open_, high, low, close, patterns=PATTERNS):
+    """TA-Lib output of every pattern as a (bars, patterns) int8 matrix.
+
+    Goes straight through the function API on the given arrays, skipping the
+    abstract API's DataFrame-to-array conversion on each call. Values are
+    TA-Lib's +100/-100/0, which fit in int8.
+    """
+    # Filled pattern by pattern, so store (patterns, bars) and hand back the transposed view
+    out = np.empty((len(patterns), len(close)), dtype=np.int8)
+    for row, name in zip(out, patterns):
+        row[:] = getattr(talib, name)(open_, high, low, close)
+    return out.T
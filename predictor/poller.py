@@ -0,0 +1,187 @@
+# Background polling of live series: one thread per (ticker, interval) shared by every session
+import threading
+import time
+
+import pandas as pd
+
+from .cache import CACHE_TTL
+from .incremental import get_state
+from .metrics import POLLERS
+
+# Candle length of the intraday intervals, in seconds
+INTERVAL_SECONDS = {"1min": 60, "5min": 300, "15min": 900, "30min": 1800, "60min": 3600}
+# Seconds after a candle closes before the API has published it
+PUBLISH_DELAY = 5
+# Seconds before retrying a failed poll, if the next candle closes later than that
+RETRY_SECONDS = 30
+# Pollers and flag sets nobody has asked for in this many seconds are stopped
+IDLE_TIMEOUT = 300
+
+
+def next_boundary(interval, now):
+    """Epoch seconds of the next poll: just after the current candle closes.
+
+    Intraday candles close on multiples of their length, which line up with
+    US/Eastern wall-clock times. Daily and weekly series are polled once per
+    cache TTL.
+    """
+    step = INTERVAL_SECONDS.get(interval)
+    if step is None:
+        return now + CACHE_TTL.get(interval, 60)
+    return (now // step + 1) * step + PUBLISH_DELAY
+
+
+def _eastern(seconds):
+    return pd.Timestamp(seconds, unit='s', tz='UTC').tz_convert('US/Eastern')
+
+
+class Poller:
+    """Fetches one series at every candle close and keeps its indicator frames current.
+
+    key is (ticker, interval, extended) and fetch() returns the latest bars.
+    Each flag set passed to subscribe() gets its frame from the shared
+    IndicatorState, brought up to date after every poll, so a new candle
+    costs one API call and one incremental update however many sessions
+    watch it. Listeners are called with each new snapshot as soon as it is
+    computed. The thread stops once nobody has subscribed for idle_timeout
+    and no listener is left.
+    """
+
+    def __init__(self, key, fetch, idle_timeout=IDLE_TIMEOUT):
+        self.key = key
+        self.fetch = fetch
+        self.idle_timeout = idle_timeout
+        self.lock = threading.Lock()
+        self.bars = None
+        self.fetched_at = None
+        self.next_poll = None
+        self.error = None
+        self.version = 0
+        self.snapshots = {}
+        self.last_seen = {}
+        self.listeners = {}
+        self.last_used = time.monotonic()
+        self.stopped = False
+        self.stats = {'polls': 0, 'errors': 0}
+        self.thread = threading.Thread(target=self._run, name=f"poller-{key[0]}-{key[1]}", daemon=True)
+        self.thread.start()
+
+    def subscribe(self, flags):
+        """Latest snapshot for flags, or None before the first poll has finished.
+
+        A snapshot is a dict of frame, fetched_at, next_poll, error and
+        version. Never waits on the API: new flags are computed from the bars
+        already fetched.
+        """
+        flags = tuple(flags)
+        with self.lock:
+            self.last_used = self.last_seen[flags] = time.monotonic()
+            snapshot = self.snapshots.get(flags)
+            bars = self.bars
+        if snapshot is None and bars is not None:
+            snapshot = self._update(flags, bars)
+        return snapshot
+
+    def listen(self, flags, callback):
+        """Call callback(key, snapshot) after every poll, keeping flags up to date."""
+        flags = tuple(flags)
+        with self.lock:
+            self.last_seen[flags] = time.monotonic()
+            self.listeners.setdefault(flags, []).append(callback)
+            bars = self.bars
+        if bars is not None:
+            callback(self.key, self._update(flags, bars))
+
+    def unlisten(self, flags, callback):
+        with self.lock:
+            callbacks = self.listeners.get(tuple(flags), [])
+            if callback in callbacks:
+                callbacks.remove(callback)
+            self.last_used = time.monotonic()
+
+    def _update(self, flags, bars):
+        frame = get_state(*self.key, flags).sync(bars)
+        with self.lock:
+            snapshot = {'frame': frame, 'fetched_at': self.fetched_at, 'next_poll': _eastern(self.next_poll),
+                        'error': self.error, 'version': self.version}
+            self.snapshots[flags] = snapshot
+        return snapshot
+
+    def _poll(self):
+        try:
+            bars = self.fetch()
+            error = None
+        except Exception as e:  # keep serving the last bars, the error is shown with them
+            bars, error = None, str(e)
+        now = time.time()
+        with self.lock:
+            self.stats['polls'] += 1
+            self.error = error
+            self.next_poll = next_boundary(self.key[1], now)
+            if error is not None:
+                self.stats['errors'] += 1
+                self.next_poll = min(self.next_poll, now + RETRY_SECONDS)
+            else:
+                self.bars = bars
+                self.fetched_at = _eastern(now)
+                self.version += 1
+            # Flag sets nobody is watching any more are no longer updated
+            cutoff = time.monotonic() - self.idle_timeout
+            for flags in [f for f, seen in self.last_seen.items() if seen < cutoff and not self.listeners.get(f)]:
+                del self.last_seen[flags]
+                self.snapshots.pop(flags, None)
+            bars, subscribed = self.bars, list(self.last_seen)
+        if bars is None:
+            return
+        for flags in subscribed:
+            snapshot = self._update(flags, bars)
+            if error is not None:
+                continue
+            with self.lock:
+                callbacks = list(self.listeners.get(flags, []))
+            for callback in callbacks:
+                try:
+                    callback(self.key, snapshot)
+                except Exception:  # a failing listener must not stop the polling
+                    with self.lock:
+                        self.stats['errors'] += 1
+
+    def _run(self):
+        while True:
+            self._poll()
+            if self._idle():
+                return
+            time.sleep(max(self.next_poll - time.time(), 0))
+
+    def _idle(self):
+        with _pollers_lock:
+            if time.monotonic() - self.last_used < self.idle_timeout or any(self.listeners.values()):
+                return False
+            self.stopped = True
+            if _pollers.get(self.key) is self:
+                del _pollers[self.key]
+            return True
+
+
+_pollers = {}
+_pollers_lock = threading.Lock()
+
+
+def get_poller(ticker, interval, extended, fetch):
+    """The running Poller for a series, started with fetch on first use."""
+    key = (ticker, interval, extended)
+    with _pollers_lock:
+        poller = _pollers.get(key)
+        if poller is None or poller.stopped:
+            poller = _pollers[key] = Poller(key, fetch)
+        poller.last_used = time.monotonic()
+        return poller
+
+
+def pollers():
+    """Running pollers, for the debug view."""
+    with _pollers_lock:
+        return list(_pollers.values())
+
+
+POLLERS.set_function(lambda: len(pollers()))
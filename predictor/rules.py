@@ -0,0 +1,375 @@
+# The scoring rules, as one table that the live signal, the backtest, the optimizer and the sweep all evaluate
+from collections import namedtuple
+
+import numpy as np
+
+from .patterns import PATTERN_RULES
+
+# One scoring rule: when(bars) is a boolean array over the bars, requires the columns it reads
+Rule = namedtuple('Rule', ['signal', 'group', 'direction', 'weight', 'requires', 'when'])
+
+# Directions. The last four look at the score of the rules before them:
+BULLISH, BEARISH = 'bullish', 'bearish'
+WITH_SCORE = 'with_score'      # +weight while the score so far is positive, else -weight
+IF_BULLISH = 'if_bullish'      # +weight only when the score so far is positive
+IF_BEARISH = 'if_bearish'      # -weight only when the score so far is negative
+ONLY_BULLISH = 'only_bullish'  # no points; the score can't go below 0
+ONLY_BEARISH = 'only_bearish'  # no points; the score can't go above 0
+_FIXED = (BULLISH, BEARISH)
+_SIGN = {BULLISH: 1, BEARISH: -1, IF_BULLISH: 1, IF_BEARISH: -1}
+
+# Groups the rules belong to, in table order; Patterns is always on
+GROUPS = ['Patterns', 'MACD', 'RSI_Div', 'Volume', 'Trend', 'OBV', 'StochRSI', 'Fibonacci', 'MSB', 'Supply_Demand']
+# Groups each of the app's indicator flags turns on, in calculate_indicators' flag order
+FLAG_GROUPS = [['RSI_Div', 'Volume'], ['Trend'], ['MACD'], ['OBV'], ['StochRSI'], ['Fibonacci'], ['MSB'],
+               ['Supply_Demand']]
+
+# Bars the RSI divergence looks back over, the longest any rule does
+DIVERGENCE_BARS = 10
+# Thresholds the sweep can vary
+PARAMS = {'volume_spike': 2.0, 'volume_high': 1.5}
+
+
+class Bars:
+    """Columns of consecutive bars, as the rule conditions read them.
+
+    offset is the position of the first row in the whole series (the
+    divergence window is shorter near the start). Arrays several rules
+    share, like validity masks and previous values, are computed once.
+    """
+
+    def __init__(self, columns, offset=0, params=None):
+        self.columns = columns
+        self.offset = offset
+        self.params = {**PARAMS, **(params or {})}
+        self.n = len(columns['close'])
+        self.memo = {}
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def once(self, key, compute):
+        if key not in self.memo:
+            self.memo[key] = compute()
+        return self.memo[key]
+
+    def valid(self, *names):
+        """Bars where none of the columns is NaN."""
+        def compute():
+            ok = ~np.isnan(self[names[0]])
+            for name in names[1:]:
+                ok &= ~np.isnan(self[name])
+            return ok
+        return self.once(('valid',) + names, compute)
+
+    def previous(self, name, first=None):
+        """The column one bar back; the first bar gets first (default: its own value)."""
+        def compute():
+            values = self[name]
+            shifted = np.empty_like(values)
+            shifted[1:] = values[:-1]
+            if self.n:
+                shifted[0] = values[0] if first is None else first
+            return shifted
+        return self.once(('previous', name, first), compute)
+
+    def seen(self, count):
+        """Bars with at least count bars of history, themselves included."""
+        return np.arange(self.offset, self.offset + self.n) >= count - 1
+
+    def steady(self, name, rising):
+        """Whether the column never fell (rising) or never rose over the DIVERGENCE_BARS bars up to each bar.
+
+        Step j compares bar j with bar j - 1, so a window has one step fewer
+        than bars; like pandas' is_monotonic_*, any NaN breaks it.
+        """
+        def compute():
+            values, before = self[name], self.previous(name)
+            ok = values >= before if rising else values <= before
+            if self.offset == 0 and self.n:
+                ok[0] = True
+            result = ok.copy()
+            for shift in range(1, DIVERGENCE_BARS - 1):
+                result[shift:] &= ok[:-shift]
+            return result
+        return self.once(('steady', name, rising), compute)
+
+    def near(self, name):
+        """Close within 0.5% of the column's level."""
+        return self.once(('near', name), lambda: np.abs(self['close'] - self[name]) / self['close'] < 0.005)
+
+
+def _pattern(column, value):
+    return lambda b: b[column] == value
+
+
+def _macd_hist_before(b):
+    # calculate_score counts a missing previous histogram as 0
+    return b.once('macd_hist_before', lambda: np.nan_to_num(b.previous('MACD_hist', 0.0), nan=0.0))
+
+
+def _crossed(b, up):
+    # SMA_20 was at or below (up) / at or above SMA_50 on the bar before
+    before_20, before_50 = b.previous('SMA_20'), b.previous('SMA_50')
+    return before_20 <= before_50 if up else before_20 >= before_50
+
+
+def _at_fib(b, name):
+    # Nearest level first: 61.8%, then 50%, then 38.2%
+    levels = ['FIB_618', 'FIB_500', 'FIB_382']
+    hit = b.valid('FIB_618') & b.near(name)
+    for level in levels[:levels.index(name)]:
+        hit &= ~b.near(level)
+    return hit
+
+
+MACD = ('MACD', 'MACD_signal', 'MACD_hist')
+SMAS = ('close', 'SMA_20', 'SMA_50')
+FIBS = ('close', 'FIB_618', 'FIB_500', 'FIB_382')
+ZONES = ('close', 'supply_zone', 'demand_zone')
+
+# Every rule, in the order calculate_score has always applied them; the order matters for the
+# rules that look at the score so far
+RULE_TABLE = [
+    # 1. Candlestick patterns
+    *[Rule(signal, 'Patterns', BULLISH if weight > 0 else BEARISH, abs(weight), (column,), _pattern(column, value))
+      for column, value, weight, signal in PATTERN_RULES],
+
+    # 2. MACD
+    Rule("MACD Bullish", 'MACD', BULLISH, 4, MACD,
+         lambda b: b.valid('MACD') & (b['MACD'] > b['MACD_signal']) & (b['MACD_hist'] > 0)),
+    Rule("MACD Momentum Surge", 'MACD', BULLISH, 5, MACD,
+         lambda b: b.valid('MACD') & (b['MACD'] > b['MACD_signal']) & (b['MACD_hist'] > _macd_hist_before(b))
+         & (b['MACD_hist'] > 0)),
+    Rule("MACD Above Zero (Strong Bull)", 'MACD', BULLISH, 6, MACD,
+         lambda b: b.valid('MACD') & (b['MACD'] > 0) & (b['MACD'] > b['MACD_signal'])),
+    Rule("MACD Bearish", 'MACD', BEARISH, 4, MACD,
+         lambda b: b.valid('MACD') & (b['MACD'] < b['MACD_signal']) & (b['MACD_hist'] < 0)),
+    Rule("MACD Momentum Fade", 'MACD', BEARISH, 5, MACD,
+         lambda b: b.valid('MACD') & (b['MACD_hist'] < _macd_hist_before(b)) & (b['MACD_hist'] < 0)),
+    Rule("MACD Below Zero (Strong Bear)", 'MACD', BEARISH, 6, MACD,
+         lambda b: b.valid('MACD') & (b['MACD'] < 0) & (b['MACD'] < b['MACD_signal'])),
+
+    # 3. RSI divergence over the last DIVERGENCE_BARS bars, and RSI levels
+    Rule("Bullish RSI Divergence", 'RSI_Div', BULLISH, 7, ('close', 'RSI'),
+         lambda b: b.valid('RSI') & b.seen(3) & b.steady('close', rising=False) & b.steady('RSI', rising=True)
+         & (b['RSI'] < 45)),
+    Rule("Bearish RSI Divergence", 'RSI_Div', BEARISH, 7, ('close', 'RSI'),
+         lambda b: b.valid('RSI') & b.seen(3) & b.steady('close', rising=True) & b.steady('RSI', rising=False)
+         & (b['RSI'] > 55)),
+    Rule("RSI Oversold", 'RSI_Div', BULLISH, 2, ('RSI',), lambda b: b['RSI'] < 30),
+    Rule("RSI Overbought", 'RSI_Div', BEARISH, 2, ('RSI',), lambda b: b['RSI'] > 70),
+
+    # Volume confirms whichever way the score leans
+    Rule("Volume Explosion", 'Volume', WITH_SCORE, 3, ('RSI', 'volume_ratio'),
+         lambda b: b.valid('RSI') & (b['volume_ratio'] > b.params['volume_spike'])),
+    Rule("High Volume (Bullish)", 'Volume', IF_BULLISH, 1, ('RSI', 'volume_ratio'),
+         lambda b: b.valid('RSI') & ~(b['volume_ratio'] > b.params['volume_spike']) & (b['volume_ratio'] > b.params['volume_high'])),
+    Rule("High Volume (Bearish)", 'Volume', IF_BEARISH, 1, ('RSI', 'volume_ratio'),
+         lambda b: b.valid('RSI') & ~(b['volume_ratio'] > b.params['volume_spike']) & (b['volume_ratio'] > b.params['volume_high'])),
+
+    # 4. Trend: price against the SMAs, golden/death cross, then only trade with SMA_200
+    Rule("Uptrend (Above SMAs)", 'Trend', BULLISH, 2, SMAS,
+         lambda b: b.valid('SMA_20', 'SMA_50') & (b['close'] > b['SMA_20']) & (b['close'] > b['SMA_50'])),
+    Rule("Downtrend (Below SMAs)", 'Trend', BEARISH, 2, SMAS,
+         lambda b: b.valid('SMA_20', 'SMA_50') & (b['close'] < b['SMA_20']) & (b['close'] < b['SMA_50'])),
+    Rule("Golden Cross (Fresh)", 'Trend', BULLISH, 5, SMAS,
+         lambda b: b.valid('SMA_20', 'SMA_50') & (b['SMA_20'] > b['SMA_50']) & _crossed(b, up=True)),
+    Rule("Golden Cross", 'Trend', BULLISH, 1, SMAS,
+         lambda b: b.valid('SMA_20', 'SMA_50') & (b['SMA_20'] > b['SMA_50']) & ~_crossed(b, up=True)),
+    Rule("Death Cross (Fresh)", 'Trend', BEARISH, 5, SMAS,
+         lambda b: b.valid('SMA_20', 'SMA_50') & (b['SMA_20'] < b['SMA_50']) & _crossed(b, up=False)),
+    Rule("Death Cross", 'Trend', BEARISH, 1, SMAS,
+         lambda b: b.valid('SMA_20', 'SMA_50') & (b['SMA_20'] < b['SMA_50']) & ~_crossed(b, up=False)),
+    Rule(None, 'Trend', ONLY_BULLISH, 0, SMAS + ('SMA_200',),
+         lambda b: b.valid('SMA_20', 'SMA_50', 'SMA_200') & (b['close'] > b['SMA_200'])),
+    Rule(None, 'Trend', ONLY_BEARISH, 0, SMAS + ('SMA_200',),
+         lambda b: b.valid('SMA_20', 'SMA_50', 'SMA_200') & ~(b['close'] > b['SMA_200'])),
+
+    # 5. On-Balance Volume
+    Rule("OBV Bullish (Accumulation)", 'OBV', BULLISH, 2, ('OBV', 'OBV_SMA'),
+         lambda b: b.valid('OBV', 'OBV_SMA') & (b['OBV'] > b['OBV_SMA'])),
+    Rule("OBV Bearish (Distribution)", 'OBV', BEARISH, 2, ('OBV', 'OBV_SMA'),
+         lambda b: b.valid('OBV', 'OBV_SMA') & ~(b['OBV'] > b['OBV_SMA'])),
+
+    # 6. Stochastic RSI
+    Rule("Stoch RSI Oversold", 'StochRSI', BULLISH, 3, ('STOCH_RSI',), lambda b: b['STOCH_RSI'] < 20),
+    Rule("Stoch RSI Overbought", 'StochRSI', BEARISH, 3, ('STOCH_RSI',), lambda b: b['STOCH_RSI'] > 80),
+
+    # 7. Fibonacci retracements
+    Rule("At Fib 61.8% (Golden Ratio)", 'Fibonacci', BULLISH, 4, FIBS, lambda b: _at_fib(b, 'FIB_618')),
+    Rule("At Fib 50%", 'Fibonacci', BULLISH, 2, FIBS, lambda b: _at_fib(b, 'FIB_500')),
+    Rule("At Fib 38.2%", 'Fibonacci', BULLISH, 2, FIBS, lambda b: _at_fib(b, 'FIB_382')),
+
+    # 8. Market structure break: close beyond the latest swing, once two swings are confirmed
+    Rule("Market Structure Break (Bullish)", 'MSB', BULLISH, 5, ('close', 'MSB_high', 'MSB_low'),
+         lambda b: b['close'] > b['MSB_high']),
+    Rule("Market Structure Break (Bearish)", 'MSB', BEARISH, 5, ('close', 'MSB_high', 'MSB_low'),
+         lambda b: b['close'] < b['MSB_low']),
+
+    # 9. Supply and demand zones
+    Rule("At Supply Zone (Resistance)", 'Supply_Demand', BEARISH, 3, ZONES,
+         lambda b: b.valid('supply_zone', 'demand_zone') & (b['close'] >= b['supply_zone'])),
+    Rule("At Demand Zone (Support)", 'Supply_Demand', BULLISH, 3, ZONES,
+         lambda b: b.valid('supply_zone', 'demand_zone') & ~(b['close'] >= b['supply_zone'])
+         & (b['close'] <= b['demand_zone'])),
+]
+
+
+class RuleSet:
+    """A rule table compiled for scoring arrays of bars.
+
+    score_bars scores one configuration and records which signals fired;
+    terms and score evaluate many configurations at once: each rule's
+    condition is computed once, and as a configuration only scales whole
+    groups, each run of fixed-direction rules of one group is summed into a
+    single row that one matrix product weighs for every configuration. Both
+    apply the rules in table order, so they agree bar for bar.
+    """
+
+    def __init__(self, rules):
+        self.rules = list(rules)
+        self.groups = list(dict.fromkeys(rule.group for rule in self.rules))
+        self.signals = [rule.signal for rule in self.rules if rule.signal]
+        if len(self.signals) > 64:
+            raise ValueError("a uint64 mask holds 64 signals")
+        self.bits = {signal: k for k, signal in enumerate(self.signals)}
+        self.columns = list(dict.fromkeys(['close'] + [c for rule in self.rules for c in rule.requires]))
+        self.group_of = np.array([self.groups.index(rule.group) for rule in self.rules], dtype=np.intp)
+        self.points = np.array([_SIGN.get(rule.direction, 1) * rule.weight for rule in self.rules], dtype=np.float64)
+        # Rows of terms: a run of fixed-direction rules of one group, or one rule that reads the score so far
+        self.term_rules = []
+        for k, rule in enumerate(self.rules):
+            previous = self.term_rules[-1] if self.term_rules else None
+            if (rule.direction in _FIXED and previous and self.rules[previous[-1]].direction in _FIXED
+                    and self.group_of[previous[-1]] == self.group_of[k]):
+                previous.append(k)
+            else:
+                self.term_rules.append([k])
+        self.term_group = np.array([self.group_of[rules[0]] for rules in self.term_rules], dtype=np.intp)
+        # Runs of fixed-direction terms, split at each rule that reads the score so far
+        self.steps = []
+        for t, rules in enumerate(self.term_rules):
+            if self.rules[rules[0]].direction not in _FIXED:
+                self.steps.append(t)
+            elif self.steps and isinstance(self.steps[-1], slice) and self.steps[-1].stop == t:
+                self.steps[-1] = slice(self.steps[-1].start, t + 1)
+            else:
+                self.steps.append(slice(t, t + 1))
+
+    def select(self, groups):
+        """The rules of the given groups, in table order."""
+        return RuleSet([rule for rule in self.rules if rule.group in groups])
+
+    def _active(self, columns, groups=None):
+        return [k for k, rule in enumerate(self.rules)
+                if (groups is None or rule.group in groups) and all(c in columns for c in rule.requires)]
+
+    def terms(self, columns, offset=0, params=None):
+        """The rule conditions score needs, one row per term (see term_rules) by bars.
+
+        A run of fixed-direction rules gives the points they add up to on
+        each bar; any other rule gives 1.0 where it fires. Rules whose
+        columns are missing never fire. A group's rows depend only on its
+        own columns, so the terms of a whole RuleSet are the rows of its
+        groups' terms stacked in order.
+        """
+        bars = Bars(columns, offset, params)
+        active = set(self._active(columns))
+        out = np.zeros((len(self.term_rules), bars.n))
+        for row, rules in zip(out, self.term_rules):
+            for k in rules:
+                if k in active:
+                    hit = self.rules[k].when(bars)
+                    if self.rules[k].direction in _FIXED:
+                        row[hit] += self.points[k]
+                    else:
+                        row[:] = hit
+        return out
+
+    def score(self, terms, multipliers):
+        """Scores of several configurations over the bars of terms, (configs x bars).
+
+        multipliers is (configs x groups), scaling each group's weights; 0
+        turns a group off, and any positive value turns its filters on.
+        """
+        multipliers = np.asarray(multipliers, dtype=np.float64)
+        score = np.zeros((len(multipliers), terms.shape[1]))
+        for step in self.steps:
+            if isinstance(step, slice):
+                score += multipliers[:, self.term_group[step]] @ terms[step]
+                continue
+            k = self.term_rules[step][0]
+            rule, hit = self.rules[k], terms[step]
+            weight = multipliers[:, self.group_of[k], None] * self.points[k]
+            if rule.direction == WITH_SCORE:
+                score += weight * hit * np.where(score > 0, 1.0, -1.0)
+            elif rule.direction == IF_BULLISH:
+                score += weight * hit * (score > 0)
+            elif rule.direction == IF_BEARISH:
+                score += weight * hit * (score < 0)
+            else:
+                on = (multipliers[:, self.group_of[k], None] > 0) & (hit > 0)
+                limit = np.maximum if rule.direction == ONLY_BULLISH else np.minimum
+                score = np.where(on, limit(score, 0.0), score)
+        return score
+
+    def score_bars(self, columns, groups, offset=0, params=None):
+        """Score and signal mask of every bar for one configuration: (int32 scores, uint64 masks).
+
+        Bit k of a mask is signals[k] (see decode). Only rules of groups
+        whose columns are present are applied.
+        """
+        bars = Bars(columns, offset, params)
+        n = bars.n
+        # The points of one direction add up to 68 at most, so int8 holds any score
+        score = np.zeros(n, dtype=np.int8)
+        # One byte per 8 signals, joined into the uint64 masks at the end
+        planes = np.zeros((8, n), dtype=np.uint8)
+        for k in self._active(columns, groups):
+            rule = self.rules[k]
+            hit = rule.when(bars)
+            if rule.direction == ONLY_BULLISH:
+                np.maximum(score, np.where(hit, np.int8(0), np.int8(-128)), out=score)
+                continue
+            if rule.direction == ONLY_BEARISH:
+                np.minimum(score, np.where(hit, np.int8(0), np.int8(127)), out=score)
+                continue
+            if rule.direction == WITH_SCORE:
+                score += hit.view(np.int8) * np.where(score > 0, np.int8(rule.weight), np.int8(-rule.weight))
+            else:
+                if rule.direction == IF_BULLISH:
+                    hit = hit & (score > 0)
+                elif rule.direction == IF_BEARISH:
+                    hit = hit & (score < 0)
+                score += hit.view(np.int8) * np.int8(self.points[k])
+            bit = self.bits[rule.signal]
+            planes[bit >> 3] |= hit.view(np.uint8) << np.uint8(bit & 7)
+
+        masks = np.empty((n, 8), dtype=np.uint8)
+        for k, plane in enumerate(planes):
+            masks[:, k] = plane
+        return score.astype(np.int32), masks.view('<u8').ravel()
+
+    def decode(self, mask):
+        """The signal names of one score_bars mask, in table order."""
+        mask = int(mask)
+        return [name for k, name in enumerate(self.signals) if mask >> k & 1]
+
+
+def flag_groups(flags):
+    """The groups the app's eight indicator flags turn on, Patterns included."""
+    groups = {'Patterns'}
+    for enabled, names in zip(flags, FLAG_GROUPS):
+        if enabled:
+            groups.update(names)
+    return groups
+
+
+def frame_columns(df, names):
+    """The named columns of df that exist, as arrays: int8 for patterns, float64 otherwise."""
+    return {name: df[name].to_numpy(dtype=np.int8 if name.startswith('CDL') else np.float64)
+            for name in names if name in df.columns}
+
+
+RULES = RuleSet(RULE_TABLE)
@@ -0,0 +1,99 @@
+# Watchlist scanner: concurrent fetches, process-pool scoring and a ranked table
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+
+from .data import AlphaVantageError, fetch_frame
+from .indicators import add_patterns, calculate_indicators
+from .metrics import REGISTRY, measured
+from .scheduler import SCAN
+from .scoring import calculate_score, signal_direction
+from .workers import process_pool
+
+FETCH_WORKERS = 16
+
+
+def score_symbol(ticker, df, flags, sensitivity):
+    """Indicators and live score of the latest candle for one symbol."""
+    df = calculate_indicators(add_patterns(df), *flags)
+    latest = df.iloc[-1]
+    score, signals = calculate_score(df, *flags)
+    score = float(score)
+    return {
+        'Ticker': ticker,
+        'Score': score,
+        'Direction': signal_direction(score, sensitivity),
+        'Close': float(latest['close']),
+        'Last Bar': df.index[-1],
+        'Signals': ", ".join(signals),
+    }
+
+
+def scan(tickers, interval, extended, flags, sensitivity, api_key, cache=None,
+         fetch_workers=FETCH_WORKERS, executor=None, progress=None):
+    """Fetch and score every ticker in the watchlist.
+
+    Fetches run on a thread pool and go through the shared request
+    scheduler in the scan lane, behind live refreshes (API calls only,
+    cache hits are free). Each frame is scored in the process pool as soon
+    as it arrives. progress, if given, is called with (done, total).
+    Returns (results, stats): one row per ticker sorted by score, and the
+    timing with end-to-end throughput in symbols per second.
+    """
+    executor = executor or process_pool()
+    api_calls = []
+
+    def load(ticker):
+        def fetch(full):
+            api_calls.append(ticker)
+            return fetch_frame(ticker, interval, extended, full, api_key, priority=SCAN)
+        return cache.get(ticker, interval, extended, False, fetch) if cache else fetch(False)
+
+    start = time.perf_counter()
+    rows = []
+    scoring = {}
+    done = 0
+    with ThreadPoolExecutor(max_workers=fetch_workers) as fetch_pool:
+        fetches = {fetch_pool.submit(load, t): t for t in tickers}
+        for future in as_completed(fetches):
+            ticker = fetches[future]
+            try:
+                df = future.result()
+            except (AlphaVantageError, OSError, ValueError) as e:
+                rows.append({'Ticker': ticker, 'Error': str(e)})
+                done += 1
+                if progress:
+                    progress(done, len(tickers))
+                continue
+            # Scores and indicator timings observed in the worker are recorded here, where /metrics reads them
+            scoring[executor.submit(measured, os.getpid(), score_symbol, ticker, df, flags, sensitivity)] = ticker
+
+    for future in as_completed(scoring):
+        try:
+            row, changes = future.result()
+            REGISTRY.add(changes)
+            rows.append(row)
+        except Exception as e:
+            rows.append({'Ticker': scoring[future], 'Error': str(e)})
+        done += 1
+        if progress:
+            progress(done, len(tickers))
+
+    elapsed = time.perf_counter() - start
+    results = pd.DataFrame(rows, columns=['Ticker', 'Score', 'Direction', 'Close', 'Last Bar', 'Signals', 'Error'])
+    results = results.sort_values('Score', ascending=False, na_position='last').reset_index(drop=True)
+    stats = {
+        'symbols': len(tickers),
+        'api_calls': len(api_calls),
+        'seconds': elapsed,
+        'symbols_per_sec': len(tickers) / elapsed if elapsed > 0 else 0.0,
+    }
+    return results, stats
+
+
+def parse_watchlist(text):
+    """Tickers from comma, space or newline separated text, de-duplicated in order."""
+    tickers = [t.strip().upper() for t in text.replace(",", " ").split()]
+    return list(dict.fromkeys(t for t in tickers if t))
@@ -0,0 +1,192 @@
+# Shared Alpha Vantage request scheduler: token bucket, priority lanes, coalescing and retry
+import contextvars
+import itertools
+import os
+import queue
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+
+from .client import get_json
+from .metrics import API_CALLS, API_COALESCED, API_ERRORS, API_QUEUE, API_RETRIES, API_THROTTLED, API_WAIT
+from .timing import active, record
+
+# Priority lanes, lower runs first
+LIVE, SCAN, BACKTEST = 0, 1, 2
+LANES = {LIVE: "live", SCAN: "scan", BACKTEST: "backtest"}
+
+# Premium tier; set ALPHA_VANTAGE_CALLS_PER_MINUTE for other plans
+DEFAULT_CALLS_PER_MINUTE = 600
+WORKERS = 8
+MAX_RETRIES = 4
+BACKOFF_SECONDS = 1.0
+
+
+def is_throttled(resp):
+    """True for the responses Alpha Vantage sends instead of data when over the rate limit."""
+    if not isinstance(resp, dict):
+        return False
+    if "Note" in resp:
+        return True
+    info = str(resp.get("Information", "")).lower()
+    return "rate limit" in info or "call frequency" in info or "requests per" in info
+
+
+class TokenBucket:
+    """Allows `rate` acquisitions per second on average, with bursts up to `capacity`."""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+    def pause(self, seconds):
+        """Hold every caller back for at least `seconds`, e.g. after the API reports we are over the limit."""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.tokens = min(self.tokens, -seconds * self.rate)
+
+
+class RequestScheduler:
+    """Runs API requests on worker threads under one token bucket.
+
+    Requests wait in priority lanes, so live refreshes go ahead of scans
+    and full-history backtest pulls. Identical in-flight URLs share a single
+    call. A throttled response pauses the whole bucket with exponential
+    backoff before the request is retried. metrics() reports queue depth
+    and wait times.
+    """
+
+    def __init__(self, calls_per_minute=DEFAULT_CALLS_PER_MINUTE, workers=WORKERS, get_json=get_json,
+                 max_retries=MAX_RETRIES, backoff=BACKOFF_SECONDS):
+        # One second's worth of burst keeps any 60 s window close to the tier limit
+        self.bucket = TokenBucket(calls_per_minute / 60.0, max(1, calls_per_minute // 60))
+        self.get_json = get_json
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.workers = workers
+        self.queue = queue.PriorityQueue()
+        self.inflight = {}
+        self.lock = threading.Lock()
+        self._sequence = itertools.count()
+        self._threads = []
+        self._depth = dict.fromkeys(LANES, 0)
+        self._waits = deque(maxlen=1000)
+        self._counts = dict.fromkeys(['calls', 'throttled', 'retries', 'coalesced', 'errors'], 0)
+
+    def submit(self, url, priority=LIVE):
+        """Queue a GET of url and return a Future for its JSON body."""
+        with self.lock:
+            future = self.inflight.get(url)
+            if future is not None:
+                self._counts['coalesced'] += 1
+                return future
+            future = Future()
+            self.inflight[url] = future
+            self._depth[priority] += 1
+            if not self._threads:
+                self._start()
+        # A timed caller's stages continue on the worker thread
+        context = contextvars.copy_context() if active() else None
+        self.queue.put((priority, next(self._sequence), time.monotonic(), url, future, context))
+        return future
+
+    def fetch(self, url, priority=LIVE):
+        return self.submit(url, priority).result()
+
+    def _start(self):
+        for _ in range(self.workers):
+            thread = threading.Thread(target=self._work, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _work(self):
+        while True:
+            priority, _, queued_at, url, future, context = self.queue.get()
+            with self.lock:
+                self._depth[priority] -= 1
+            try:
+                future.set_result(context.run(self._call, url, queued_at) if context else self._call(url, queued_at))
+            except Exception as e:
+                with self.lock:
+                    self._counts['errors'] += 1
+                future.set_exception(e)
+            finally:
+                with self.lock:
+                    self.inflight.pop(url, None)
+
+    def _call(self, url, queued_at):
+        for attempt in range(self.max_retries + 1):
+            self.bucket.acquire()
+            if attempt == 0:
+                waited = time.monotonic() - queued_at
+                record("wait", waited)
+                API_WAIT.observe(waited)
+                with self.lock:
+                    self._waits.append(waited)
+            resp = self.get_json(url)
+            with self.lock:
+                self._counts['calls'] += 1
+            if not is_throttled(resp):
+                return resp
+
+            with self.lock:
+                self._counts['throttled'] += 1
+            if attempt == self.max_retries:
+                return resp
+            # The quota is per key, so every queued request backs off, not just this one
+            self.bucket.pause(self.backoff * 2 ** attempt * (1 + random.random() * 0.25))
+            with self.lock:
+                self._counts['retries'] += 1
+
+    def metrics(self):
+        with self.lock:
+            waits = sorted(self._waits)
+            metrics = dict(self._counts)
+            metrics['queue_depth'] = {LANES[p]: n for p, n in self._depth.items()}
+            metrics['inflight'] = len(self.inflight)
+        metrics['wait_ms_avg'] = 1000 * sum(waits) / len(waits) if waits else 0.0
+        metrics['wait_ms_p95'] = 1000 * waits[int(0.95 * (len(waits) - 1))] if waits else 0.0
+        metrics['wait_ms_max'] = 1000 * waits[-1] if waits else 0.0
+        return metrics
+
+
+_scheduler = None
+_scheduler_lock = threading.Lock()
+
+
+def get_scheduler():
+    """The process-wide scheduler every Alpha Vantage call goes through."""
+    global _scheduler
+    with _scheduler_lock:
+        if _scheduler is None:
+            calls = int(os.environ.get("ALPHA_VANTAGE_CALLS_PER_MINUTE", DEFAULT_CALLS_PER_MINUTE))
+            _scheduler = RequestScheduler(calls_per_minute=calls)
+        return _scheduler
+
+
+# The scheduler keeps the counts; a scrape reads them
+API_CALLS.set_function(lambda: get_scheduler().metrics()['calls'])
+API_THROTTLED.set_function(lambda: get_scheduler().metrics()['throttled'])
+API_RETRIES.set_function(lambda: get_scheduler().metrics()['retries'])
+API_COALESCED.set_function(lambda: get_scheduler().metrics()['coalesced'])
+API_ERRORS.set_function(lambda: get_scheduler().metrics()['errors'])
+API_QUEUE.set_function(lambda: get_scheduler().metrics()['queue_depth'])
@@ -0,0 +1,59 @@
+# Live signal score for the latest candle, and the same rules over a whole frame
+import numpy as np
+
+from .rules import DIVERGENCE_BARS, RULES, flag_groups, frame_columns
+
+# Every signal calculate_score can report, in the order it reports them; bit k of a score_frame mask is SIGNALS[k]
+SIGNALS = RULES.signals
+
+# Bars scored per pass of score_frame; keeps the temporaries near cache size (512 KB of float64)
+SCORE_CHUNK = 65536
+
+
+def signal_direction(score, sensitivity):
+    """BULLISH or BEARISH once the score passes sensitivity either way, else NEUTRAL."""
+    return "BULLISH" if score > sensitivity else "BEARISH" if score < -sensitivity else "NEUTRAL"
+
+
+def decode_signals(mask):
+    """The signal strings of one score_frame mask, in calculate_score's order."""
+    return RULES.decode(mask)
+
+
+# Advanced scoring function
+def calculate_score(df, use_momentum, use_trend, use_macd, use_obv, use_stoch_rsi, use_fibonacci, use_msb, use_supply_demand):
+    """Score and signal names of the last row of df, under the rule table in rules.py.
+
+    Only the last DIVERGENCE_BARS rows are read, the furthest back any rule
+    looks, so this is score_frame's result for the last bar.
+    """
+    flags = (use_momentum, use_trend, use_macd, use_obv, use_stoch_rsi, use_fibonacci, use_msb, use_supply_demand)
+    # One float64 block of the recent rows instead of a lookup per column (rows first: picking columns
+    # of the whole frame would copy it)
+    names = [name for name in RULES.columns if name in df.columns]
+    recent = df.iloc[-DIVERGENCE_BARS:].iloc[:, df.columns.get_indexer(names)].to_numpy(dtype=np.float64)
+    scores, masks = RULES.score_bars(dict(zip(names, np.ascontiguousarray(recent.T))), flag_groups(flags),
+                                     offset=len(df) - len(recent))
+    return int(scores[-1]), decode_signals(masks[-1])
+
+
+def score_frame(df, flags):
+    """calculate_score for every bar of df at once: (scores, masks).
+
+    Bar i gets the score calculate_score(df.iloc[:i + 1], *flags)
+    returns, as int32, and a uint64 mask of the signals it reports (see
+    decode_signals). The frame is scored in cache-sized chunks overlapping
+    by the divergence lookback.
+    """
+    groups = flag_groups(flags)
+    arrays = frame_columns(df, RULES.columns)
+    n = len(df)
+    scores = np.empty(n, dtype=np.int32)
+    masks = np.empty(n, dtype=np.uint64)
+    overlap = DIVERGENCE_BARS - 1
+    for start in range(0, n, SCORE_CHUNK):
+        lo = max(start - overlap, 0)
+        end = min(start + SCORE_CHUNK, n)
+        score, mask = RULES.score_bars({name: values[lo:end] for name, values in arrays.items()}, groups, lo)
+        scores[start:end], masks[start:end] = score[start - lo:], mask[start - lo:]
+    return scores, masks
@@ -0,0 +1,319 @@
+# Parameter sweep: indicator periods, the volume thresholds and group weights, beyond the optimizer's on/off groups
+import itertools
+import math
+import os
+
+import numpy as np
+import pandas as pd
+import talib
+
+from .indicators import add_patterns
+from .optimizer import CHUNK_SIZE, OPTIMIZER_RULES, START_IDX, _accuracy, empty_counts, next_bar_up, tally_scores
+from .patterns import PATTERNS
+from .walkforward import MIN_SIGNALS
+
+# Parameters that change an indicator series; configurations sharing them share the series
+PERIODS = ['rsi_period', 'macd_fast', 'macd_slow', 'macd_signal', 'sma_fast', 'sma_slow', 'sma_long', 'stoch_period']
+# Parameters that change where the rules fire; configurations sharing them are scored together
+SERIES = PERIODS + ['volume_spike', 'volume_high']
+# Multiplier of each rule group's weights, in OPTIMIZER_RULES.groups order; 0 turns the group off
+WEIGHTS = ['pattern_weight', 'macd_weight', 'rsi_weight', 'volume_weight', 'trend_weight', 'obv_weight', 'stoch_weight']
+# The parameters each group's conditions depend on
+GROUP_PARAMS = {
+    'Patterns': [], 'MACD': ['macd_fast', 'macd_slow', 'macd_signal'], 'RSI_Div': ['rsi_period'],
+    'Volume': ['rsi_period', 'volume_spike', 'volume_high'], 'Trend': ['sma_fast', 'sma_slow', 'sma_long'], 'OBV': [],
+    'StochRSI': ['stoch_period'],
+}
+GROUP_RULES = {group: OPTIMIZER_RULES.select([group]) for group in OPTIMIZER_RULES.groups}
+
+# The Optimize tab's rules with every group on
+DEFAULTS = {
+    'rsi_period': 14, 'macd_fast': 12, 'macd_slow': 26, 'macd_signal': 9,
+    'sma_fast': 20, 'sma_slow': 50, 'sma_long': 200, 'stoch_period': 14,
+    'volume_spike': 2.0, 'volume_high': 1.5,
+    'pattern_weight': 1, 'macd_weight': 1, 'rsi_weight': 1, 'volume_weight': 1,
+    'trend_weight': 1, 'obv_weight': 1, 'stoch_weight': 1,
+}
+
+# Candidate values of each parameter; every default is one of them
+SPACE = {
+    'rsi_period': [7, 9, 14, 21],
+    'macd_fast': [8, 12, 16], 'macd_slow': [21, 26, 34], 'macd_signal': [5, 9],
+    'sma_fast': [10, 20], 'sma_slow': [50, 100], 'sma_long': [100, 150, 200],
+    'stoch_period': [9, 14],
+    'volume_spike': [1.5, 2.0, 2.5], 'volume_high': [1.2, 1.5, 1.8],
+    'pattern_weight': [0, 1, 2], 'macd_weight': [0, 0.5, 1], 'rsi_weight': [0, 1, 2], 'volume_weight': [0, 1, 2],
+    'trend_weight': [0, 1, 2], 'obv_weight': [0, 1, 2], 'stoch_weight': [0, 1, 2],
+}
+
+# Fewest bars a successive-halving rung is scored on
+MIN_RUNG_BARS = 250
+
+
+def valid(config):
+    # sma_long must be warmed up by START_IDX so every configuration scores the same bars; the high
+    # volume rules only fire between volume_high and volume_spike
+    return (config['macd_fast'] < config['macd_slow'] and config['sma_fast'] < config['sma_slow']
+            and config['sma_long'] <= START_IDX and config['volume_high'] < config['volume_spike'])
+
+
+def grid(space=SPACE):
+    """Every valid combination of the candidate values; parameters not in space keep their defaults.
+
+    Only for small spaces: the full SPACE has about 10^8 combinations.
+    """
+    names = list(space)
+    configs = ({**DEFAULTS, **dict(zip(names, values))} for values in itertools.product(*space.values()))
+    return [config for config in configs if valid(config)]
+
+
+def random_configs(space=SPACE, n=500, seed=0):
+    """n distinct valid combinations drawn at random (all of them if there are fewer)."""
+    names = list(space)
+    total = math.prod(len(values) for values in space.values())
+    if n >= total:
+        return grid(space)
+    rng = np.random.default_rng(seed)
+    seen = set()
+    configs = []
+    # Sampling index tuples keeps memory flat however large the grid is
+    for _ in range(100 * n):
+        picks = tuple(int(rng.integers(len(space[name]))) for name in names)
+        if picks in seen:
+            continue
+        seen.add(picks)
+        config = {**DEFAULTS, **{name: space[name][k] for name, k in zip(names, picks)}}
+        if valid(config):
+            configs.append(config)
+            if len(configs) == n:
+                break
+    return configs
+
+
+class SeriesCache:
+    """Indicator series and rule terms of one price history, each computed once.
+
+    Series cover the whole history; terms (see RuleSet.terms) are blocks of
+    one group's rows over the scored bars start_idx..len-2, cached by the
+    parameters in GROUP_PARAMS: one RSI per rsi_period, one block of MACD
+    terms per (fast, slow, signal) and so on, however many configurations
+    use them.
+    """
+
+    def __init__(self, close, volume, patterns, start_idx=START_IDX):
+        self.close = np.ascontiguousarray(close, dtype=np.float64)
+        self.volume = np.ascontiguousarray(volume, dtype=np.float64)
+        self.patterns = dict(zip(PATTERNS, patterns))
+        self.start = start_idx
+        self.end = max(len(self.close) - 1, start_idx)
+        self.memo = {}
+        self.stats = {'computed': 0, 'reused': 0}
+
+    def _get(self, key, compute):
+        if key in self.memo:
+            self.stats['reused'] += 1
+        else:
+            self.memo[key] = compute()
+            self.stats['computed'] += 1
+        return self.memo[key]
+
+    def rsi(self, period):
+        return self._get(('rsi', period), lambda: talib.RSI(self.close, timeperiod=period))
+
+    def sma(self, period):
+        return self._get(('sma', period), lambda: pd.Series(self.close).rolling(window=period).mean().to_numpy())
+
+    def macd(self, fast, slow, signal):
+        return self._get(('macd', fast, slow, signal),
+                         lambda: talib.MACD(self.close, fastperiod=fast, slowperiod=slow, signalperiod=signal))
+
+    def stoch_rsi(self, period):
+        def compute():
+            rsi = pd.Series(self.rsi(period))
+            low, high = rsi.rolling(period).min(), rsi.rolling(period).max()
+            return ((rsi - low) / (high - low) * 100).to_numpy()
+        return self._get(('stoch_rsi', period), compute)
+
+    def volume_ratio(self):
+        def compute():
+            volume = pd.Series(self.volume)
+            return (volume / volume.rolling(window=20).mean()).to_numpy()
+        return self._get(('volume_ratio',), compute)
+
+    def obv(self):
+        def compute():
+            close, volume = pd.Series(self.close), pd.Series(self.volume)
+            obv = (volume * ((close > close.shift(1)).astype(int) - (close < close.shift(1)).astype(int))).cumsum()
+            return obv.to_numpy(dtype=np.float64), obv.rolling(window=20).mean().to_numpy()
+        return self._get(('obv',), compute)
+
+    def columns(self, group, config):
+        """The columns group's rules read, under the names the rule table uses."""
+        columns = {'close': self.close}
+        if group == 'Patterns':
+            columns.update(self.patterns)
+        elif group == 'MACD':
+            columns['MACD'], columns['MACD_signal'], columns['MACD_hist'] = self.macd(
+                config['macd_fast'], config['macd_slow'], config['macd_signal'])
+        elif group in ('RSI_Div', 'Volume'):
+            columns['RSI'] = self.rsi(config['rsi_period'])
+            if group == 'Volume':
+                columns['volume_ratio'] = self.volume_ratio()
+        elif group == 'Trend':
+            for name, period in (('SMA_20', 'sma_fast'), ('SMA_50', 'sma_slow'), ('SMA_200', 'sma_long')):
+                columns[name] = self.sma(config[period])
+        elif group == 'OBV':
+            columns['OBV'], columns['OBV_SMA'] = self.obv()
+        elif group == 'StochRSI':
+            columns['STOCH_RSI'] = self.stoch_rsi(config['stoch_period'])
+        return columns
+
+    def terms(self, config):
+        """OPTIMIZER_RULES' terms over the scored bars for config's SERIES."""
+        blocks = []
+        for group, rules in GROUP_RULES.items():
+            key = (group,) + tuple(config[name] for name in GROUP_PARAMS[group])
+
+            def compute(group=group, rules=rules):
+                params = {name: config[name] for name in ('volume_spike', 'volume_high')}
+                return rules.terms(self.columns(group, config), params=params)[:, self.start:self.end]
+            blocks.append(self._get(key, compute))
+        return np.vstack(blocks)
+
+
+def score_configs(cache, configs, lo=0):
+    """Scores of bars lo.. for configurations that share their SERIES, shape (configs x bars)."""
+    terms = np.ascontiguousarray(cache.terms(configs[0])[:, lo:])
+    multipliers = np.array([[c[name] for name in WEIGHTS] for c in configs], dtype=np.float64)
+    return OPTIMIZER_RULES.score(terms, multipliers)
+
+
+def evaluate_configs(close, volume, patterns, went_up, configs, sensitivity, lo=0, start_idx=START_IDX,
+                     progress=None):
+    """Prediction counts of each configuration over scored bars lo...
+
+    Takes plain arrays, so it can run in a worker process: close, volume
+    and patterns ((patterns x bars) in PATTERNS order) for the whole
+    history, and went_up for the scored bars. Configurations are grouped by
+    their SERIES so each group's terms are stacked once. Returns
+    (counts, cache stats).
+    """
+    cache = SeriesCache(close, volume, patterns, start_idx)
+    went_up = np.asarray(went_up, dtype=np.float64)[lo:]
+    counts = empty_counts(len(configs))
+    order = sorted(range(len(configs)), key=lambda k: tuple(configs[k][name] for name in SERIES))
+    done = 0
+    for _, group in itertools.groupby(order, key=lambda k: tuple(configs[k][name] for name in SERIES)):
+        group = list(group)
+        for chunk in range(0, len(group), CHUNK_SIZE):
+            rows = group[chunk:chunk + CHUNK_SIZE]
+            tally_scores(score_configs(cache, [configs[k] for k in rows], lo), went_up, sensitivity, counts, rows)
+        done += len(group)
+        if progress:
+            progress(done, len(configs))
+    counts['correct'] = counts['bullish_correct'] + counts['bearish_correct']
+    counts['total'] = counts['bullish_total'] + counts['bearish_total']
+    return counts, cache.stats
+
+
+def _arrays(df, start_idx=START_IDX):
+    if not set(PATTERNS) <= set(df.columns):
+        df = add_patterns(df)
+    return (df['close'].to_numpy(dtype=np.float64), df['volume'].to_numpy(dtype=np.float64),
+            np.stack([df[name].to_numpy(dtype=np.int8) for name in PATTERNS]), next_bar_up(df, start_idx))
+
+
+def run_sweep(df, configs, sensitivity, lo=0, executor=None, tasks=None, progress=None):
+    """Prediction counts of every configuration on df's scored bars from lo on.
+
+    df needs OHLCV (pattern columns are added if missing); the indicators
+    are computed here for each period in configs. With an executor the
+    configurations are split, grouped by series, into tasks batches
+    (default two per CPU). progress, if given, is called with (done, total).
+    Returns (counts, stats) with how many series were computed and reused.
+    """
+    arrays = _arrays(df)
+    if executor is None or len(configs) <= CHUNK_SIZE:
+        return evaluate_configs(*arrays, configs, sensitivity, lo, progress=progress)
+
+    # Sorted by series, so each batch computes few distinct series
+    order = sorted(range(len(configs)), key=lambda k: tuple(configs[k][name] for name in SERIES))
+    per_batch = math.ceil(len(order) / (tasks or 2 * (os.cpu_count() or 1)))
+    batches = [order[i:i + per_batch] for i in range(0, len(order), per_batch)]
+    futures = [executor.submit(evaluate_configs, *arrays, [configs[k] for k in batch], sensitivity, lo)
+               for batch in batches]
+    counts = empty_counts(len(configs))
+    counts.update(correct=np.zeros(len(configs), dtype=np.int64), total=np.zeros(len(configs), dtype=np.int64))
+    stats = {'computed': 0, 'reused': 0}
+    done = 0
+    for batch, future in zip(batches, futures):
+        batch_counts, batch_stats = future.result()
+        for key, values in batch_counts.items():
+            counts[key][batch] = values
+        for key, value in batch_stats.items():
+            stats[key] += value
+        done += len(batch)
+        if progress:
+            progress(done, len(configs))
+    return counts, stats
+
+
+def _rows(configs, counts, bars):
+    rows = []
+    for k, config in enumerate(configs):
+        row = dict(config)
+        row.update({
+            'Accuracy': _accuracy(counts['correct'][k], counts['total'][k]),
+            'Bullish_Acc': _accuracy(counts['bullish_correct'][k], counts['bullish_total'][k]),
+            'Bearish_Acc': _accuracy(counts['bearish_correct'][k], counts['bearish_total'][k]),
+            'Signals': int(counts['total'][k]),
+            'Bars': bars,
+        })
+        rows.append(row)
+    return rows
+
+
+def _rank(row, min_signals):
+    # Configurations with too few signals rank below every one with enough
+    return (row['Signals'] >= min_signals, row['Accuracy'])
+
+
+def random_search(df, sensitivity, n_configs=500, space=SPACE, seed=0, min_signals=MIN_SIGNALS,
+                  executor=None, progress=None):
+    """Score n_configs random configurations on the full history, best first."""
+    configs = random_configs(space, n_configs, seed)
+    counts, _ = run_sweep(df, configs, sensitivity, executor=executor, progress=progress)
+    rows = _rows(configs, counts, len(df) - 1 - START_IDX)
+    return sorted(rows, key=lambda row: _rank(row, min_signals), reverse=True)
+
+
+def successive_halving(df, sensitivity, n_configs=729, eta=3, space=SPACE, seed=0, min_signals=MIN_SIGNALS,
+                       executor=None, progress=None):
+    """Successive halving over n_configs random configurations.
+
+    Every configuration is first scored on the most recent bars only; the
+    best 1/eta move on to a window eta times longer, until the survivors are
+    scored on the full history. Returns each configuration's row from the
+    last rung it reached, those scored on the most bars first.
+    """
+    configs = random_configs(space, n_configs, seed)
+    n_bars = max(len(df) - 1 - START_IDX, 0)
+    rungs = max(int(math.log(max(len(configs), 1), eta)), 0)
+    total = sum(math.ceil(len(configs) / eta ** r) for r in range(rungs + 1))
+    done = 0
+    results = []
+    for rung in range(rungs + 1):
+        bars = n_bars if rung == rungs else min(max(int(n_bars / eta ** (rungs - rung)), MIN_RUNG_BARS), n_bars)
+
+        def step(finished, _, base=done):
+            if progress:
+                progress(base + finished, total)
+
+        counts, _ = run_sweep(df, configs, sensitivity, lo=n_bars - bars, executor=executor, progress=step)
+        done += len(configs)
+        rows = sorted(_rows(configs, counts, bars), key=lambda row: _rank(row, min_signals), reverse=True)
+        if rung == rungs:
+            return rows + results
+        keep = math.ceil(len(rows) / eta)
+        results = rows[keep:] + results
+        configs = [{name: row[name] for name in DEFAULTS} for row in rows[:keep]]
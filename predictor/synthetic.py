@@ -0,0 +1,221 @@
+# Synthetic OHLCV bars and local Alpha Vantage and Telegram stand-ins for benchmarks and offline runs
+import json
+import threading
+import time
+import zlib
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+import pandas as pd
+
+from .cache import COMPACT_BARS
+
+# pandas frequency of each interval the app offers
+FREQUENCIES = {"1min": "1min", "5min": "5min", "15min": "15min", "30min": "30min",
+               "60min": "60min", "1day": "B", "1week": "W-FRI"}
+
+
+def synthetic_bars(n_bars, freq="15min", seed=0, start="2020-01-02 09:30"):
+    """Random-walk OHLCV frame shaped like fetch_data's output."""
+    rng = np.random.default_rng(seed)
+    close = 100.0 * np.exp(np.cumsum(rng.normal(0, 0.002, n_bars)))
+    open_ = np.concatenate(([100.0], close[:-1])) * (1 + rng.normal(0, 0.0005, n_bars))
+    high = np.maximum(open_, close) * (1 + np.abs(rng.normal(0, 0.001, n_bars)))
+    low = np.minimum(open_, close) * (1 - np.abs(rng.normal(0, 0.001, n_bars)))
+    volume = rng.integers(1_000, 100_000, n_bars).astype(float)
+
+    index = pd.date_range(start, periods=n_bars, freq=freq, tz='US/Eastern')
+    return pd.DataFrame({"open": open_.round(4), "high": high.round(4), "low": low.round(4),
+                         "close": close.round(4), "volume": volume}, index=index)
+
+
+def time_series_key(interval):
+    return {"1day": "Time Series (Daily)", "1week": "Weekly Time Series"}.get(interval, f"Time Series ({interval})")
+
+
+def time_series_payload(df, interval):
+    """Alpha Vantage JSON for a bar frame, newest bar first like the real API."""
+    fmt = "%Y-%m-%d" if interval in ("1day", "1week") else "%Y-%m-%d %H:%M:%S"
+    stamps = df.index.tz_localize(None).strftime(fmt) if df.index.tz is not None else df.index.strftime(fmt)
+    series = {}
+    for stamp, o, h, l, c, v in zip(stamps[::-1], *(df[col].to_numpy()[::-1] for col in
+                                                     ["open", "high", "low", "close", "volume"])):
+        series[stamp] = {"1. open": f"{o:.4f}", "2. high": f"{h:.4f}", "3. low": f"{l:.4f}",
+                         "4. close": f"{c:.4f}", "5. volume": f"{int(v)}"}
+    meta = {"1. Information": f"{interval} Prices (open, high, low, close) and Volumes",
+            "2. Symbol": "SYNTHETIC", "3. Last Refreshed": stamps[-1] if len(stamps) else ""}
+    return {"Meta Data": meta, time_series_key(interval): series}
+
+
+class FakeAlphaVantage:
+    """Local HTTP stand-in for the Alpha Vantage query endpoint.
+
+    Serves the frames registered with add(), trimming to the last 100 bars
+    for outputsize=compact. With auto_bars set, unknown symbols get a
+    synthetic series of that length, seeded by the symbol. Point the app at
+    it with ALPHA_VANTAGE_URL=server.url. Every query is recorded in
+    self.requests. With throttle=(calls, seconds), queries over that rate get
+    the "Note" response the real API sends when throttling.
+    """
+
+    def __init__(self, auto_bars=None, port=0, throttle=None):
+        self.bars = {}
+        self.auto_bars = auto_bars
+        self.throttle = throttle
+        self.requests = []
+        self.throttled = 0
+        self._calls = deque()
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/query"
+
+    def add(self, ticker, interval, frame):
+        self.bars[(ticker, interval)] = frame
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def respond(self, params):
+        """JSON body for one query, given its parsed parameters."""
+        with self._lock:
+            self.requests.append(params)
+            if self.throttle:
+                calls, seconds = self.throttle
+                now = time.monotonic()
+                while self._calls and now - self._calls[0] >= seconds:
+                    self._calls.popleft()
+                if len(self._calls) >= calls:
+                    self.throttled += 1
+                    return {"Note": "Thank you for using Alpha Vantage! Our standard API call frequency is "
+                                    f"{calls} calls per {seconds:g} seconds."}
+                self._calls.append(now)
+
+        function = params.get("function")
+        interval = {"TIME_SERIES_DAILY": "1day", "TIME_SERIES_WEEKLY": "1week"}.get(function, params.get("interval"))
+        ticker = params.get("symbol")
+        frame = self.bars.get((ticker, interval))
+        if frame is None and self.auto_bars and interval in FREQUENCIES:
+            seed = zlib.crc32(f"{ticker}:{interval}".encode())
+            frame = synthetic_bars(self.auto_bars, FREQUENCIES[interval], seed=seed)
+            self.bars[(ticker, interval)] = frame
+        if frame is None:
+            return {"Error Message": "Invalid API call. Please retry or visit the documentation for TIME_SERIES."}
+
+        if params.get("outputsize", "compact") == "compact" and interval != "1week":
+            frame = frame.iloc[-COMPACT_BARS:]
+        return time_series_payload(frame, interval)
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                params = {k: v[0] for k, v in parse_qs(urlparse(self.path).query).items()}
+                body = json.dumps(fake.respond(params)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+
+class FakeTelegram:
+    """Local HTTP stand-in for the Telegram Bot API.
+
+    Answers getMe and sendMessage, recording each message as
+    (received_at, chat_id, text) in self.messages, with received_at from
+    time.time(). Point a bot at it with TELEGRAM_API_URL=server.url.
+    """
+
+    def __init__(self, port=0):
+        self.messages = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self._server.server_address[1]}/bot"
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def respond(self, method, params):
+        """Bot API result for one call, given its parameters."""
+        if method == "getMe":
+            return {"id": 1, "is_bot": True, "first_name": "Fake", "username": "fake_bot"}
+        if method == "sendMessage":
+            chat_id = int(params["chat_id"])
+            with self._lock:
+                self.messages.append((time.time(), chat_id, params["text"]))
+                message_id = len(self.messages)
+            return {"message_id": message_id, "date": int(time.time()), "text": params["text"],
+                    "chat": {"id": chat_id, "type": "private"}}
+        return None
+
+    def _handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Small keep-alive responses would otherwise wait on delayed ACKs
+            disable_nagle_algorithm = True
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                raw = self.rfile.read(length).decode()
+                if self.headers.get("Content-Type", "").startswith("application/json"):
+                    params = json.loads(raw or "{}")
+                else:
+                    params = {k: v[0] for k, v in parse_qs(raw).items()}
+                result = fake.respond(self.path.rsplit("/", 1)[-1], params)
+                if result is None:
+                    payload = {"ok": False, "error_code": 404, "description": "Not Found: method not found"}
+                else:
+                    payload = {"ok": True, "result": result}
+                body = json.dumps(payload).encode()
+                self.send_response(200 if result is not None else 404)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
@@ -0,0 +1,127 @@
+# Coarser timeframes aggregated from one fetched series, and the signal they agree on
+import numpy as np
+import pandas as pd
+
+from .indicators import add_patterns, calculate_indicators
+from .scoring import calculate_score, signal_direction
+from .timing import stage
+
+COLUMNS = ["open", "high", "low", "close", "volume"]
+MINUTES = {"1min": 1, "5min": 5, "15min": 15, "30min": 30, "60min": 60, "1day": 1440, "1week": 7 * 1440}
+# Timeframes the confluence check scores unless told otherwise
+CONFLUENCE_TIMEFRAMES = ["5min", "15min", "60min", "1day"]
+# Regular session in minutes after midnight ET; Alpha Vantage's daily and weekly bars only cover it
+SESSION_OPEN, SESSION_CLOSE = 9 * 60 + 30, 16 * 60
+NS_PER_MINUTE = 60 * 10 ** 9
+# 1970-01-01 was a Thursday; shifting by three days starts the weeks on Monday
+WEEK_SHIFT = 3
+
+
+def base_interval(timeframes):
+    """The finest of timeframes, the one to fetch."""
+    return min(timeframes, key=MINUTES.__getitem__)
+
+
+def resample_bars(df, base, timeframes):
+    """{timeframe: OHLCV frame} aggregated from df, a series of base bars.
+
+    Intraday timeframes are buckets of clock time in US/Eastern (a 60min
+    bar covers 10:00-10:59), labelled with their start like the API's bars.
+    Days and weeks aggregate the regular session only, as the API's daily
+    and weekly series do, and are labelled with their (last) date. Every
+    timeframe is a reduceat over the same arrays, no groupby. The newest
+    bar of each timeframe is still forming when the newest base bar is.
+    """
+    step = MINUTES[base]
+    index = df.index
+    # Intraday buckets are counted in UTC minutes: Eastern offsets are whole hours, so the boundaries
+    # are the same, and the hour repeated when DST ends stays two bars. Days go by the wall clock.
+    utc = index.asi8 // NS_PER_MINUTE
+    wall = (index.tz_localize(None) if index.tz is not None else index).asi8 // NS_PER_MINUTE
+    minute_of_day = wall % 1440
+    in_session = (minute_of_day >= SESSION_OPEN) & (minute_of_day < SESSION_CLOSE)
+    values = {c: df[c].to_numpy(dtype=np.float64) for c in COLUMNS}
+
+    frames = {}
+    for timeframe in timeframes:
+        minutes = MINUTES[timeframe]
+        if timeframe == base:
+            frames[timeframe] = df[COLUMNS]
+            continue
+        if minutes < step or minutes % step:
+            raise ValueError(f"can't build {timeframe} bars from {base} bars")
+        # Daily bars from intraday ones keep the regular session; daily bars have no time of day to filter
+        rows = np.flatnonzero(in_session) if minutes >= 1440 and step < 1440 else np.arange(len(wall))
+        if timeframe == "1week":
+            codes = (wall[rows] // 1440 + WEEK_SHIFT) // 7
+        elif timeframe == "1day":
+            codes = wall[rows] // 1440
+        else:
+            codes = utc[rows] // minutes
+        if not len(codes):
+            frames[timeframe] = pd.DataFrame(columns=COLUMNS, index=index[:0], dtype=np.float64)
+            continue
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]])
+        ends = np.r_[starts[1:], len(codes)] - 1
+
+        if minutes < 1440:
+            labels = pd.DatetimeIndex(codes[starts] * minutes * NS_PER_MINUTE, tz='UTC' if index.tz else None)
+            labels = labels.tz_convert(index.tz) if index.tz is not None else labels
+        else:
+            # The day itself, or for a week its last trading day, at midnight like the API's daily bars
+            labels = pd.DatetimeIndex(wall[rows[ends]] // 1440 * 1440 * NS_PER_MINUTE)
+            labels = labels.tz_localize(index.tz) if index.tz is not None else labels
+
+        o, h, l, c, v = (values[name][rows] for name in COLUMNS)
+        frames[timeframe] = pd.DataFrame({
+            'open': o[starts],
+            'high': np.maximum.reduceat(h, starts),
+            'low': np.minimum.reduceat(l, starts),
+            'close': c[ends],
+            'volume': np.add.reduceat(v, starts),
+        }, index=labels)
+    return frames
+
+
+def confluence(frames, flags, sensitivity, weights=None):
+    """Score the latest bar of every timeframe in frames and combine them.
+
+    Each timeframe gets its indicators and calculate_score as the Live tab
+    would. The confluence score is the weighted mean of their scores
+    (equal weights by default), so it keeps the single-timeframe scale and
+    threshold. Its direction is NEUTRAL whenever a timeframe points the
+    other way. Returns (rows, summary): one row per timeframe, and the
+    combined score, direction and how many timeframes agree.
+    """
+    rows = []
+    for timeframe, bars in frames.items():
+        if not len(bars):
+            continue
+        with stage(timeframe):
+            with stage("indicators"):
+                df = add_patterns(calculate_indicators(bars.copy(), *flags))
+            with stage("score"):
+                score, signals = calculate_score(df, *flags)
+        rows.append({
+            'Timeframe': timeframe,
+            'Bars': len(df),
+            'Last Bar': df.index[-1],
+            'Score': float(score),
+            'Direction': signal_direction(score, sensitivity),
+            'Signals': ", ".join(signals),
+        })
+
+    weights = weights or {}
+    total_weight = sum(weights.get(row['Timeframe'], 1.0) for row in rows)
+    score = sum(weights.get(row['Timeframe'], 1.0) * row['Score'] for row in rows) / total_weight if rows else 0.0
+    direction = signal_direction(score, sensitivity)
+    opposite = {"BULLISH": "BEARISH", "BEARISH": "BULLISH"}.get(direction)
+    if any(row['Direction'] == opposite for row in rows):
+        direction = "NEUTRAL"
+    summary = {
+        'score': score,
+        'direction': direction,
+        'agree': sum(row['Direction'] == direction for row in rows) if direction != "NEUTRAL" else 0,
+        'timeframes': len(rows),
+    }
+    return rows, summary
@@ -0,0 +1,164 @@
+# Per-stage wall-clock timers for the Debug Info panel and the timing log
+import contextvars
+import cProfile
+import datetime
+import io
+import json
+import logging
+import marshal
+import os
+import pstats
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+logger = logging.getLogger("predictor.timing")
+
+# The run being timed and the stage path inside it; both unset when nothing is recording
+_active = contextvars.ContextVar("predictor_timings", default=None)
+_path = contextvars.ContextVar("predictor_stage_path", default=())
+_NULL = nullcontext()
+
+_log_lock = threading.Lock()
+_log_configured = False
+
+
+def active():
+    """True while a Timings run is recording in this context."""
+    return _active.get() is not None
+
+
+def stage(name):
+    """Time the with-block as stage name of the active run, or do nothing when none is recording.
+
+    Stages nest: a stage entered inside another one is reported as
+    "outer/inner". The same stage entered again adds to its time and count.
+    """
+    timings = _active.get()
+    return _NULL if timings is None else timings._stage(name)
+
+
+def record(name, seconds):
+    """Add seconds measured elsewhere (e.g. a queue wait) as stage name of the active run."""
+    timings = _active.get()
+    if timings is not None:
+        timings.add("/".join(_path.get() + (name,)), seconds)
+
+
+def _configure_log():
+    # $PREDICTOR_TIMING_LOG appends one JSON line per run; otherwise the records go to
+    # whatever handlers the host application set up for the "predictor.timing" logger
+    global _log_configured
+    with _log_lock:
+        if _log_configured:
+            return
+        _log_configured = True
+        path = os.environ.get("PREDICTOR_TIMING_LOG")
+        if path:
+            handler = logging.FileHandler(path)
+            handler.setFormatter(logging.Formatter("%(message)s"))
+            logger.addHandler(handler)
+            logger.setLevel(logging.INFO)
+
+
+class Timings:
+    """Stage timings of one run (a Live refresh, a backtest, ...).
+
+    Used as a context manager around the run; the stages entered inside it,
+    in any module and on the API scheduler's threads, are collected in
+    self.stages as {path: [seconds, calls]} in the order they started. On
+    exit the run is logged as one JSON record. enabled=False records nothing.
+    With profile=True the run's thread is also profiled with cProfile.
+    """
+
+    def __init__(self, run, enabled=True, profile=False, **labels):
+        self.run = run
+        self.enabled = enabled
+        self.labels = labels
+        self.stages = {}
+        self.total = 0.0
+        self.profile = profile and enabled
+        self.profile_error = None
+        self.stats = None
+        self._lock = threading.Lock()
+        self._profiler = None
+        self._tokens = None
+
+    def add(self, path, seconds):
+        with self._lock:
+            entry = self.stages.setdefault(path, [0.0, 0])
+            entry[0] += seconds
+            entry[1] += 1
+
+    @contextmanager
+    def _stage(self, name):
+        path = _path.get() + (name,)
+        key = "/".join(path)
+        with self._lock:
+            # Listed when it starts, so a stage comes before the ones inside it
+            self.stages.setdefault(key, [0.0, 0])
+        token = _path.set(path)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add(key, time.perf_counter() - start)
+            _path.reset(token)
+
+    def __enter__(self):
+        if not self.enabled:
+            return self
+        self._tokens = (_active.set(self), _path.set(()))
+        if self.profile:
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError as e:  # another profiler is running in this process (e.g. a second session)
+                self._profiler, self.profile_error = None, str(e)
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if not self.enabled:
+            return False
+        self.total = time.perf_counter() - self._start
+        if self._profiler is not None:
+            self._profiler.disable()
+            self.stats = pstats.Stats(self._profiler)
+        _active.reset(self._tokens[0])
+        _path.reset(self._tokens[1])
+        self.log()
+        return False
+
+    def rows(self):
+        """(path, depth, milliseconds, calls) per stage, in the order the stages started."""
+        with self._lock:
+            return [(path, path.count("/"), seconds * 1000, calls) for path, (seconds, calls) in self.stages.items()]
+
+    def as_record(self):
+        return {
+            'event': 'timings',
+            'run': self.run,
+            'time': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='milliseconds'),
+            **self.labels,
+            'total_ms': round(self.total * 1000, 3),
+            'stages': [{'stage': path, 'ms': round(ms, 3), 'calls': calls} for path, _, ms, calls in self.rows()],
+        }
+
+    def log(self):
+        _configure_log()
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps(self.as_record(), default=str))
+
+    def profile_text(self, limit=30, sort='cumulative'):
+        """The top functions of the profile as pstats prints them, or None without one."""
+        if self.stats is None:
+            return None
+        out = io.StringIO()
+        self.stats.stream = out
+        self.stats.sort_stats(sort).print_stats(limit)
+        return out.getvalue()
+
+    def profile_bytes(self):
+        """The profile in the .prof format pstats, snakeviz and friends read."""
+        return None if self.stats is None else marshal.dumps(self.stats.stats)
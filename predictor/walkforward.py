@@ -0,0 +1,115 @@
+# Walk-forward validation of the optimizer: pick the best configuration on one window, test it on the next
+import math
+import os
+
+import numpy as np
+
+from .optimizer import GROUPS, START_IDX, _accuracy, count_masks, full_factorial, next_bar_up, rule_terms
+
+# Configurations firing fewer signals than this in a training window are not picked
+MIN_SIGNALS = 10
+
+
+def fold_windows(n_bars, train_bars, test_bars):
+    """(train_lo, train_hi, test_lo, test_hi) bar offsets of each fold.
+
+    Test windows tile the history back to back, each one preceded by the
+    train_bars right before it.
+    """
+    folds = []
+    lo = 0
+    while lo + train_bars + test_bars <= n_bars:
+        folds.append((lo, lo + train_bars, lo + train_bars, lo + train_bars + test_bars))
+        lo += test_bars
+    return folds
+
+
+def run_folds(terms, went_up, offset, folds, masks, sensitivity, min_signals):
+    """Optimize and test a batch of folds; the arrays start at bar offset offset.
+
+    Returns (best mask index, train counts, test counts) per fold. Runs in a
+    worker process, so it only takes and returns plain arrays and ints.
+    """
+    results = []
+    for train_lo, train_hi, test_lo, test_hi in folds:
+        train = slice(train_lo - offset, train_hi - offset)
+        counts = count_masks(terms[:, train], went_up[train], masks, sensitivity)
+        accuracy = np.where(counts['total'] > 0, counts['correct'] / np.maximum(counts['total'], 1), 0.0)
+        eligible = counts['total'] >= min_signals
+        # First best like the Optimize tab's idxmax, among configurations with enough signals
+        best = int(np.argmax(np.where(eligible, accuracy, -1.0) if eligible.any() else accuracy))
+
+        test = slice(test_lo - offset, test_hi - offset)
+        tested = count_masks(terms[:, test], went_up[test], masks[best:best + 1], sensitivity)
+        results.append((best, {k: int(v[best]) for k, v in counts.items()},
+                        {k: int(v[0]) for k, v in tested.items()}))
+    return results
+
+
+def walk_forward(df, sensitivity, train_bars, test_bars=None, masks=None, min_signals=MIN_SIGNALS,
+                 executor=None, tasks=None, progress=None):
+    """Rolling walk-forward run of the optimizer over df.
+
+    df needs every indicator and the pattern columns, as in the Optimize
+    tab. For each fold the best of masks on the training window is scored
+    on the following test_bars (default train_bars). Folds run in batches on
+    executor when one is given (tasks batches, default two per CPU), else
+    in this process. progress, if given, is called with (done, total) folds.
+
+    Returns (folds, summary): one row per fold, and the pooled out-of-sample
+    accuracy next to the in-sample accuracy the optimizer reported.
+    """
+    test_bars = test_bars or train_bars
+    masks = full_factorial() if masks is None else np.asarray(masks, dtype=bool)
+    terms = rule_terms(df, START_IDX)
+    went_up = next_bar_up(df, START_IDX)
+    windows = fold_windows(len(went_up), train_bars, test_bars)
+
+    if executor is None:
+        batches = [windows]
+    else:
+        per_batch = math.ceil(len(windows) / (tasks or 2 * (os.cpu_count() or 1))) if windows else 1
+        batches = [windows[i:i + per_batch] for i in range(0, len(windows), per_batch)]
+
+    outcomes = []
+    for batch in batches:
+        if not batch:
+            continue
+        # Only ship the bars this batch covers
+        lo, hi = batch[0][0], batch[-1][3]
+        args = (terms[:, lo:hi], went_up[lo:hi], lo, batch, masks, sensitivity, min_signals)
+        outcomes.append(executor.submit(run_folds, *args) if executor else run_folds(*args))
+    results = []
+    for outcome in outcomes:
+        results.extend(outcome.result() if executor else outcome)
+        if progress:
+            progress(len(results), len(windows))
+
+    index = df.index[START_IDX:]
+    folds = []
+    for k, ((train_lo, train_hi, test_lo, test_hi), (best, train, test)) in enumerate(zip(windows, results)):
+        row = {'Fold': k + 1, 'Train Start': index[train_lo], 'Train End': index[train_hi - 1],
+               'Test Start': index[test_lo], 'Test End': index[test_hi - 1]}
+        row.update({name: bool(flag) for name, flag in zip(GROUPS, masks[best])})
+        row.update({
+            'Train_Acc': _accuracy(train['correct'], train['total']),
+            'Test_Acc': _accuracy(test['correct'], test['total']),
+            'Test_Bullish_Acc': _accuracy(test['bullish_correct'], test['bullish_total']),
+            'Test_Bearish_Acc': _accuracy(test['bearish_correct'], test['bearish_total']),
+            'Train_Signals': train['total'],
+            'Test_Signals': test['total'],
+        })
+        folds.append((row, train, test))
+
+    train_correct = sum(train['correct'] for _, train, _ in folds)
+    train_total = sum(train['total'] for _, train, _ in folds)
+    test_correct = sum(test['correct'] for _, _, test in folds)
+    test_total = sum(test['total'] for _, _, test in folds)
+    summary = {
+        'folds': len(folds),
+        'train_accuracy': _accuracy(train_correct, train_total),
+        'test_accuracy': _accuracy(test_correct, test_total),
+        'test_correct': test_correct,
+        'test_signals': test_total,
+    }
+    return [row for row, _, _ in folds], summary
@@ -0,0 +1,56 @@
+# Process pool shared by the scanner, walk-forward folds and the optimizer, and arrays shared with it
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from multiprocessing import shared_memory
+
+import numpy as np
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def process_pool():
+    """Worker processes shared by the whole app, started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that runs Streamlit's threads is not safe
+            _pool = ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+@contextmanager
+def shared_arrays(*arrays):
+    """Copy arrays into shared memory once; yields a (name, shape, dtype) spec per array.
+
+    The specs are small to pickle, so tasks pass them instead of the
+    arrays, and workers map the same memory with attach_arrays. The
+    blocks are freed when the with-block ends.
+    """
+    blocks, specs = [], []
+    try:
+        for array in arrays:
+            array = np.ascontiguousarray(array)
+            block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+            blocks.append(block)
+            np.ndarray(array.shape, array.dtype, buffer=block.buf)[...] = array
+            specs.append((block.name, array.shape, array.dtype.str))
+        yield specs
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+
+
+def attach_arrays(specs):
+    """Map the blocks of shared_arrays' specs in this process: (blocks, arrays), no copy.
+
+    Drop every reference to the arrays before closing the blocks.
+    """
+    blocks = [shared_memory.SharedMemory(name=name) for name, _, _ in specs]
+    arrays = [np.ndarray(shape, np.dtype(dtype), buffer=block.buf)
+              for block, (_, shape, dtype) in zip(blocks, specs)]
+    return blocks, arrays
@@ -0,0 +1,12 @@
+import pytest
+
+from predictor.indicators import add_patterns, calculate_indicators
+from predictor.synthetic import synthetic_bars
+
+ALL = (True,) * 8
+
+
+@pytest.fixture(scope="session")
+def frame():
+    """1,200 synthetic 15min bars with every indicator and the candlestick patterns."""
+    return add_patterns(calculate_indicators(synthetic_bars(1_200), *ALL))
@@ -0,0 +1,77 @@
+import asyncio
+
+import pandas as pd
+import pytest
+from telegram.error import NetworkError
+
+from predictor.alerts import AlertDaemon
+from predictor.metrics import REGISTRY, SCORES
+from predictor.scoring import score_frame, signal_direction
+
+ALL = (True,) * 8
+SENSITIVITY = 2
+
+
+class Loop:
+    def __init__(self):
+        self.calls = []
+
+    def call_soon_threadsafe(self, fn, *args):
+        self.calls.append(args)
+
+
+class Sender:
+    """Records queued alerts; send_message raises the chat's error, if it has one."""
+
+    def __init__(self, errors=None):
+        self.loop = Loop()
+        self.errors = errors or {}
+        self.sent = []
+
+    async def send_message(self, chat_id, text):
+        if chat_id in self.errors:
+            raise self.errors[chat_id]
+        self.sent.append((chat_id, text))
+
+
+def daemon(sender, chat_ids=(1,)):
+    return AlertDaemon(sender, chat_ids, ["AAPL"], "15min", True, ALL, SENSITIVITY, fetch=lambda ticker: None)
+
+
+def snapshot(frame, i):
+    return {'frame': frame.iloc[:i + 1], 'fetched_at': pd.Timestamp.now(tz='US/Eastern')}
+
+
+@pytest.fixture(scope="module")
+def directions(frame):
+    scores, _ = score_frame(frame, ALL)
+    return [signal_direction(score, SENSITIVITY) for score in scores]
+
+
+def test_first_poll_only_seeds_the_direction(frame, directions):
+    first = next(i for i in range(250, len(frame)) if directions[i] != "NEUTRAL")
+    flip = next(i for i in range(first + 1, len(frame)) if directions[i] not in ("NEUTRAL", directions[first]))
+    sender = Sender()
+    alerts = daemon(sender)
+    before = REGISTRY.snapshot()
+    alerts._on_snapshot(("AAPL", "15min", True), snapshot(frame, first))
+    assert sender.loop.calls == [] and alerts.directions["AAPL"] == directions[first]
+    # The poll still counts as a live score
+    assert SCORES.name in REGISTRY.changes(before)
+    alerts._on_snapshot(("AAPL", "15min", True), snapshot(frame, flip))
+    assert [alert['direction'] for alert, in sender.loop.calls] == [directions[flip]]
+    assert alerts.stats['alerts'] == 1
+
+
+@pytest.mark.parametrize("error", [NetworkError("reset"), ConnectionResetError("reset"), asyncio.TimeoutError(),
+                                   RuntimeError("bug")])
+def test_failed_chat_is_counted_and_the_others_still_get_the_batch(frame, error):
+    sender = Sender({2: error})
+    alerts = daemon(sender, chat_ids=(1, 2, 3))
+    now = pd.Timestamp.now(tz='US/Eastern')
+    alerts.pending = [{'ticker': "AAPL", 'direction': "BULLISH", 'score': 5.0, 'close': 100.0, 'bar': frame.index[-1],
+                       'signals': ["Hammer"], 'polled_at': now.timestamp(), 'closed_at': now.timestamp()}]
+    asyncio.run(alerts._flush())
+    assert [chat_id for chat_id, _ in sender.sent] == [1, 3]
+    assert (alerts.stats['messages'], alerts.stats['errors']) == (2, 1)
+    assert alerts.last_error is not None and len(alerts.latencies) == 1
@@ -0,0 +1,14 @@
+import pytest
+
+from predictor.backtest import run_backtest, run_backtest_loop
+
+ALL = (True,) * 8
+SELECTIONS = [ALL, (True, True) + (False,) * 6, (True,) + (False,) * 7, (False, True) + (False,) * 6, (False,) * 8,
+              (False, False) + (True,) * 6]
+
+
+@pytest.mark.parametrize("flags", SELECTIONS)
+@pytest.mark.parametrize("sensitivity", [0, 2, 4])
+def test_vectorized_backtest_matches_loop(frame, flags, sensitivity):
+    # The loop scores each candle with calculate_score on the frame up to it, like the Live tab
+    assert run_backtest(frame, flags, sensitivity) == run_backtest_loop(frame, flags, sensitivity)
@@ -0,0 +1,86 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from predictor.backtest import run_backtest
+from predictor.barstore import ROW_BYTES, BarStore
+from predictor.cache import COLUMNS
+from predictor.indicators import add_patterns, calculate_indicators
+from predictor.synthetic import synthetic_bars
+
+KEY = ("AAPL", "1min", True)
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BarStore(str(tmp_path))
+
+
+@pytest.fixture(scope="module")
+def bars():
+    return synthetic_bars(3_000, freq="1min", seed=5)
+
+
+def stored(store):
+    return store.frame(*KEY)
+
+
+def test_overlapping_chunks_append_once(store, bars):
+    for lo in range(0, len(bars), 500):
+        store.append(*KEY, bars.iloc[max(0, lo - 5):lo + 500])
+    pd.testing.assert_frame_equal(stored(store), bars, check_freq=False)
+    assert store.extent(*KEY) == (bars.index[0], bars.index[-1], len(bars))
+    assert store.append(*KEY, bars.iloc[-50:]) == 0
+
+
+def test_forming_bar_is_rewritten_in_place(store, bars):
+    store.append(*KEY, bars.iloc[:10])
+    inode = os.stat(store.paths(*KEY)[1]).st_ino
+    revised = bars.iloc[9:12].copy()
+    revised.iloc[0] = revised.iloc[0] * 1.01
+    assert store.append(*KEY, revised) == 2
+    assert os.stat(store.paths(*KEY)[1]).st_ino == inode
+    pd.testing.assert_frame_equal(stored(store), pd.concat([bars.iloc[:9], revised]), check_freq=False)
+
+
+def test_bars_inside_the_stored_range_are_left_alone(store, bars):
+    store.append(*KEY, bars.iloc[:10])
+    changed = bars.iloc[3:8] * 2
+    assert store.append(*KEY, changed) == 0
+    pd.testing.assert_frame_equal(stored(store), bars.iloc[:10], check_freq=False)
+
+
+def test_torn_append_is_ignored_then_truncated(store, bars):
+    store.append(*KEY, bars.iloc[:10])
+    ts_path, ohlcv_path = store.paths(*KEY)
+    # A crash between the two writes: two rows without timestamps, and half of one timestamp
+    with open(ohlcv_path, "ab") as f:
+        f.write(np.full((2, len(COLUMNS)), -1.0).tobytes())
+    with open(ts_path, "ab") as f:
+        f.write(b"\0" * 4)
+    pd.testing.assert_frame_equal(stored(store), bars.iloc[:10], check_freq=False)
+    assert store.append(*KEY, bars.iloc[8:20]) == 10
+    pd.testing.assert_frame_equal(stored(store), bars.iloc[:20], check_freq=False)
+    assert (os.path.getsize(ts_path), os.path.getsize(ohlcv_path)) == (20 * 8, 20 * ROW_BYTES)
+
+
+def test_older_bars_are_merged_and_stored_bars_win_ties(store, bars):
+    store.append(*KEY, bars.iloc[5:10])
+    older = bars.iloc[:8].copy()
+    older.iloc[5:] = older.iloc[5:] * 2
+    assert store.append(*KEY, older) == 5
+    pd.testing.assert_frame_equal(stored(store), bars.iloc[:10], check_freq=False)
+    assert not [name for name in os.listdir(store.directory) if name.endswith(".tmp")]
+
+
+def test_stored_range_backtests_like_the_in_memory_slice(store, bars):
+    store.append(*KEY, bars)
+    lo, hi = bars.index[500], bars.index[2_500]
+    expected_df = add_patterns(bars.loc[lo:hi].copy())
+    actual_df = add_patterns(store.frame(*KEY, lo, hi))
+    pd.testing.assert_frame_equal(actual_df, expected_df, check_freq=False)
+    for flags in ((True,) * 8, (True, True) + (False,) * 6, (False,) * 8):
+        expected = run_backtest(calculate_indicators(expected_df.copy(), *flags), flags, 4)
+        assert run_backtest(calculate_indicators(actual_df.copy(), *flags), flags, 4) == expected, flags
@@ -0,0 +1,20 @@
+import numpy as np
+import pytest
+
+from predictor.compact import BASE_COLUMNS, SIGNAL_AGREEMENT, CompactFrame, compact_dtypes, signal_agreement
+
+SELECTIONS = [(True,) * 8, (True, True) + (False,) * 6, (False, False, True) + (False,) * 5, (False,) * 6 + (True, True)]
+
+
+def test_compact_frame_round_trip(frame):
+    stored = CompactFrame(frame)
+    assert stored.nbytes < frame.memory_usage(index=True).sum() / 1.5
+    restored = stored.to_frame()
+    for name in BASE_COLUMNS:
+        np.testing.assert_array_equal(restored[name].to_numpy(), frame[name].to_numpy(), err_msg=name)
+    assert restored['MACD'].dtype == np.float32
+
+
+@pytest.mark.parametrize("flags", SELECTIONS)
+def test_signals_agree_with_float64(frame, flags):
+    assert signal_agreement(frame, compact_dtypes(frame), flags) >= SIGNAL_AGREEMENT
@@ -0,0 +1,96 @@
+import numpy as np
+
+from predictor import incremental
+from predictor.incremental import IndicatorState
+from predictor.indicators import add_patterns, calculate_indicators
+from predictor.metrics import INDICATOR_ROLLBACKS
+from predictor.patterns import PATTERNS
+
+ALL = (True,) * 8
+OHLCV = ["open", "high", "low", "close", "volume"]
+
+
+def recompute(bars):
+    return add_patterns(calculate_indicators(bars.copy(), *ALL))
+
+
+def assert_matches(actual, bars):
+    # Against a full recompute of the same bars (the swing columns of the last two bars are
+    # only known once the bars after them are); states keep at most MAX_BARS..2*MAX_BARS bars,
+    # compare the rows they still hold
+    expected = recompute(bars).iloc[-len(actual):]
+    assert actual.index.equals(expected.index)
+    for column in actual.columns:
+        a, b = actual[column].to_numpy(), expected[column].to_numpy()
+        if a.dtype == bool or column in PATTERNS:
+            np.testing.assert_array_equal(a, b, err_msg=column)
+        else:
+            np.testing.assert_allclose(a, b, rtol=1e-9, atol=1e-9, err_msg=column)
+
+
+def test_sync_appends_new_bars(frame):
+    bars = frame[OHLCV]
+    state = IndicatorState(ALL)
+    assert_matches(state.sync(bars.iloc[:-10]), bars.iloc[:-10])
+    assert_matches(state.sync(bars), bars)
+
+
+def test_revised_last_bar_is_rolled_back(frame):
+    bars = frame[OHLCV]
+    state = IndicatorState(ALL)
+    state.sync(bars.iloc[:-1])
+    revised = bars.iloc[:-1].copy()
+    revised.iloc[-1, revised.columns.get_loc('close')] *= 1.01
+    revised.iloc[-1, revised.columns.get_loc('high')] *= 1.01
+    synced = state.sync(revised)
+    # The state before the revised bar (EMAs, RSI, OBV, ...) carries over
+    assert_matches(synced, revised)
+    # And the bar after it continues from the revised one like a full recompute would
+    assert_matches(state.sync(bars), bars)
+
+
+def rollbacks():
+    return {result: INDICATOR_ROLLBACKS.values.get((result,), 0) for result in ("rollback", "reset")}
+
+
+def test_dropped_last_bar_rolls_back_to_the_last_common_one(frame):
+    bars = frame[OHLCV]
+    state = IndicatorState(ALL)
+    state.sync(bars.iloc[:-5])
+    before = rollbacks()
+    # The API dropped the forming bar, and a later poll brings the bars after it
+    dropped = bars.iloc[:-5].drop(bars.index[-6])
+    assert_matches(state.sync(dropped), dropped)
+    assert rollbacks() == {**before, "rollback": before["rollback"] + 1}
+    assert_matches(state.sync(bars), bars)
+
+
+def test_bars_revised_a_few_back_roll_back_to_before_them(frame):
+    bars = frame[OHLCV]
+    state = IndicatorState(ALL)
+    state.sync(bars.iloc[:-5])
+    revised = bars.iloc[:-5].copy()
+    revised.iloc[-4:, revised.columns.get_loc('close')] *= 0.99
+    before = rollbacks()
+    assert_matches(state.sync(revised), revised)
+    assert rollbacks()["reset"] == before["reset"]
+    assert_matches(state.sync(bars), bars)
+
+
+def test_frame_without_a_common_bar_resets(frame):
+    bars = frame[OHLCV]
+    state = IndicatorState(ALL)
+    state.sync(bars.iloc[:600])
+    before = rollbacks()
+    assert_matches(state.sync(bars.iloc[700:]), bars.iloc[700:])
+    assert rollbacks() == {**before, "reset": before["reset"] + 1}
+
+
+def test_trim_keeps_the_newest_bars(frame, monkeypatch):
+    monkeypatch.setattr(incremental, "MAX_BARS", 250)
+    bars = frame[OHLCV]
+    state = IndicatorState(ALL)
+    for start in range(0, len(bars), 100):
+        synced = state.sync(bars.iloc[:start + 100])
+    assert state.size <= 2 * 250
+    assert_matches(synced.iloc[-50:], bars)
@@ -0,0 +1,34 @@
+import numpy as np
+import pytest
+
+from benchmarks.bench_msb import msb_loop
+from predictor.indicators import add_patterns, calculate_indicators
+from predictor.scoring import calculate_score
+
+MSB_ONLY = (False,) * 6 + (True, False)
+SCORED_BARS = 300
+
+
+def test_swing_levels_match_per_bar_filter(frame):
+    bullish, bearish = msb_loop(frame)
+    np.testing.assert_array_equal((frame['close'] > frame['MSB_high']).to_numpy(), bullish)
+    np.testing.assert_array_equal((frame['close'] < frame['MSB_low']).to_numpy(), bearish)
+
+
+def test_calculate_score_lists_the_same_breaks(frame):
+    bullish, bearish = msb_loop(frame)
+    for i in range(len(frame) - SCORED_BARS, len(frame)):
+        _, signals = calculate_score(frame.iloc[:i + 1], *MSB_ONLY)
+        assert ("Market Structure Break (Bullish)" in signals) == bullish[i], i
+        assert ("Market Structure Break (Bearish)" in signals) == bearish[i], i
+
+
+@pytest.mark.parametrize("i", [60, 61, 62, 400, 401, 402, 799, 1000, 1198])
+def test_no_lookahead(frame, i):
+    # The levels and score of bar i must not change when the bars after it don't exist yet
+    bars = frame[["open", "high", "low", "close", "volume"]]
+    truncated = add_patterns(calculate_indicators(bars.iloc[:i + 1].copy(), *MSB_ONLY))
+    for name in ("MSB_high", "MSB_low"):
+        np.testing.assert_equal(truncated[name].iloc[-1], frame[name].iloc[i], err_msg=name)
+    expected = calculate_score(frame.iloc[:i + 1], *MSB_ONLY)
+    assert calculate_score(truncated, *MSB_ONLY) == expected
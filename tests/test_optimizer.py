@@ -0,0 +1,34 @@
+import pytest
+
+from predictor.optimizer import GROUPS, evaluate_masks, full_factorial, run_config_loop, run_optimization
+
+MASKS = full_factorial()
+SENSITIVITY = 4
+# run_config_loop scores one bar at a time (~1 ms each), so the 64 configurations run on the first
+# HEAD_BARS bars of the fixture: START_IDX of warm-up and 300 scored bars
+HEAD_BARS = 500
+
+
+@pytest.fixture(scope="module")
+def head(frame):
+    return frame.iloc[:HEAD_BARS]
+
+
+@pytest.fixture(scope="module")
+def batched(head):
+    return evaluate_masks(head, MASKS, SENSITIVITY)
+
+
+@pytest.mark.parametrize("k", range(len(MASKS)))
+def test_batched_counts_match_loop(head, batched, k):
+    expected = run_config_loop(head, *MASKS[k], SENSITIVITY)
+    assert {key: int(batched[key][k]) for key in expected} == expected, dict(zip(GROUPS, MASKS[k]))
+
+
+@pytest.mark.parametrize("sensitivity", [0, 2, 8])
+def test_result_rows_match_loop(head, sensitivity):
+    results = run_optimization(head, sensitivity)
+    for k in range(0, len(MASKS), 9):
+        expected = run_config_loop(head, *MASKS[k], sensitivity)
+        assert results[k]['Signals'] == expected['total'], dict(zip(GROUPS, MASKS[k]))
+        assert results[k]['Accuracy'] == (expected['correct'] / expected['total'] * 100 if expected['total'] else 0)
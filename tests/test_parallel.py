@@ -0,0 +1,40 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from predictor import optimizer
+from predictor.optimizer import START_IDX, count_masks, count_parallel, full_factorial, next_bar_up, rule_terms
+
+MASKS = full_factorial()
+SENSITIVITY = 4
+
+
+@pytest.fixture(scope="module")
+def pool():
+    # spawn, like workers.process_pool: the tasks only get the shared blocks' names
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as executor:
+        yield executor
+
+
+def assert_counts_equal(actual, expected):
+    assert actual.keys() == expected.keys()
+    for key, values in expected.items():
+        np.testing.assert_array_equal(actual[key], values, err_msg=key)
+
+
+@pytest.mark.parametrize("tasks", [1, 2, 7])
+def test_shared_memory_counts_match_in_process(frame, pool, tasks):
+    terms, went_up = rule_terms(frame, START_IDX), next_bar_up(frame, START_IDX)
+    seen = []
+    counts = count_parallel(terms, went_up, MASKS, SENSITIVITY, pool, tasks,
+                            progress=lambda done, total: seen.append((done, total)))
+    assert_counts_equal(counts, count_masks(terms, went_up, MASKS, SENSITIVITY))
+    assert seen == sorted(seen) and seen[-1] == (len(MASKS), len(MASKS))
+
+
+def test_evaluate_masks_on_executor(frame, pool, monkeypatch):
+    expected = optimizer.evaluate_masks(frame, MASKS, SENSITIVITY)
+    monkeypatch.setattr(optimizer, "PARALLEL_MIN_BARS", 0)
+    assert_counts_equal(optimizer.evaluate_masks(frame, MASKS, SENSITIVITY, executor=pool, tasks=3), expected)
@@ -0,0 +1,38 @@
+import itertools
+
+import pytest
+
+from benchmarks.bench_kernel import reference_score, with_divergences
+from predictor.compact import compact_dtypes
+from predictor.scoring import calculate_score, decode_signals, score_frame
+
+# The scalar reference takes ~1 s per selection over every bar of the fixture, so each of the
+# 256 selections checks every STRIDE-th bar, starting at a different one, and together they cover all bars
+STRIDE = 32
+FLAG_COMBINATIONS = list(itertools.product((False, True), repeat=8))
+
+
+def assert_matches_reference(df, flags, bars):
+    scores, masks = score_frame(df, flags)
+    for i in bars:
+        current, window = df.iloc[i], df.iloc[:i + 1]
+        expected = reference_score(current, window, flags)
+        assert (scores[i], decode_signals(masks[i])) == expected, (flags, i)
+        assert calculate_score(window, *flags) == expected, (flags, i)
+
+
+@pytest.mark.parametrize("k", range(len(FLAG_COMBINATIONS)))
+def test_rule_table_matches_scalar_rules(frame, k):
+    assert_matches_reference(frame, FLAG_COMBINATIONS[k], range(k % STRIDE, len(frame), STRIDE))
+
+
+def test_compact_frame_every_bar(frame):
+    assert_matches_reference(compact_dtypes(frame), (True,) * 8, range(len(frame)))
+
+
+def test_planted_divergences_every_bar(frame):
+    df = with_divergences(frame)
+    assert_matches_reference(df, (True,) * 8, range(len(df)))
+    _, masks = score_frame(df, (True,) * 8)
+    fired = {name for mask in masks for name in decode_signals(mask)}
+    assert {"Bullish RSI Divergence", "Bearish RSI Divergence"} <= fired
@@ -0,0 +1,32 @@
+import numpy as np
+
+from predictor.incremental import IndicatorState
+from predictor.indicators import add_patterns, calculate_indicators
+from predictor.metrics import REGISTRY
+from predictor.scoring import calculate_score, decode_signals, score_frame
+from predictor.synthetic import synthetic_bars
+
+ALL = (True,) * 8
+
+
+def test_score_frame_matches_live_path_bar_by_bar():
+    # The batch path (Backtest, Optimize) against the Live tab's: indicators appended one bar at a
+    # time, then calculate_score on the newest bar
+    bars = synthetic_bars(700, seed=3)
+    scores, masks = score_frame(add_patterns(calculate_indicators(bars.copy(), *ALL)), ALL)
+    state = IndicatorState(ALL)
+    rows = bars[["open", "high", "low", "close", "volume"]].to_numpy(dtype=np.float64).tolist()
+    for i, (timestamp, bar) in enumerate(zip(bars.index, rows)):
+        state.append(timestamp, *bar)
+        frame = state.frame()
+        score, signals = calculate_score(frame, *ALL)
+        assert score == scores[i], i
+        assert signals == decode_signals(masks[i]), i
+
+
+def test_calculate_score_counts_nothing(frame):
+    # Only the live callers (Live tab, alert daemon) count scores; backtests and scans call this per bar
+    before = REGISTRY.snapshot()
+    for i in range(len(frame) - 20, len(frame)):
+        calculate_score(frame.iloc[:i + 1], *ALL)
+    assert REGISTRY.changes(before) == {}
@@ -0,0 +1,76 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pytest
+
+from predictor.optimizer import CHUNK_SIZE, GROUPS, START_IDX, evaluate_masks, full_factorial
+from predictor.patterns import PATTERNS
+from predictor.sweep import DEFAULTS, WEIGHTS, SeriesCache, grid, random_configs, run_sweep
+
+SENSITIVITY = 4
+MASKS = full_factorial()
+
+
+def cache_of(frame):
+    return SeriesCache(frame['close'], frame['volume'], [frame[name] for name in PATTERNS])
+
+
+@pytest.mark.parametrize("sensitivity", [0, 4, 8])
+def test_defaults_reproduce_the_optimizer(frame, sensitivity):
+    # Weight 0 turns a group off, so the defaults with 0/1 weights are the optimizer's 64 configurations
+    configs = [{**DEFAULTS, **{name: int(on) for name, on in zip(WEIGHTS[1:], mask)}} for mask in MASKS]
+    counts, _ = run_sweep(frame, configs, sensitivity)
+    expected = evaluate_masks(frame, MASKS, sensitivity)
+    for key, values in expected.items():
+        np.testing.assert_array_equal(counts[key], values, err_msg=key)
+    assert WEIGHTS[1:] == [f"{name}_weight" for name in ('macd', 'rsi', 'volume', 'trend', 'obv', 'stoch')]
+    assert GROUPS == ['MACD', 'RSI_Div', 'Volume', 'Trend', 'OBV', 'StochRSI']
+
+
+def test_series_match_the_indicator_columns(frame):
+    cache = cache_of(frame)
+    np.testing.assert_allclose(cache.rsi(14), frame['RSI'], equal_nan=True)
+    np.testing.assert_allclose(cache.sma(50), frame['SMA_50'], equal_nan=True)
+    np.testing.assert_allclose(cache.macd(12, 26, 9)[2], frame['MACD_hist'], equal_nan=True)
+    np.testing.assert_allclose(cache.volume_ratio(), frame['volume_ratio'], equal_nan=True)
+    np.testing.assert_allclose(cache.stoch_rsi(14), frame['STOCH_RSI'], equal_nan=True)
+
+
+def test_cache_reuses_series_and_terms(frame):
+    cache = cache_of(frame)
+    terms = cache.terms(DEFAULTS)
+    computed = cache.stats['computed']
+    # Weights don't change a series; the same terms come back without computing anything
+    np.testing.assert_array_equal(cache.terms({**DEFAULTS, 'macd_weight': 0.5}), terms)
+    assert cache.stats['computed'] == computed
+    # A new RSI period recomputes the RSI and the two groups reading it (Stoch RSI has its own period)
+    changed = cache.terms({**DEFAULTS, 'rsi_period': 9})
+    assert cache.stats['computed'] == computed + 3
+    np.testing.assert_array_equal(cache.terms(DEFAULTS), terms)
+    assert cache.stats['computed'] == computed + 3
+    assert terms.shape[1] == len(frame) - 1 - START_IDX
+    assert not np.array_equal(changed, terms)
+
+
+def test_memoized_terms_equal_a_fresh_cache(frame):
+    configs = grid({'rsi_period': [9, 14], 'macd_fast': [8, 12], 'volume_spike': [1.5, 2.0],
+                    'volume_high': [1.2, 1.5], 'sma_fast': [10, 20]})
+    shared = cache_of(frame)
+    for config in configs:
+        np.testing.assert_array_equal(shared.terms(config), cache_of(frame).terms(config), err_msg=str(config))
+    assert shared.stats['reused'] > shared.stats['computed']
+
+
+def test_volume_high_moves_the_high_volume_rules(frame):
+    cache = cache_of(frame)
+    assert not np.array_equal(cache.terms({**DEFAULTS, 'volume_high': 1.2}), cache.terms(DEFAULTS))
+
+
+def test_batches_on_worker_processes_match_in_process(frame):
+    configs = random_configs(n=CHUNK_SIZE + 44)
+    expected, _ = run_sweep(frame, configs, SENSITIVITY)
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as pool:
+        counts, _ = run_sweep(frame, configs, SENSITIVITY, executor=pool, tasks=3)
+    for key, values in expected.items():
+        np.testing.assert_array_equal(counts[key], values, err_msg=key)
@@ -0,0 +1,59 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from benchmarks.bench_timeframes import AGG, reference
+from predictor.synthetic import synthetic_bars
+from predictor.timeframes import resample_bars
+
+INTRADAY = ["5min", "15min", "30min", "60min", "1day", "1week"]
+
+
+def assert_matches_reference(df, base, timeframes):
+    frames = resample_bars(df, base, timeframes)
+    for timeframe in timeframes:
+        got, expected = frames[timeframe], reference(df, timeframe, intraday=base != "1day")
+        assert got.index.equals(expected.index), timeframe
+        np.testing.assert_allclose(got.to_numpy(), expected[list(AGG)].to_numpy(), err_msg=timeframe)
+    return frames
+
+
+def test_5min_bars_around_the_clock():
+    # Pre-market to after-hours, so the days and weeks have bars outside the session to drop
+    assert_matches_reference(synthetic_bars(20_000, "5min", start="2020-01-02 04:00"), "5min", INTRADAY)
+
+
+@pytest.mark.parametrize("start", ["2021-03-12 15:00", "2021-11-05 15:00"])
+def test_1min_bars_across_dst(start):
+    frames = assert_matches_reference(synthetic_bars(6_000, "1min", start=start), "1min", ["15min", "60min", "1day"])
+    hours = frames["60min"].index
+    assert (hours.minute == 0).all()
+    # Eastern time repeats 01:00 when DST ends: two hourly bars, an hour apart
+    assert hours.is_unique and (np.diff(hours.asi8) == 3600 * 10 ** 9).all()
+
+
+def test_daily_bars_cover_the_regular_session():
+    df = synthetic_bars(3 * 24 * 12, "5min", start="2021-06-07 00:00")
+    day = resample_bars(df, "5min", ["1day"])["1day"]
+    assert list(day.index) == list(pd.DatetimeIndex(["2021-06-07", "2021-06-08", "2021-06-09"], tz="US/Eastern"))
+    session = df.loc["2021-06-08 09:30":"2021-06-08 15:55"]
+    assert day.loc["2021-06-08"].tolist() == [session['open'].iloc[0], session['high'].max(), session['low'].min(),
+                                              session['close'].iloc[-1], session['volume'].sum()]
+
+
+def test_weeks_are_labelled_with_their_last_trading_day():
+    daily = synthetic_bars(2_000, "B", start="2020-01-02")
+    assert_matches_reference(daily, "1day", ["1day", "1week"])
+    # A holiday Friday: the week ends on Thursday, and Monday starts a new one
+    holiday = daily.drop(pd.Timestamp("2020-07-03", tz="US/Eastern"))
+    week = resample_bars(holiday, "1day", ["1week"])["1week"]
+    assert pd.Timestamp("2020-07-02", tz="US/Eastern") in week.index
+    assert week.loc["2020-07-02", 'open'] == holiday.loc["2020-06-29", 'open']
+    assert week.loc["2020-07-10", 'open'] == holiday.loc["2020-07-06", 'open']
+
+
+def test_finer_than_base_is_an_error():
+    with pytest.raises(ValueError):
+        resample_bars(synthetic_bars(100, "15min"), "15min", ["5min"])
+    with pytest.raises(ValueError):
+        resample_bars(synthetic_bars(100, "15min"), "15min", ["30min", "1min"])
@@ -0,0 +1,68 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from predictor.indicators import add_patterns, calculate_indicators
+from predictor.optimizer import GROUPS, START_IDX, run_optimization
+from predictor.walkforward import MIN_SIGNALS, fold_windows, walk_forward
+
+ALL = (True,) * 8
+SENSITIVITY = 4
+TRAIN_BARS, TEST_BARS = 250, 50
+
+
+@pytest.mark.parametrize("n_bars, train_bars, test_bars", [(999, 250, 50), (1000, 100, 100), (30, 10, 7), (9, 10, 1)])
+def test_fold_windows_never_overlap(n_bars, train_bars, test_bars):
+    windows = fold_windows(n_bars, train_bars, test_bars)
+    assert len(windows) == max((n_bars - train_bars) // test_bars, 0)
+    for train_lo, train_hi, test_lo, test_hi in windows:
+        assert 0 <= train_lo < train_hi == test_lo < test_hi <= n_bars
+        assert (train_hi - train_lo, test_hi - test_lo) == (train_bars, test_bars)
+    # Test windows tile the history back to back
+    for (_, _, _, test_hi), (_, _, next_lo, _) in zip(windows, windows[1:]):
+        assert test_hi == next_lo
+
+
+def test_fold_dates_follow_each_other(frame):
+    folds, summary = walk_forward(frame, SENSITIVITY, TRAIN_BARS, TEST_BARS)
+    assert summary['folds'] == len(folds) == (len(frame) - START_IDX - 1 - TRAIN_BARS) // TEST_BARS
+    for fold in folds:
+        assert fold['Train Start'] < fold['Train End'] < fold['Test Start'] <= fold['Test End']
+    for fold, after in zip(folds, folds[1:]):
+        assert fold['Test End'] < after['Test Start']
+
+
+@pytest.mark.parametrize("k", [0, 7, -1])
+def test_fold_matches_optimize_tab(frame, k):
+    folds, _ = walk_forward(frame, SENSITIVITY, TRAIN_BARS, TEST_BARS)
+    train_lo, train_hi, _, _ = fold_windows(len(frame) - START_IDX - 1, TRAIN_BARS, TEST_BARS)[k]
+    # The same training window run through the Optimize tab's code path
+    results = run_optimization(frame.iloc[train_lo:START_IDX + train_hi + 1], SENSITIVITY)
+    eligible = [r for r in results if r['Signals'] >= MIN_SIGNALS] or results
+    best = max(eligible, key=lambda r: r['Accuracy'])
+    assert [best[g] for g in GROUPS] == [folds[k][g] for g in GROUPS]
+    assert (best['Accuracy'], best['Signals']) == (folds[k]['Train_Acc'], folds[k]['Train_Signals'])
+
+
+def test_training_never_sees_the_test_window(frame):
+    # Rewrite every bar after each fold's first test bar: the configuration it picks can't change
+    folds, _ = walk_forward(frame, SENSITIVITY, TRAIN_BARS, TEST_BARS)
+    bars = frame[["open", "high", "low", "close", "volume"]]
+    tested = []
+    for k, (_, _, test_lo, _) in enumerate(fold_windows(len(frame) - START_IDX - 1, TRAIN_BARS, TEST_BARS)):
+        changed = bars.copy()
+        changed.iloc[START_IDX + test_lo + 1:] = changed.iloc[START_IDX + test_lo + 1:].to_numpy()[::-1]
+        refolded, _ = walk_forward(add_patterns(calculate_indicators(changed, *ALL)), SENSITIVITY,
+                                   TRAIN_BARS, TEST_BARS)
+        for key in GROUPS + ['Train_Acc', 'Train_Signals', 'Train Start', 'Train End']:
+            assert refolded[k][key] == folds[k][key], (k, key)
+        tested.append((refolded[k]['Test_Acc'], refolded[k]['Test_Signals']))
+    # ...while the rewritten bars do reach the test windows
+    assert tested != [(fold['Test_Acc'], fold['Test_Signals']) for fold in folds]
+
+
+def test_folds_on_worker_processes_match_in_process(frame):
+    folds, summary = walk_forward(frame, SENSITIVITY, TRAIN_BARS, TEST_BARS)
+    with ProcessPoolExecutor(max_workers=2, mp_context=multiprocessing.get_context("spawn")) as pool:
+        assert walk_forward(frame, SENSITIVITY, TRAIN_BARS, TEST_BARS, executor=pool, tasks=3) == (folds, summary)